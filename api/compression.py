@@ -0,0 +1,76 @@
+"""
+Compressão negociada das respostas JSON do handler da Vercel
+Escolhe br (se o pacote brotli estiver instalado) ou gzip a partir do Accept-Encoding,
+só para corpos acima de um tamanho mínimo. As versões comprimidas de uma resposta do
+cache ficam guardadas na própria entrada, para não comprimir de novo a cada acesso.
+"""
+import os
+import gzip
+
+# Importa o brotli apenas se disponível (gzip é da biblioteca padrão)
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    brotli = None
+    BROTLI_AVAILABLE = False
+
+MIN_BYTES = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESSION_GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.environ.get("COMPRESSION_BROTLI_QUALITY", "5"))
+
+
+def parse_accept_encoding(header: str) -> dict:
+    """'gzip, br;q=0.8, *;q=0' -> {'gzip': 1.0, 'br': 0.8, '*': 0.0}"""
+    preferencias = {}
+    for parte in (header or '').split(','):
+        coding, _, params = parte.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        preferencias[coding] = q
+    return preferencias
+
+
+def negotiate(accept_encoding: str, size: int, min_bytes: int = None) -> str:
+    """Codificação a usar ('br', 'gzip') ou None para enviar sem compressão."""
+    if size < (MIN_BYTES if min_bytes is None else min_bytes):
+        return None
+    preferencias = parse_accept_encoding(accept_encoding)
+    disponiveis = ('br', 'gzip') if BROTLI_AVAILABLE else ('gzip',)
+    melhor, melhor_q = None, 0.0
+    for coding in disponiveis:  # Em empate vale a ordem: br comprime mais que gzip
+        q = preferencias.get(coding, preferencias.get('*', 0.0))
+        if q > melhor_q:
+            melhor, melhor_q = coding, q
+    return melhor
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0: mesma entrada -> mesmos bytes (o ETag da versão comprimida continua forte)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def encoded_body(entry: dict, encoding: str) -> bytes:
+    """Corpo da entrada do cache na codificação pedida, comprimido uma vez só."""
+    variantes = entry.setdefault('variants', {})
+    corpo = variantes.get(encoding)
+    if corpo is None:
+        corpo = variantes[encoding] = compress(entry['body'], encoding)
+    return corpo
+
+
+def variant_etag(etag: str, encoding: str) -> str:
+    """Cada codificação é uma representação diferente: '"abc"' -> '"abc-gzip"'."""
+    if not etag or not encoding:
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
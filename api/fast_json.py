@@ -0,0 +1,95 @@
+"""
+Serialização JSON rápida para as respostas de listas do handler da Vercel
+Usa o orjson quando instalado (bem mais rápido que o json da biblioteca padrão) e
+guarda os bytes já codificados de cada linha (bolsa, edital...), para que montar uma
+página seja só concatenar bytes: textos longos como `requisito` e `resumo` são
+codificados uma vez por época dos dados, não a cada requisição.
+"""
+import os
+import json
+import threading
+from collections import OrderedDict
+
+# Importa o orjson apenas se disponível (senão usa o json da biblioteca padrão)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# Campos que mudam sem a época mudar (visualizações); fazem parte da chave da linha
+VOLATILE_FIELDS = ('view_count', 'unique_viewers', 'trending_score')
+
+
+def dumps(data) -> bytes:
+    """JSON compacto em UTF-8 (sem escapar acentos)."""
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            pass  # Tipo que o orjson não conhece: o json padrão tenta com str()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+
+class RowBytesCache:
+    """
+    Bytes JSON de cada linha, por (namespace, id, campos voláteis), limitado a
+    `max_entries` (sai a usada há mais tempo). Tudo é descartado quando a época dos
+    dados muda: dentro de uma época só os campos voláteis mudam.
+
+    O namespace separa linhas de mesmo id vindas de consultas diferentes (ex: a view
+    agrupada de /api/bolsas e as linhas do ranking, que têm outras colunas).
+
+    Configuração: FAST_JSON_ROW_CACHE_ENTRIES (padrão 5000).
+    """
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.environ.get("FAST_JSON_ROW_CACHE_ENTRIES", "5000"))
+        self._rows = OrderedDict()
+        self._epoch = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def _row(self, row, namespace):
+        row_id = row.get('id') if isinstance(row, dict) else None
+        if row_id is None:
+            return dumps(row)
+        key = (namespace, row_id) + tuple(row.get(campo) for campo in VOLATILE_FIELDS)
+        with self._lock:
+            encoded = self._rows.get(key)
+            if encoded is not None:
+                self._rows.move_to_end(key)
+                self.stats['hits'] += 1
+                return encoded
+            self.stats['misses'] += 1
+        encoded = dumps(row)
+        with self._lock:
+            self._rows[key] = encoded
+            while len(self._rows) > self.max_entries:
+                self._rows.popitem(last=False)
+        return encoded
+
+    def encode_rows(self, rows, namespace) -> bytes:
+        return b'[' + b','.join(self._row(row, namespace) for row in rows) + b']'
+
+    def encode(self, data, namespace: str, rows_key: str = None, epoch=None) -> bytes:
+        """
+        Serializa uma lista de linhas (`rows_key=None`) ou um envelope de página
+        ({'bolsas': [...], 'total': ...}) cujas linhas estão em `data[rows_key]`.
+        """
+        with self._lock:
+            if epoch != self._epoch:
+                self._rows.clear()
+                self._epoch = epoch
+        if rows_key is None:
+            return self.encode_rows(data, namespace)
+
+        linhas = self.encode_rows(data.get(rows_key) or [], namespace)
+        resto = dumps({k: v for k, v in data.items() if k != rows_key})
+        inicio = b'{' + dumps(rows_key) + b':' + linhas
+        return inicio + (b'}' if resto == b'{}' else b',' + resto[1:])
+
+    def health(self) -> dict:
+        with self._lock:
+            return dict(self.stats, entries=len(self._rows), orjson=ORJSON_AVAILABLE)
@@ -2,35 +2,81 @@ from http.server import BaseHTTPRequestHandler
 import json
 import urllib.parse
 import os
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timezone, timedelta, date
+from concurrent.futures import ThreadPoolExecutor
 
 # ✅ CORREÇÃO: Importar rate limiter
 from .rate_limiter_vercel import apply_rate_limit, vercel_limiter
 
-# Importar Supabase apenas se disponível (para não quebrar outros endpoints)
-try:
-    from supabase import create_client
-    SUPABASE_AVAILABLE = True
-except ImportError:
-    SUPABASE_AVAILABLE = False
+# Cliente Supabase único por instância (importa o Supabase apenas se disponível,
+# para não quebrar outros endpoints)
+from .supabase_client import supabase_pool, SUPABASE_AVAILABLE
+from .view_counter import create_view_counter, normalize_bolsa_id
+from .unique_views import UniqueViewTracker
+from .ranking import RankingTracker
+from .response_cache import ResponseCache, is_not_modified, http_date
+from .fast_json import dumps as fast_dumps, RowBytesCache
+from .compression import negotiate, compress, encoded_body, variant_etag
+
+if not SUPABASE_AVAILABLE:
     print("Supabase não disponível - usando mocks")
 
+# Pool pequeno para consultas independentes de uma mesma requisição (ex: página + totais)
+QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="supabase-query")
+
 def get_supabase_client():
-    """Conecta ao Supabase se as variáveis estiverem configuradas"""
-    if not SUPABASE_AVAILABLE:
-        return None
-    
-    supabase_url = os.environ.get("SUPABASE_URL")
-    supabase_key = os.environ.get("SUPABASE_KEY")
-    
-    if not supabase_url or not supabase_key:
-        return None
-    
-    try:
-        return create_client(supabase_url, supabase_key)
-    except Exception as e:
-        print(f"Erro ao conectar Supabase: {e}")
+    """
+    Cliente Supabase da instância: criado no primeiro uso e reaproveitado (com as
+    conexões abertas) nas requisições seguintes enquanto a função estiver quente.
+    """
+    return supabase_pool.get()
+
+# 👁️ Visualizações acumuladas em memória e gravadas em lote (RPC increment_view_counts);
+# cada sessão conta uma vez por bolsa (esboços gravados pela RPC merge_unique_viewers)
+unique_views = UniqueViewTracker()
+view_counter = create_view_counter(get_supabase_client, unique_views=unique_views)
+MAX_VIEW_BATCH = 100
+MAX_SESSION_ID_LENGTH = 128  # IDs de sessão do frontend são UUIDs; acima disso é lixo
+
+# 🏆 Ranking mantido em memória a partir das visualizações (sem ORDER BY a cada requisição)
+ranking_tracker = RankingTracker()
+RANKING_RESEED_SECONDS = float(os.environ.get("RANKING_RESEED_SECONDS", "900"))
+RANKING_CHECKPOINT_SECONDS = float(os.environ.get("RANKING_CHECKPOINT_SECONDS", "300"))
+_ranking_checkpoint = {'saved_at': 0.0}
+
+def get_data_epoch():
+    """Época dos dados (metadata.last_data_update): muda quando o scraper grava algo novo."""
+    supabase = get_supabase_client()
+    if not supabase:
         return None
+    response = supabase.table('metadata').select('value').eq('key', 'last_data_update').limit(1).execute()
+    return response.data[0]['value'] if response.data else None
+
+# ⚡ Respostas dos endpoints de leitura guardadas já serializadas nesta instância
+# (TTL por endpoint; vencidas são servidas enquanto uma atualização roda em segundo plano;
+# ETag derivado da época dos dados, para responder 304 sem reenviar o corpo)
+response_cache = ResponseCache(epoch_loader=get_data_epoch, serializer=fast_dumps)
+
+# 🚀 Bytes JSON de cada linha reaproveitados entre páginas (listas = concatenação de bytes)
+row_bytes = RowBytesCache()
+
+def com_linhas_em_cache(loader, namespace, rows_key=None):
+    """Loader que serializa a lista (ou o envelope com as linhas em `rows_key`) com os bytes por linha."""
+    def carregar():
+        data = loader()
+        if not data:
+            return data
+        return row_bytes.encode(data, namespace, rows_key=rows_key, epoch=response_cache.current_epoch())
+    return carregar
+
+def registrar_visualizacao(bolsa_id):
+    """
+    Uma visualização única (já aceita por unique_views.observe): vai para o contador
+    em lote e para o ranking em memória, que conta sessões distintas.
+    """
+    ranking_tracker.record(bolsa_id)
+    return view_counter.record(bolsa_id)
 
 def get_metadata_from_supabase():
     """Busca metadados do Supabase"""
@@ -41,12 +87,67 @@ def get_metadata_from_supabase():
     try:
         response = supabase.table('metadata').select('key, value').execute()
         if response.data:
-            # Transforma lista em dicionário
-            metadata = {item['key']: item['value'] for item in response.data}
+            # Transforma lista em dicionário (sem os estados internos: checkpoint, snapshot)
+            metadata = {item['key']: item['value'] for item in response.data if item['key'] not in METADATA_INTERNAL_KEYS}
             return metadata
         return None
     except Exception as e:
         print(f"Erro ao buscar metadados: {e}")
+        supabase_pool.report_error(e)
+        return None
+
+def get_bolsas_totais_agrupadas(supabase, status=None, centro=None, tipo=None, q=None):
+    """
+    Soma de vagas (total e preenchidas) das bolsas agrupadas que passam nos filtros.
+    Usa a RPC `bolsas_totais_agrupadas` (uma linha); se ela não existir no banco, soma em
+    Python lendo só `vagas_total,status`. Retorna (total_vagas, vagas_preenchidas) ou None.
+    """
+    try:
+        response = supabase.rpc('bolsas_totais_agrupadas', {
+            'p_status': status,
+            'p_centro': centro,
+            'p_tipo': tipo,
+            'p_fts': None,
+            'p_busca': q or None,  # Mesma busca (ilike) da listagem
+        }).execute()
+        if response.data:
+            totais = response.data[0]
+            return int(totais.get('total_vagas') or 0), int(totais.get('vagas_preenchidas') or 0)
+    except Exception as e:
+        print(f"⚠️ RPC bolsas_totais_agrupadas indisponível, somando em Python: {e}")
+
+    try:
+        all_data_query = supabase.table('bolsas_view_agrupada').select('vagas_total,status')
+        
+        # Aplicar os mesmos filtros da query principal
+        if status and status != 'all':
+            all_data_query = all_data_query.eq('status', status)
+        if centro and centro != 'all':
+            all_data_query = all_data_query.eq('centro', centro)
+        if tipo and tipo != 'all':
+            if tipo == 'extensao':
+                all_data_query = all_data_query.or_('tipo.ilike.%Extensão%,tipo.ilike.%Discente%')
+            elif tipo == 'UA Superior':
+                all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Superior%')
+            elif tipo == 'UA Médio':
+                all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Médio%')
+            elif tipo == 'UA Fundamental':
+                all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Fundamental%')
+        if q:
+            search_term = f"%{q}%"
+            all_data_query = all_data_query.or_(f'nome_projeto.ilike.{search_term},orientador.ilike.{search_term}')
+        
+        all_bolsas = all_data_query.execute().data or []
+        
+        # vagas_total nulo conta 1, como o coalesce da RPC
+        total_vagas = sum(1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in all_bolsas)
+        vagas_preenchidas = sum(
+            1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in all_bolsas
+            if bolsa.get('status') == 'preenchida'
+        )
+        return total_vagas, vagas_preenchidas
+    except Exception as calc_error:
+        print(f"⚠️ Erro ao calcular totais: {calc_error}")
         return None
 
 def get_bolsas_from_supabase(params):
@@ -108,50 +209,29 @@ def get_bolsas_from_supabase(params):
         # Paginação
         query = query.range(offset, offset + page_size - 1)
         
+        # ⚡ Página e totais são independentes: os totais rodam em paralelo com a página
+        # 🔧 TOTAIS COM TODOS OS DADOS FILTRADOS (não só da página atual), calculados no banco
+        totais_future = QUERY_EXECUTOR.submit(get_bolsas_totais_agrupadas, supabase, status, centro, tipo, q)
+        
         response = query.execute()
         
         if response.data is not None:
             total_count = response.count if response.count is not None else 0
             total_pages = (total_count + page_size - 1) // page_size
             
-            # 🔧 CALCULAR TOTAIS COM TODOS OS DADOS (não só da página atual)
             try:
-                # Query separada para calcular totais gerais
-                all_data_query = supabase.table('bolsas_view_agrupada').select('vagas_total,status')
-                
-                # Aplicar os mesmos filtros da query principal
-                if status and status != 'all':
-                    all_data_query = all_data_query.eq('status', status)
-                if centro and centro != 'all':
-                    all_data_query = all_data_query.eq('centro', centro)
-                if tipo and tipo != 'all':
-                    if tipo == 'extensao':
-                        all_data_query = all_data_query.or_('tipo.ilike.%Extensão%,tipo.ilike.%Discente%')
-                    elif tipo == 'UA Superior':
-                        all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Superior%')
-                    elif tipo == 'UA Médio':
-                        all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Médio%')
-                    elif tipo == 'UA Fundamental':
-                        all_data_query = all_data_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Fundamental%')
-                if q:
-                    all_data_query = all_data_query.textSearch('fts', q, config='portuguese')
-                
-                all_data_response = all_data_query.execute()
-                all_bolsas = all_data_response.data or []
-                
-                # Calcular totais com TODOS os dados filtrados
-                total_vagas = sum(bolsa.get('vagas_total', 1) for bolsa in all_bolsas)
-                vagas_preenchidas = sum(
-                    bolsa.get('vagas_total', 1) for bolsa in all_bolsas 
-                    if bolsa.get('status') == 'preenchida'
-                )
-                
-            except Exception as calc_error:
-                print(f"⚠️ Erro ao calcular totais: {calc_error}")
+                totais = totais_future.result()
+            except Exception as e:
+                # Falha nos totais não derruba a página: cai no cálculo com os dados da página
+                print(f"⚠️ Erro ao calcular totais das bolsas agrupadas: {e}")
+                totais = None
+            if totais is not None:
+                total_vagas, vagas_preenchidas = totais
+            else:
                 # Fallback: calcular só com dados da página
-                total_vagas = sum(bolsa.get('vagas_total', 1) for bolsa in response.data)
+                total_vagas = sum(1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in response.data)
                 vagas_preenchidas = sum(
-                    bolsa.get('vagas_total', 1) for bolsa in response.data 
+                    1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in response.data 
                     if bolsa.get('status') == 'preenchida'
                 )
             
@@ -170,10 +250,62 @@ def get_bolsas_from_supabase(params):
         
     except Exception as e:
         print(f"Erro ao buscar bolsas: {e}")
+        supabase_pool.report_error(e)
         return None
 
+def _salvar_checkpoint_ranking(supabase):
+    """Grava a pontuação em alta do ranking em metadata.ranking_checkpoint (uma linha)."""
+    try:
+        supabase.table('metadata').upsert({
+            'key': 'ranking_checkpoint',
+            'value': json.dumps(ranking_tracker.to_checkpoint())
+        }, on_conflict='key').execute()
+        _ranking_checkpoint['saved_at'] = time.time()
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar checkpoint do ranking: {e}")
+
+def _carregar_ranking(supabase):
+    """
+    Semeia o ranking em memória quando a instância é nova ou o estado ficou velho
+    (RANKING_RESEED_SECONDS). As contagens vêm sempre do banco (só as `capacity` bolsas
+    com mais visualizações únicas: id + contagem, que já somam as de todas as instâncias);
+    o checkpoint só devolve a pontuação em alta a uma instância que ainda não tem nenhuma.
+    """
+    agora = time.time()
+    if ranking_tracker.seeded_at and agora - ranking_tracker.seeded_at < RANKING_RESEED_SECONDS:
+        return
+    
+    try:
+        rows = supabase.table('bolsas').select('id, unique_viewers').order('unique_viewers', desc=True).limit(ranking_tracker.capacity).execute().data or []
+        contagens = {row['id']: row.get('unique_viewers') or 0 for row in rows}
+    except Exception as e:
+        # Banco sem a coluna unique_viewers: usa o contador bruto
+        print(f"⚠️ Ranking por visualizações únicas indisponível, usando view_count: {e}")
+        rows = supabase.table('bolsas').select('id, view_count').order('view_count', desc=True).limit(ranking_tracker.capacity).execute().data or []
+        contagens = {row['id']: row.get('view_count') or 0 for row in rows}
+    
+    ranking_tracker.seed(contagens)
+    if ranking_tracker.trending:
+        return
+    
+    try:
+        response = supabase.table('metadata').select('value').eq('key', 'ranking_checkpoint').limit(1).execute()
+        if response.data:
+            checkpoint = response.data[0]['value']
+            if isinstance(checkpoint, str):
+                checkpoint = json.loads(checkpoint)
+            ranking_tracker.load_checkpoint(checkpoint)
+        # Próximo checkpoint só depois do intervalo (não regrava logo o que acabou de ler)
+        _ranking_checkpoint['saved_at'] = agora
+    except Exception as e:
+        print(f"⚠️ Checkpoint do ranking indisponível: {e}")
+
 def get_ranking_from_supabase(params):
-    """Busca ranking das bolsas mais vistas do Supabase"""
+    """
+    Ranking das bolsas mais vistas (sessões distintas), servido da estrutura em memória.
+    Com `trending=true`, ordena pela pontuação em alta (visualizações recentes valem mais).
+    Só as bolsas do topo são lidas do banco, pelo ID.
+    """
     supabase = get_supabase_client()
     if not supabase:
         return None
@@ -182,8 +314,26 @@ def get_ranking_from_supabase(params):
         # Parâmetro de limite (padrão 10, máximo 50)
         limit = int(params.get('limit', ['10'])[0])
         limit = min(limit, 50)  # Máximo 50 bolsas no ranking
-        
-        # Query para buscar as bolsas mais vistas
+        trending = params.get('trending', ['false'])[0].lower() == 'true'
+        
+        _carregar_ranking(supabase)
+        topo = ranking_tracker.top(limit, trending=trending)
+        
+        if topo:
+            ordem = [bolsa_id for bolsa_id, _ in topo]
+            rows = supabase.table('bolsas_view').select('*').in_('id', ordem).execute().data or []
+            if trending:
+                for row in rows:
+                    row['trending_score'] = round(dict(topo).get(row['id'], 0.0), 3)
+            posicao = {bolsa_id: i for i, bolsa_id in enumerate(ordem)}
+            rows.sort(key=lambda row: posicao.get(row['id'], len(posicao)))
+            
+            # 💾 Checkpoint periódico da pontuação em alta
+            if ranking_tracker.trending and time.time() - _ranking_checkpoint['saved_at'] >= RANKING_CHECKPOINT_SECONDS:
+                _salvar_checkpoint_ranking(supabase)
+            return rows
+        
+        # Sem nenhuma bolsa acompanhada ainda: ordenação direta no banco
         query = supabase.table('bolsas_view').select('*').order('view_count', desc=True).limit(limit)
         
         response = query.execute()
@@ -195,6 +345,7 @@ def get_ranking_from_supabase(params):
         
     except Exception as e:
         print(f"Erro ao buscar ranking: {e}")
+        supabase_pool.report_error(e)
         return None
 
 def get_bolsa_by_id(bolsa_id, increment_view=True):
@@ -213,21 +364,12 @@ def get_bolsa_by_id(bolsa_id, increment_view=True):
             # Incrementar contador apenas se solicitado
             if increment_view:
                 try:
-                    print(f"🔢 INCREMENTANDO VIEW para bolsa {bolsa_id}")
+                    # Soma em memória; a gravação vai em lote para o banco. Sem controle
+                    # de sessão, não entra no ranking (que conta visualizações únicas)
+                    pendentes = view_counter.record(bolsa_data.get('id', bolsa_id))
                     
-                    # Pegar o valor atual direto da view que já temos
-                    current_count = bolsa_data.get('view_count', 0) or 0
-                    new_count = current_count + 1
-                    
-                    print(f"📊 Mudando de {current_count} para {new_count}")
-                    
-                    # Atualizar na tabela bolsas de forma simples
-                    supabase.table('bolsas').update({'view_count': new_count}).eq('id', bolsa_id).execute()
-                    
-                    # Atualizar o dado que vamos retornar também
-                    bolsa_data['view_count'] = new_count
-                    
-                    print(f"✅ SUCESSO: View count = {new_count}")
+                    # O valor retornado já inclui as visualizações ainda não gravadas
+                    bolsa_data['view_count'] = (bolsa_data.get('view_count', 0) or 0) + pendentes
                     
                 except Exception as e:
                     print(f"❌ ERRO: {str(e)}")
@@ -241,47 +383,75 @@ def get_bolsa_by_id(bolsa_id, increment_view=True):
         
     except Exception as e:
         print(f"Erro ao buscar bolsa por ID: {e}")
+        supabase_pool.report_error(e)
         return None
 
+def validar_session_id(session_id):
+    """Mensagem de erro se o session_id do corpo da requisição não for uma string válida, senão None."""
+    if not isinstance(session_id, str) or not session_id:
+        return "session_id é obrigatório e deve ser uma string"
+    if len(session_id) > MAX_SESSION_ID_LENGTH:
+        return f"session_id deve ter no máximo {MAX_SESSION_ID_LENGTH} caracteres"
+    return None
+
 def increment_bolsa_view_with_session(bolsa_id, session_id):
-    """Incrementa view de uma bolsa com controle de sessão"""
-    supabase = get_supabase_client()
-    if not supabase:
-        return {"status": "error", "message": "Supabase não disponível"}
+    """
+    Registra uma visualização de uma bolsa (o controle de sessão fica no frontend).
+    O incremento é acumulado em memória e gravado em lote, sem ler o valor atual.
+    """
+    bolsa_id_normalizado = normalize_bolsa_id(bolsa_id)
+    if not bolsa_id_normalizado:
+        return {"status": "error", "message": "ID de bolsa inválido"}
     
     try:
-        print(f"🎯 INCREMENT VIEW com sessão - Bolsa: {bolsa_id}, Sessão: {session_id[:8]}...")
-        
-        # Busca a bolsa atual
-        response = supabase.table('bolsas_view').select('view_count').eq('id', bolsa_id).execute()
-        
-        if not response.data:
-            return {"status": "error", "message": "Bolsa não encontrada"}
-        
-        current_count = response.data[0].get('view_count', 0) or 0
-        new_count = current_count + 1
-        
-        # Incrementa na tabela bolsas
-        update_response = supabase.table('bolsas').update({
-            'view_count': new_count
-        }).eq('id', bolsa_id).execute()
-        
-        if update_response.data:
-            print(f"✅ View incrementada: {current_count} → {new_count} (Sessão: {session_id[:8]}...)")
+        # Recarregar a página na mesma sessão não conta de novo
+        if not unique_views.observe(bolsa_id_normalizado, session_id):
             return {
-                "status": "success", 
-                "bolsa_id": bolsa_id,
+                "status": "success",
+                "bolsa_id": bolsa_id_normalizado,
                 "session_id": session_id,
-                "old_count": current_count,
-                "new_count": new_count
+                "counted": False
             }
-        else:
-            return {"status": "error", "message": "Falha ao atualizar contador"}
+        
+        pendentes = registrar_visualizacao(bolsa_id_normalizado)
+        print(f"🎯 VIEW registrada - Bolsa: {bolsa_id_normalizado}, Sessão: {session_id[:8]}... ({pendentes} pendente(s))")
+        return {
+            "status": "success", 
+            "bolsa_id": bolsa_id_normalizado,
+            "session_id": session_id,
+            "counted": True,
+            "pending_views": pendentes
+        }
         
     except Exception as e:
         print(f"❌ Erro ao incrementar view: {e}")
         return {"status": "error", "message": str(e)}
 
+def register_view_batch(bolsa_ids, session_id):
+    """
+    📦 Recebe várias visualizações de uma vez (o frontend acumula e envia em lote).
+    Cada bolsa conta uma única vez por sessão; IDs inválidos são ignorados.
+    """
+    if not isinstance(bolsa_ids, list):
+        return {"status": "error", "message": "bolsa_ids deve ser uma lista"}
+    if len(bolsa_ids) > MAX_VIEW_BATCH:
+        return {"status": "error", "message": f"Máximo de {MAX_VIEW_BATCH} visualizações por envio"}
+    
+    aceitas = list(dict.fromkeys(filter(None, (normalize_bolsa_id(b) for b in bolsa_ids))))
+    contadas = 0
+    for bolsa_id in aceitas:
+        if unique_views.observe(bolsa_id, session_id):
+            registrar_visualizacao(bolsa_id)
+            contadas += 1
+    
+    print(f"🎯 LOTE de views - {contadas}/{len(aceitas)} bolsa(s) contada(s), Sessão: {session_id[:8]}...")
+    return {
+        "status": "success",
+        "accepted": len(aceitas),
+        "counted": contadas,
+        "rejected": len(bolsa_ids) - len(aceitas)
+    }
+
 def get_editais_from_supabase(params):
     """Busca editais do Supabase com paginação"""
     supabase = get_supabase_client()
@@ -309,10 +479,43 @@ def get_editais_from_supabase(params):
         
     except Exception as e:
         print(f"Erro ao buscar editais: {e}")
+        supabase_pool.report_error(e)
         return None
 
+# Chaves de metadata usadas internamente (não vão para /api/metadata)
+ANALYTICS_SNAPSHOT_KEY = 'analytics_snapshot'
+ANALYTICS_SNAPSHOT_VERSION = 1  # Mesmo valor de SNAPSHOT_VERSION em backend/analytics.py
+METADATA_INTERNAL_KEYS = {'ranking_checkpoint', ANALYTICS_SNAPSHOT_KEY}
+
 def get_analytics_from_supabase():
-    """Busca estatísticas básicas do Supabase"""
+    """
+    Analytics do snapshot gravado pelo scraper ao terminar (metadata.analytics_snapshot,
+    ver backend/analytics.py): uma única leitura; a cópia em memória da instância fica no
+    cache de respostas até a época dos dados mudar. Sem snapshot ainda, ou com um de outra
+    versão do formato (ANALYTICS_SNAPSHOT_VERSION), calcula na hora.
+    """
+    supabase = get_supabase_client()
+    if not supabase:
+        return None
+    
+    try:
+        response = supabase.table('metadata').select('value').eq('key', ANALYTICS_SNAPSHOT_KEY).limit(1).execute()
+        if response.data:
+            snapshot = response.data[0]['value']
+            if isinstance(snapshot, str):
+                snapshot = json.loads(snapshot)
+            if snapshot.get('snapshot_version') == ANALYTICS_SNAPSHOT_VERSION:
+                return snapshot
+            print(f"⚠️ Snapshot de analytics na versão {snapshot.get('snapshot_version')} "
+                  f"(esperada {ANALYTICS_SNAPSHOT_VERSION}), calculando na hora")
+    except Exception as e:
+        print(f"⚠️ Snapshot de analytics indisponível, calculando na hora: {e}")
+        supabase_pool.report_error(e)
+    
+    return calcular_analytics_ao_vivo()
+
+def calcular_analytics_ao_vivo():
+    """Busca estatísticas básicas do Supabase (varre a view agrupada; só sem snapshot)"""
     supabase = get_supabase_client()
     if not supabase:
         return None
@@ -379,6 +582,87 @@ def get_analytics_from_supabase():
         print(f"Erro ao buscar analytics: {e}")
         return None
 
+# 📈 Séries temporais lidas só dos rollups (backend/sql/005_bolsas_rollups.sql)
+TIMESERIES_TABLES = {'month': ('bolsas_rollup_mensal', 'mes'), 'day': ('bolsas_rollup_diario', 'dia')}
+TIMESERIES_DEFAULT_DAYS = 90
+TIMESERIES_PAGE_SIZE = 1000
+
+def _data_param(params, nome):
+    """Data AAAA-MM-DD de um parâmetro de query (None se ausente ou inválida)."""
+    valor = params.get(nome, [None])[0]
+    try:
+        return date.fromisoformat(valor).isoformat() if valor else None
+    except ValueError:
+        return None
+
+def get_timeseries_from_supabase(params):
+    """
+    Série temporal de bolsas ofertadas/preenchidas por mês (padrão) ou por dia, lida só
+    das tabelas de rollup: o custo depende do período pedido, não do tamanho do histórico.
+
+    Parâmetros: granularity=month|day, from/to (AAAA-MM-DD; por dia, o padrão são os
+    últimos 90 dias), centro, modalidade e group_by=centro|modalidade (uma série por valor).
+    """
+    supabase = get_supabase_client()
+    if not supabase:
+        return None
+    
+    try:
+        granularity = params.get('granularity', ['month'])[0]
+        if granularity not in TIMESERIES_TABLES:
+            granularity = 'month'
+        tabela, coluna = TIMESERIES_TABLES[granularity]
+        group_by = params.get('group_by', [None])[0]
+        if group_by not in ('centro', 'modalidade'):
+            group_by = None
+        
+        inicio, fim = _data_param(params, 'from'), _data_param(params, 'to')
+        if granularity == 'day' and not inicio:
+            inicio = (datetime.now(timezone.utc) - timedelta(days=TIMESERIES_DEFAULT_DAYS)).date().isoformat()
+        if granularity == 'month' and inicio:
+            inicio = inicio[:8] + '01'  # O rollup mensal é indexado pelo primeiro dia do mês
+        
+        def montar_query():
+            query = supabase.table(tabela).select(f'{coluna}, centro, modalidade, bolsas, vagas, preenchidas')
+            if inicio:
+                query = query.gte(coluna, inicio)
+            if fim:
+                query = query.lte(coluna, fim)
+            for filtro in ('centro', 'modalidade'):
+                valor = params.get(filtro, [None])[0]
+                if valor and valor != 'all':
+                    query = query.eq(filtro, valor)
+            return query.order(coluna).order('centro').order('modalidade')
+        
+        # Paginado: por dia, o período pode passar do limite de linhas do PostgREST
+        rows, offset = [], 0
+        while True:
+            bloco = montar_query().range(offset, offset + TIMESERIES_PAGE_SIZE - 1).execute().data or []
+            rows.extend(bloco)
+            if len(bloco) < TIMESERIES_PAGE_SIZE:
+                break
+            offset += TIMESERIES_PAGE_SIZE
+        
+        series = {}
+        for row in rows:
+            pontos = series.setdefault(row.get(group_by) if group_by else 'total', {})
+            ponto = pontos.setdefault(row[coluna], {'periodo': row[coluna], 'bolsas': 0, 'vagas': 0, 'preenchidas': 0})
+            for campo in ('bolsas', 'vagas', 'preenchidas'):
+                ponto[campo] += row.get(campo) or 0
+        
+        return {
+            'granularity': granularity,
+            'group_by': group_by,
+            'from': inicio,
+            'to': fim,
+            'series': {grupo: list(pontos.values()) for grupo, pontos in series.items()}
+        }
+        
+    except Exception as e:
+        print(f"Erro ao buscar série temporal: {e}")
+        supabase_pool.report_error(e)
+        return None
+
 def subscribe_telegram_alerts(telegram_id, preferencias=None):
     """Cadastra ID do Telegram para receber alertas de novos editais com preferências personalizadas"""
     supabase = get_supabase_client()
@@ -1015,12 +1299,35 @@ def run_scraping_serverless():
 class handler(BaseHTTPRequestHandler):
     def send_json_response(self, data, status_code=200, cache_seconds=3600):
         """Helper para enviar resposta JSON com headers otimizados"""
+        return self.send_json_bytes(fast_dumps(data), status_code=status_code, cache_seconds=cache_seconds)
+
+    def send_json_bytes(self, body, status_code=200, cache_seconds=3600, etag=None, last_modified=None,
+                        encoding=None):
+        """
+        Envia um corpo JSON já serializado (ex: vindo do cache de respostas), comprimido
+        conforme o Accept-Encoding; `encoding` indica que o corpo já vem comprimido.
+        """
+        if encoding is None:
+            encoding = negotiate(self.headers.get('Accept-Encoding'), len(body))
+            if encoding:
+                body = compress(body, encoding)
+        
         # Status HTTP
         self.send_response(status_code)
         
         # Headers básicos
         self.send_header('Content-type', 'application/json; charset=utf-8')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_common_headers(cache_seconds, variant_etag(etag, encoding), last_modified)
+        self.end_headers()
         
+        # Retorna a resposta JSON
+        self.wfile.write(body)
+
+    def send_common_headers(self, cache_seconds, etag=None, last_modified=None):
+        """CORS + headers de cache/validação (compartilhados entre 200 e 304)"""
         # ✅ CORREÇÃO: CORS seguro (sem wildcard)
         from .security_utils import build_cors_headers
         origin = self.headers.get('Origin', '')
@@ -1028,22 +1335,47 @@ class handler(BaseHTTPRequestHandler):
         for header, value in cors_headers.items():
             self.send_header(header, value)
         
+        # O corpo depende do Accept-Encoding (caches intermediários guardam uma versão por codificação)
+        self.send_header('Vary', 'Accept-Encoding')
+        
         # Headers de cache (para melhor performance)
         if cache_seconds > 0:
             self.send_header('Cache-Control', f'public, max-age={cache_seconds}')
-            self.send_header('Last-Modified', datetime.now(timezone.utc).strftime('%a, %d %b %Y %H:%M:%S GMT'))
-            
-            # ETag simples baseado no hash do conteúdo
-            import hashlib
-            content_hash = hashlib.md5(json.dumps(data, sort_keys=True).encode()).hexdigest()[:12]
-            self.send_header('ETag', f'"{content_hash}"')
+        elif etag:
+            # Sem cache, mas o navegador guarda a cópia e revalida com If-None-Match
+            self.send_header('Cache-Control', 'no-cache')
         else:
             self.send_header('Cache-Control', 'no-cache, no-store, must-revalidate')
-            
-        self.end_headers()
         
-        # Retorna a resposta JSON
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        if etag:
+            # ETag forte: época dos dados + chave da requisição (sem hash do corpo)
+            self.send_header('ETag', etag)
+        if cache_seconds > 0 or last_modified:
+            self.send_header('Last-Modified', http_date(last_modified or time.time()))
+
+    def send_cached_json(self, path, query_params, loader, cache_seconds):
+        """
+        Serve do cache de respostas da instância (ou carrega com `loader`), com 304 se
+        a cópia do cliente (If-None-Match / If-Modified-Since) ainda vale. A versão
+        comprimida fica guardada na entrada, então só é gerada no primeiro acesso.
+        Retorna False se não houver dados, para o chamador enviar o fallback.
+        """
+        entry = response_cache.get_or_load(path, query_params, loader)
+        if entry is None:
+            return False
+        
+        encoding = negotiate(self.headers.get('Accept-Encoding'), len(entry['body']))
+        etag = variant_etag(entry['etag'], encoding)
+        if is_not_modified(entry, self.headers.get('If-None-Match'), self.headers.get('If-Modified-Since'), etag=etag):
+            self.send_response(304)
+            self.send_common_headers(cache_seconds, etag, entry['last_modified'])
+            self.end_headers()
+            return True
+        
+        body = encoded_body(entry, encoding) if encoding else entry['body']
+        self.send_json_bytes(body, cache_seconds=cache_seconds, etag=entry['etag'],
+                             last_modified=entry['last_modified'], encoding=encoding or '')
+        return True
 
     def do_GET(self):
         # Parse da URL
@@ -1051,6 +1383,9 @@ class handler(BaseHTTPRequestHandler):
         path = parsed_path.path
         query_params = urllib.parse.parse_qs(parsed_path.query)
         
+        # 👁️ Grava as visualizações acumuladas se já passou do intervalo
+        view_counter.flush_if_due()
+        
         # ✅ CORREÇÃO: Aplicar rate limiting
         rate_limit_error = apply_rate_limit(dict(self.headers), path)
         if rate_limit_error:
@@ -1076,8 +1411,8 @@ class handler(BaseHTTPRequestHandler):
             response = {
                 "message": "API do Scraper UENF funcionando!",
                 "endpoints": {
-                    "GET": ["/api/health", "/api/test", "/api/config-test", "/api/bolsas", "/api/bolsas/{id}", "/api/analytics", "/api/editais", "/api/ranking", "/api/metadata", "/api/telegram/setup-webhook", "/api/telegram/debug-webhook", "/api/telegram/test-webhook", "/api/telegram/check-messages", "/api/telegram/logs", "/api/telegram/force-update-webhook", "/api/telegram/detect-production-url", "/api/force-cache-refresh", "/api/process-notifications"],
-                    "POST": ["/api/alertas/telegram", "/api/alertas/notify", "/api/alertas/test-detection", "/api/alertas/listar", "/api/telegram/webhook"]
+                    "GET": ["/api/health", "/api/test", "/api/config-test", "/api/bolsas", "/api/bolsas/{id}", "/api/analytics", "/api/analytics/timeseries", "/api/editais", "/api/ranking", "/api/metadata", "/api/telegram/setup-webhook", "/api/telegram/debug-webhook", "/api/telegram/test-webhook", "/api/telegram/check-messages", "/api/telegram/logs", "/api/telegram/force-update-webhook", "/api/telegram/detect-production-url", "/api/force-cache-refresh", "/api/process-notifications"],
+                    "POST": ["/api/alertas/telegram", "/api/alertas/notify", "/api/alertas/test-detection", "/api/alertas/listar", "/api/telegram/webhook", "/api/views/batch"]
                 },
                 "status": "ok",
                 "whatsapp_alerts": "✅ Configurado"
@@ -1088,9 +1423,13 @@ class handler(BaseHTTPRequestHandler):
             response = {
                 "status": "healthy",
                 "message": "Backend funcionando na Vercel!",
-                "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+                "timestamp": datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+                "supabase": supabase_pool.health(),  # Reuso do cliente/conexões nesta instância
+                "views": view_counter.health(),  # Visualizações acumuladas/gravadas em lote
+                "response_cache": response_cache.health(),  # Respostas servidas da memória
+                "row_bytes": row_bytes.health()  # Linhas já serializadas reaproveitadas
             }
-            return self.send_json_response(response, cache_seconds=60)  # 1 min cache
+            return self.send_json_response(response, cache_seconds=0)
             
         elif path == '/api/test':
             response = {
@@ -1119,13 +1458,19 @@ class handler(BaseHTTPRequestHandler):
             increment_view_param = query_params.get('increment_view', ['true'])[0]
             increment_view = increment_view_param.lower() != 'false'
             
-            # Tentar buscar bolsa específica do Supabase
-            bolsa_data = get_bolsa_by_id(bolsa_id, increment_view=increment_view)
+            if not increment_view:
+                # Sem incrementar view a resposta não muda a cada acesso: vem do cache da instância
+                if self.send_cached_json(path, query_params,
+                                         lambda: get_bolsa_by_id(bolsa_id, increment_view=False), cache_seconds=300):
+                    return
+                bolsa_data = None
+            else:
+                # Tentar buscar bolsa específica do Supabase
+                bolsa_data = get_bolsa_by_id(bolsa_id, increment_view=True)
             
             if bolsa_data:
-                # Dados reais do Supabase
-                cache_time = 0 if increment_view else 300  # Sem cache se incrementou view
-                return self.send_json_response(bolsa_data, cache_seconds=cache_time)
+                # Dados reais do Supabase - sem cache, pois incrementou view
+                return self.send_json_response(bolsa_data, cache_seconds=0)
             else:
                 # Bolsa não encontrada
                 response = {
@@ -1136,12 +1481,10 @@ class handler(BaseHTTPRequestHandler):
                 return self.send_json_response(response, status_code=404, cache_seconds=300)
                 
         elif path == '/api/bolsas':
-            # Tentar buscar dados reais do Supabase
-            bolsas_data = get_bolsas_from_supabase(query_params)
-            
-            if bolsas_data:
-                # Dados reais do Supabase - cache médio (15 min)
-                return self.send_json_response(bolsas_data, cache_seconds=0)
+            # Tentar buscar dados reais do Supabase (ou do cache de respostas da instância)
+            carregar = com_linhas_em_cache(lambda: get_bolsas_from_supabase(query_params), 'bolsas', rows_key='bolsas')
+            if self.send_cached_json(path, query_params, carregar, cache_seconds=0):
+                return
             else:
                 # Fallback para dados mock
                 response = {
@@ -1156,34 +1499,27 @@ class handler(BaseHTTPRequestHandler):
                 return self.send_json_response(response, cache_seconds=60)
                 
         elif path == '/api/ranking':
-            # Tentar buscar dados reais do Supabase
-            ranking_data = get_ranking_from_supabase(query_params)
-            
-            if ranking_data:
-                # Dados reais do Supabase - cache médio (30 min)
-                return self.send_json_response(ranking_data, cache_seconds=0)
+            # Tentar buscar dados reais do Supabase (ou do cache de respostas da instância)
+            carregar = com_linhas_em_cache(lambda: get_ranking_from_supabase(query_params), 'ranking')
+            if self.send_cached_json(path, query_params, carregar, cache_seconds=0):
+                return
             else:
                 # Fallback para dados mock
                 return self.send_json_response([], cache_seconds=60)
                 
         elif path == '/api/editais':
-            # Tentar buscar dados reais do Supabase
-            editais_data = get_editais_from_supabase(query_params)
-            
-            if editais_data:
-                # Dados reais do Supabase - cache médio (15 min)
-                return self.send_json_response(editais_data, cache_seconds=900)
+            # Tentar buscar dados reais do Supabase (ou do cache de respostas da instância)
+            carregar = com_linhas_em_cache(lambda: get_editais_from_supabase(query_params), 'editais')
+            if self.send_cached_json(path, query_params, carregar, cache_seconds=900):
+                return
             else:
                 # Fallback para dados mock
                 return self.send_json_response([], cache_seconds=60)
                 
         elif path == '/api/analytics':
-            # Endpoint de analytics
-            analytics_data = get_analytics_from_supabase()
-            
-            if analytics_data:
-                # Dados reais do Supabase - cache longo (1 hora)
-                return self.send_json_response(analytics_data, cache_seconds=3600)
+            # Endpoint de analytics (ou do cache de respostas da instância)
+            if self.send_cached_json(path, query_params, get_analytics_from_supabase, cache_seconds=3600):
+                return
             else:
                 # Fallback para dados mock
                 response = {
@@ -1196,6 +1532,19 @@ class handler(BaseHTTPRequestHandler):
                     "message": "Usando dados mock - Supabase não conectado"
                 }
                 return self.send_json_response(response, cache_seconds=60)
+                
+        elif path == '/api/analytics/timeseries':
+            # Série temporal lida só dos rollups (ou do cache de respostas da instância)
+            if self.send_cached_json(path, query_params, lambda: get_timeseries_from_supabase(query_params), cache_seconds=3600):
+                return
+            else:
+                # Fallback para dados mock
+                response = {
+                    "series": {},
+                    "status": "mock_data",
+                    "message": "Usando dados mock - Supabase não conectado"
+                }
+                return self.send_json_response(response, cache_seconds=60)
         elif path == '/api/scrape':
             # Endpoint para executar scraping manualmente ou via cron
             try:
@@ -1240,12 +1589,9 @@ class handler(BaseHTTPRequestHandler):
                 return self.send_json_response(response, status_code=500, cache_seconds=0)
                 
         elif path == '/api/metadata':
-            # Tentar buscar dados reais do Supabase
-            metadata = get_metadata_from_supabase()
-            
-            if metadata:
-                # Dados reais do Supabase - cache médio (15 min)
-                return self.send_json_response(metadata, cache_seconds=900)
+            # Tentar buscar dados reais do Supabase (ou do cache de respostas da instância)
+            if self.send_cached_json(path, query_params, get_metadata_from_supabase, cache_seconds=900):
+                return
             else:
                 # Fallback para dados mock se Supabase não estiver disponível
                 response = {
@@ -1259,12 +1605,13 @@ class handler(BaseHTTPRequestHandler):
         elif path == '/api/force-cache-refresh':
             # Forçar refresh do cache e dados
             try:
+                response_cache.clear()
                 response = {
                     "status": "cache_refreshed",
                     "message": "Cache invalidado - dados serão recarregados",
                     "timestamp": datetime.now(timezone.utc).isoformat(),
                     "actions": [
-                        "1. Cache do frontend invalidado",
+                        "1. Cache do frontend e das respostas desta instância invalidado",
                         "2. Dados serão recarregados na próxima requisição",
                         "3. Views do banco serão refrescadas"
                     ]
@@ -1657,8 +2004,8 @@ class handler(BaseHTTPRequestHandler):
                 "error": "Endpoint não encontrado",
                 "path": path,
                 "available_endpoints": {
-                    "GET": ["/api/", "/api/health", "/api/bolsas", "/api/bolsas/{id}", "/api/analytics", "/api/editais", "/api/ranking", "/api/metadata", "/api/telegram/setup-webhook", "/api/telegram/debug-webhook", "/api/telegram/test-webhook", "/api/telegram/check-messages", "/api/telegram/logs", "/api/telegram/force-update-webhook", "/api/telegram/detect-production-url", "/api/force-cache-refresh", "/api/process-notifications"],
-                    "POST": ["/api/alertas/telegram", "/api/alertas/notify", "/api/alertas/test-detection", "/api/alertas/listar", "/api/telegram/webhook"]
+                    "GET": ["/api/", "/api/health", "/api/bolsas", "/api/bolsas/{id}", "/api/analytics", "/api/analytics/timeseries", "/api/editais", "/api/ranking", "/api/metadata", "/api/telegram/setup-webhook", "/api/telegram/debug-webhook", "/api/telegram/test-webhook", "/api/telegram/check-messages", "/api/telegram/logs", "/api/telegram/force-update-webhook", "/api/telegram/detect-production-url", "/api/force-cache-refresh", "/api/process-notifications"],
+                    "POST": ["/api/alertas/telegram", "/api/alertas/notify", "/api/alertas/test-detection", "/api/alertas/listar", "/api/telegram/webhook", "/api/views/batch"]
                 }
             }
             return self.send_json_response(response, status_code=404, cache_seconds=300)
@@ -1668,6 +2015,9 @@ class handler(BaseHTTPRequestHandler):
         parsed_path = urllib.parse.urlparse(self.path)
         path = parsed_path.path
         
+        # 👁️ Grava as visualizações acumuladas se já passou do intervalo
+        view_counter.flush_if_due()
+        
         # ✅ CORREÇÃO: Aplicar rate limiting em POST também
         rate_limit_error = apply_rate_limit(dict(self.headers), path)
         if rate_limit_error:
@@ -1798,8 +2148,9 @@ class handler(BaseHTTPRequestHandler):
                     bolsa_id = path_parts[3]
                     session_id = data.get('session_id', '')
                     
-                    if not session_id:
-                        response = {"status": "error", "message": "session_id é obrigatório"}
+                    erro_sessao = validar_session_id(session_id)
+                    if erro_sessao:
+                        response = {"status": "error", "message": erro_sessao}
                         return self.send_json_response(response, status_code=400, cache_seconds=0)
                     
                     result = increment_bolsa_view_with_session(bolsa_id, session_id)
@@ -1814,6 +2165,18 @@ class handler(BaseHTTPRequestHandler):
                 response = {"status": "error", "message": f"Erro interno: {str(e)}"}
                 return self.send_json_response(response, status_code=500, cache_seconds=0)
         
+        elif path == '/api/views/batch':
+            # Lote de visualizações: POST /api/views/batch {"session_id": "...", "bolsa_ids": [...]}
+            session_id = data.get('session_id', '')
+            erro_sessao = validar_session_id(session_id)
+            if erro_sessao:
+                response = {"status": "error", "message": erro_sessao}
+                return self.send_json_response(response, status_code=400, cache_seconds=0)
+            
+            result = register_view_batch(data.get('bolsa_ids'), session_id)
+            status_code = 200 if result.get("status") == "success" else 400
+            return self.send_json_response(result, status_code=status_code, cache_seconds=0)
+        
         elif path == '/api/telegram/webhook':
             # Webhook do Telegram - recebe mensagens dos usuários
             try:
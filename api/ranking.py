@@ -0,0 +1,121 @@
+"""
+Ranking de bolsas mantido em memória
+Em vez de ordenar a tabela inteira por view_count a cada requisição, o ranking é
+mantido incrementalmente a partir das visualizações (algoritmo Space-Saving: no
+máximo `capacity` bolsas acompanhadas, com um heap para achar a menor), junto com
+uma pontuação de "em alta" que decai com o tempo. As contagens vêm sempre do banco
+(bolsas.unique_viewers); só a pontuação em alta, que não existe no banco, é salva
+periodicamente (checkpoint) para que uma instância nova não comece sem ela.
+"""
+import os
+import math
+import time
+import heapq
+import threading
+
+# Acima disso o fator de decaimento acumulado é renormalizado (evita overflow)
+_MAX_EXPOENTE = 50.0
+
+
+class RankingTracker:
+    """
+    Top-K de bolsas por visualizações, com pontuação "em alta" (trending).
+
+    - `record(bolsa_id)` é O(log K): soma a visualização ao contador e à pontuação;
+    - Quando a estrutura está cheia, uma bolsa nova substitui a de menor contagem e
+      herda essa contagem como erro máximo (garantia do Space-Saving: bolsas realmente
+      populares nunca saem do topo);
+    - A pontuação em alta usa decaimento exponencial "para frente": cada visualização
+      vale exp(λ·(t - marco)), então comparar pontuações não exige recalcular nada;
+      `half_life_seconds` é o tempo para uma visualização valer metade.
+
+    Configuração: RANKING_CAPACITY (padrão 200) e RANKING_HALF_LIFE_SECONDS (padrão 86400).
+    """
+
+    def __init__(self, capacity: int = None, half_life_seconds: float = None, clock=time.time):
+        self.capacity = capacity or int(os.environ.get("RANKING_CAPACITY", "200"))
+        self.half_life_seconds = half_life_seconds or float(os.environ.get("RANKING_HALF_LIFE_SECONDS", "86400"))
+        self._decay = math.log(2) / self.half_life_seconds
+        self._clock = clock
+        self._landmark = clock()
+        self.counts = {}
+        self.errors = {}
+        self.trending = {}
+        self._heap = []
+        self.seeded_at = None
+        self._lock = threading.Lock()
+
+    def _push(self, bolsa_id):
+        heapq.heappush(self._heap, (self.counts[bolsa_id], bolsa_id))
+        if len(self._heap) > 4 * self.capacity:
+            # Remove as entradas desatualizadas acumuladas (heap "preguiçoso")
+            self._heap = [(c, b) for b, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _evict_min(self):
+        while self._heap:
+            count, bolsa_id = heapq.heappop(self._heap)
+            if self.counts.get(bolsa_id) == count:
+                del self.counts[bolsa_id]
+                self.errors.pop(bolsa_id, None)
+                self.trending.pop(bolsa_id, None)
+                return count
+        return 0
+
+    def _weight(self, now):
+        expoente = self._decay * (now - self._landmark)
+        if expoente > _MAX_EXPOENTE:
+            fator = math.exp(-expoente)
+            self.trending = {b: s * fator for b, s in self.trending.items()}
+            self._landmark = now
+            expoente = 0.0
+        return math.exp(expoente)
+
+    def record(self, bolsa_id: str, weight: int = 1):
+        with self._lock:
+            if bolsa_id not in self.counts:
+                minimo = self._evict_min() if len(self.counts) >= self.capacity else 0
+                self.counts[bolsa_id] = minimo
+                self.errors[bolsa_id] = minimo
+            self.counts[bolsa_id] += weight
+            self.trending[bolsa_id] = self.trending.get(bolsa_id, 0.0) + weight * self._weight(self._clock())
+            self._push(bolsa_id)
+
+    def seed(self, counts: dict):
+        """Carrega as contagens do banco (fonte da verdade); a pontuação em alta é mantida."""
+        with self._lock:
+            melhores = sorted(counts.items(), key=lambda item: item[1], reverse=True)[:self.capacity]
+            self.counts = {bolsa_id: count for bolsa_id, count in melhores}
+            self.errors = {bolsa_id: 0 for bolsa_id in self.counts}
+            self.trending = {b: s for b, s in self.trending.items() if b in self.counts}
+            self._heap = [(c, b) for b, c in self.counts.items()]
+            heapq.heapify(self._heap)
+            self.seeded_at = self._clock()
+
+    def top(self, limit: int = 10, trending: bool = False) -> list:
+        """[(bolsa_id, pontuação)] em ordem decrescente; a pontuação em alta já vem decaída para agora."""
+        with self._lock:
+            if trending:
+                fator = math.exp(-self._decay * (self._clock() - self._landmark))
+                return [(b, s * fator) for b, s in heapq.nlargest(limit, self.trending.items(), key=lambda item: item[1])]
+            return heapq.nlargest(limit, self.counts.items(), key=lambda item: item[1])
+
+    def to_checkpoint(self) -> dict:
+        """Só a pontuação em alta (as contagens são relidas do banco)."""
+        with self._lock:
+            fator = math.exp(-self._decay * (self._clock() - self._landmark))
+            return {
+                'saved_at': self._clock(),
+                'trending': {b: s * fator for b, s in self.trending.items()},
+            }
+
+    def load_checkpoint(self, checkpoint: dict):
+        """
+        Restaura a pontuação em alta de um checkpoint, decaída pelo tempo desde que foi
+        salvo; chamar depois de `seed` (só as bolsas acompanhadas recebem pontuação).
+        """
+        agora = self._clock()
+        fator = math.exp(-self._decay * max(0.0, agora - checkpoint.get('saved_at', agora)))
+        with self._lock:
+            self._landmark = agora
+            self.trending = {b: s * fator for b, s in (checkpoint.get('trending') or {}).items() if b in self.counts}
@@ -0,0 +1,288 @@
+"""
+Cache de respostas em memória para o handler da Vercel
+Guarda o corpo JSON já serializado (bytes), com chave = caminho normalizado +
+parâmetros ordenados, TTL por endpoint e descarte LRU. Uma entrada vencida ainda
+pode ser servida por um tempo (stale-while-revalidate) enquanto uma única
+atualização roda em segundo plano. Requisições idênticas simultâneas que não
+estão no cache viram uma única consulta ao Supabase (SingleFlight).
+Cada entrada tem um ETag forte derivado da época dos dados + chave da requisição
+(sem calcular hash do corpo) e Last-Modified = instante da época, iguais em todas as
+instâncias, usados para responder 304 a requisições condicionais.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+import urllib.parse
+import email.utils
+from datetime import datetime, timezone
+from collections import OrderedDict
+
+# TTL (segundos) das respostas por endpoint; endpoints fora da lista não são guardados
+DEFAULT_TTLS = {
+    '/api/bolsas': 30,
+    '/api/bolsas/{id}': 300,
+    '/api/ranking': 30,
+    '/api/editais': 300,
+    '/api/metadata': 60,
+    '/api/analytics': 300,
+    '/api/analytics/timeseries': 300,
+}
+
+
+def serialize_json(data) -> bytes:
+    """Serializa a resposta uma única vez (mesmo formato de antes: UTF-8 sem escapar acentos)."""
+    return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def normalize_path(path: str) -> str:
+    """'/api/bolsas/' -> '/api/bolsas'; '/api/bolsas/<id>' -> '/api/bolsas/{id}' (para achar o TTL)."""
+    path = path.rstrip('/') or '/'
+    partes = path.split('/')
+    if len(partes) == 4 and partes[1] == 'api' and partes[2] == 'bolsas':
+        return '/api/bolsas/{id}'
+    return path
+
+
+def http_date(timestamp: float) -> str:
+    return email.utils.formatdate(timestamp, usegmt=True)
+
+
+def epoch_timestamp(epoch):
+    """Instante (Unix) da época dos dados ('2025-03-10T11:00:00+00:00'), ou None se não houver/for ilegível."""
+    if not epoch:
+        return None
+    try:
+        instante = datetime.fromisoformat(str(epoch).strip('"').replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if instante.tzinfo is None:
+        instante = instante.replace(tzinfo=timezone.utc)
+    return instante.timestamp()
+
+
+def make_etag(epoch, key: str, body: bytes) -> str:
+    """
+    ETag determinístico: hash(época + chave), o mesmo em qualquer instância e após cold
+    start. Sem época conhecida, usa um hash curto do corpo.
+    """
+    if epoch:
+        return f'"{hashlib.sha1(f"{epoch}|{key}".encode("utf-8")).hexdigest()[:16]}"'
+    return f'"b{hashlib.sha1(key.encode("utf-8") + b"|" + body).hexdigest()[:16]}"'
+
+
+def is_not_modified(entry: dict, if_none_match: str = None, if_modified_since: str = None, etag: str = None) -> bool:
+    """
+    A cópia do cliente ainda vale? If-None-Match tem precedência sobre If-Modified-Since
+    (comparação fraca de ETags, como manda o HTTP para requisições GET). `etag` é o da
+    representação enviada (ex: versão comprimida); por padrão, o da entrada.
+    """
+    if if_none_match:
+        etag = etag or entry['etag']
+        tags = [tag.strip() for tag in if_none_match.split(',')]
+        return '*' in tags or any(tag.removeprefix('W/') == etag for tag in tags)
+    if if_modified_since and entry.get('last_modified') is not None:
+        try:
+            desde = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(entry['last_modified']) <= desde
+    return False
+
+
+def make_key(path: str, query_params: dict) -> str:
+    """Chave da resposta: caminho sem barra final + parâmetros em ordem alfabética."""
+    itens = sorted((k, v) for k, valores in query_params.items() for v in valores)
+    return f"{path.rstrip('/') or '/'}?{urllib.parse.urlencode(itens)}"
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave: a primeira executa a função e as
+    que chegam enquanto ela roda esperam e recebem o mesmo resultado (ou a mesma exceção).
+    Mesma ideia de backend/cache.py, que a api/ não importa.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'executions': 0, 'collapsed': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                self.stats['executions'] += 1
+            else:
+                self.stats['collapsed'] += 1
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+    def health(self) -> dict:
+        with self._lock:
+            return dict(self.stats)
+
+
+class ResponseCache:
+    """
+    Respostas serializadas com TTL e LRU.
+
+    - Dentro do TTL: servida direto da memória;
+    - Vencida há menos de `stale_factor` x TTL: servida assim mesmo, e uma única
+      atualização em segundo plano é disparada para a chave;
+    - Mais velha que isso, de outra época dos dados ou ausente: carregada na hora.
+    Só respostas com dados (loader devolvendo algo verdadeiro) são guardadas. Cargas
+    simultâneas da mesma chave (inclusive a atualização em segundo plano) são agrupadas.
+
+    A época (`epoch_loader()`, ex: metadata.last_data_update) é relida no máximo a cada
+    `epoch_check_seconds`. O ETag de uma entrada é hash(época + chave) e o Last-Modified é
+    o instante da época, então todas as instâncias respondem igual à mesma requisição
+    condicional. Mudanças dentro da mesma época (ex: contagens de visualizações) não
+    mudam o ETag: o cliente só as vê quando a época muda ou o max-age vence sem 304.
+
+    `serializer` transforma os dados em bytes (padrão: json da biblioteca padrão); um
+    loader também pode devolver os bytes prontos.
+
+    Configuração: RESPONSE_CACHE=0 desliga, RESPONSE_CACHE_MAX_ENTRIES (256),
+    RESPONSE_CACHE_STALE_FACTOR (5) e RESPONSE_CACHE_EPOCH_CHECK_SECONDS (30).
+    """
+
+    def __init__(self, ttls: dict = None, max_entries: int = None, stale_factor: float = None,
+                 enabled: bool = None, epoch_loader=None, epoch_check_seconds: float = None,
+                 serializer=serialize_json, clock=time.monotonic):
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.max_entries = max_entries or int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "256"))
+        self.stale_factor = stale_factor if stale_factor is not None else float(
+            os.environ.get("RESPONSE_CACHE_STALE_FACTOR", "5"))
+        self.enabled = enabled if enabled is not None else os.environ.get("RESPONSE_CACHE", "1") != "0"
+        self.epoch_check_seconds = epoch_check_seconds if epoch_check_seconds is not None else float(
+            os.environ.get("RESPONSE_CACHE_EPOCH_CHECK_SECONDS", "30"))
+        self._epoch_loader = epoch_loader
+        self._serializer = serializer
+        self._epoch = None
+        self._epoch_checked_at = None
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'stale_epoch': 0, 'refreshes': 0,
+                      'refresh_failures': 0, 'evictions': 0}
+
+    def ttl_for(self, path: str):
+        return self.ttls.get(normalize_path(path))
+
+    def current_epoch(self):
+        """Época dos dados, relida quando a última leitura já passou do intervalo."""
+        with self._lock:
+            agora = self._clock()
+            if self._epoch_checked_at is not None and agora - self._epoch_checked_at < self.epoch_check_seconds:
+                return self._epoch
+            self._epoch_checked_at = agora
+        if self._epoch_loader is None:
+            return self._epoch
+        try:
+            epoch = self._epoch_loader()
+        except Exception as e:
+            # Sem conseguir ler a época, mantém a anterior (o TTL continua limitando a idade)
+            print(f"⚠️ Falha ao ler a época dos dados: {e}")
+            return self._epoch
+        with self._lock:
+            self._epoch = epoch
+        return epoch
+
+    def _new_entry(self, key, body, ttl, epoch):
+        return {'body': body, 'etag': make_etag(epoch, key, body), 'last_modified': epoch_timestamp(epoch),
+                'created': self._clock(), 'ttl': ttl, 'epoch': epoch}
+
+    def _load(self, key, loader, ttl, epoch):
+        def carregar():
+            data = loader()
+            if not data:
+                return None
+            body = data if isinstance(data, bytes) else self._serializer(data)
+            if not ttl:
+                return self._new_entry(key, body, ttl, epoch)
+            with self._lock:
+                entry = self._new_entry(key, body, ttl, epoch)
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.stats['evictions'] += 1
+            return entry
+        return self.flights.do((key, epoch), carregar)
+
+    def _refresh(self, key, loader, ttl, epoch):
+        try:
+            self._load(key, loader, ttl, epoch)
+            resultado = 'refreshes'
+        except Exception as e:
+            print(f"⚠️ Falha ao atualizar resposta em cache ({key}): {e}")
+            resultado = 'refresh_failures'
+        with self._lock:
+            self.stats[resultado] += 1
+            self._refreshing.discard(key)
+
+    def get_or_load(self, path: str, query_params: dict, loader):
+        """
+        Entrada da resposta ({'body': bytes, 'etag', 'last_modified', ...}), do cache ou
+        de `loader()` (que devolve os dados ou algo falso em caso de falha).
+        Retorna None se não houver dados.
+        """
+        ttl = self.ttl_for(path)
+        key = make_key(path, query_params)
+        epoch = self.current_epoch()
+        if not self.enabled or not ttl:
+            return self._load(key, loader, None, epoch)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry['epoch'] != epoch:
+                self.stats['stale_epoch'] += 1
+            elif entry is not None:
+                idade = self._clock() - entry['created']
+                if idade < entry['ttl']:
+                    self._entries.move_to_end(key)
+                    self.stats['hits'] += 1
+                    return entry
+                if idade < entry['ttl'] * self.stale_factor:
+                    self._entries.move_to_end(key)
+                    self.stats['stale_hits'] += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh, args=(key, loader, ttl, epoch), daemon=True).start()
+                    return entry
+            self.stats['misses'] += 1
+
+        return self._load(key, loader, ttl, epoch)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._epoch_checked_at = None
+
+    def health(self) -> dict:
+        collapsed = self.flights.health()['collapsed']
+        with self._lock:
+            return dict(self.stats, entries=len(self._entries), epoch=self._epoch, collapsed=collapsed)
@@ -0,0 +1,155 @@
+"""
+Cliente Supabase reutilizado entre requisições
+Em vez de criar um cliente (e abrir novas conexões TLS) em cada função de dados, o
+cliente é criado uma única vez por instância e reaproveitado enquanto ela estiver
+"quente". O cliente HTTP interno do Supabase mantém as conexões abertas (keep-alive),
+então requisições seguidas reutilizam a mesma conexão.
+"""
+import os
+import time
+import threading
+from datetime import datetime, timezone
+
+try:
+    from supabase import create_client
+    SUPABASE_AVAILABLE = True
+except ImportError:
+    create_client = None
+    SUPABASE_AVAILABLE = False
+
+
+class SupabaseClientPool:
+    """
+    Cliente Supabase preguiçoso (criado no primeiro uso) com verificação de saúde.
+
+    - Se o cliente ficou parado mais que `idle_probe_seconds` (a instância pode ter sido
+      congelada entre invocações e as conexões derrubadas) ou se uma função de dados
+      reportou erro, uma consulta mínima confirma que ele ainda responde;
+    - Se a verificação falhar, o cliente é recriado.
+
+    A verificação (uma ida à rede) roda fora do lock: enquanto uma requisição verifica o
+    cliente, as demais continuam usando o mesmo cliente em vez de esperar na fila.
+    """
+
+    def __init__(self, idle_probe_seconds: float = None, clock=time.monotonic, client_factory=None):
+        self.idle_probe_seconds = idle_probe_seconds if idle_probe_seconds is not None else float(
+            os.environ.get("SUPABASE_IDLE_PROBE_SECONDS", "60"))
+        self._clock = clock
+        self._client_factory = client_factory or self._create_from_env
+        self._client = None
+        self._last_used = None
+        self._suspect = False
+        self._probing = False
+        self._lock = threading.Lock()
+        self.stats = {
+            'created': 0,
+            'reused': 0,
+            'probes': 0,
+            'probe_failures': 0,
+            'reconnects': 0,
+            'errors_reported': 0,
+            'last_error': None,
+            'created_at': None,
+        }
+
+    @staticmethod
+    def _create_from_env():
+        supabase_url = os.environ.get("SUPABASE_URL")
+        supabase_key = os.environ.get("SUPABASE_KEY")
+        if not SUPABASE_AVAILABLE or not supabase_url or not supabase_key:
+            return None
+        return create_client(supabase_url, supabase_key)
+
+    def _create(self):
+        try:
+            client = self._client_factory()
+        except Exception as e:
+            print(f"Erro ao conectar Supabase: {e}")
+            self.stats['last_error'] = str(e)
+            return None
+        if client is None:
+            return None
+        self.stats['created'] += 1
+        self.stats['created_at'] = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        return client
+
+    def _probe(self, client):
+        """Consulta mínima para confirmar que o cliente (e a conexão) ainda respondem.
+
+        Chamado fora do lock; devolve None se respondeu ou o erro se falhou.
+        """
+        try:
+            client.table('metadata').select('key').limit(1).execute()
+            return None
+        except Exception as e:
+            print(f"⚠️ Cliente Supabase não respondeu à verificação de saúde: {e}")
+            return e
+
+    def get(self):
+        """Cliente pronto para uso (ou None se o Supabase não estiver configurado)."""
+        with self._lock:
+            agora = self._clock()
+            if self._client is None:
+                self._client = self._create()
+                self._suspect = False
+                if self._client is not None:
+                    self._last_used = agora
+                return self._client
+            parado = self._last_used is not None and agora - self._last_used > self.idle_probe_seconds
+            if not (parado or self._suspect) or self._probing:
+                # Saudável, ou outra requisição já está verificando: usa o cliente atual
+                self.stats['reused'] += 1
+                self._last_used = agora
+                return self._client
+            self._probing = True
+            self.stats['probes'] += 1
+            client = self._client
+
+        erro = self._probe(client)
+
+        with self._lock:
+            self._probing = False
+            if erro is None:
+                self._suspect = False
+                self.stats['reused'] += 1
+            else:
+                self.stats['probe_failures'] += 1
+                self.stats['last_error'] = str(erro)
+                # Só recria se ninguém trocou o cliente durante a verificação (ex.: reset)
+                if self._client is client:
+                    self.stats['reconnects'] += 1
+                    self._client = self._create()
+                    self._suspect = False
+            if self._client is not None:
+                self._last_used = self._clock()
+            return self._client
+
+    def report_error(self, error: Exception = None):
+        """Uma consulta falhou: o próximo `get` verifica a saúde do cliente antes de reutilizá-lo."""
+        with self._lock:
+            self._suspect = True
+            self.stats['errors_reported'] += 1
+            if error is not None:
+                self.stats['last_error'] = str(error)
+
+    def reset(self):
+        with self._lock:
+            self._client = None
+            self._last_used = None
+            self._suspect = False
+            self._probing = False
+
+    def health(self) -> dict:
+        """Métricas para o /api/health."""
+        with self._lock:
+            total = self.stats['created'] + self.stats['reused']
+            return dict(
+                self.stats,
+                connected=self._client is not None,
+                idle_seconds=round(self._clock() - self._last_used, 1) if self._last_used is not None else None,
+                warm_reuse_ratio=round(self.stats['reused'] / total, 3) if total else None,
+            )
+
+
+# Instância global (uma por instância quente da função serverless)
+supabase_pool = SupabaseClientPool()
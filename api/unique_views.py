@@ -0,0 +1,187 @@
+"""
+Visualizações únicas por sessão com memória limitada
+- Um filtro de Bloom com rotação lembra os pares (bolsa, sessão) vistos recentemente,
+  para que recarregar a página não conte a mesma sessão de novo;
+- Um HyperLogLog por bolsa estima quantas sessões distintas já viram a bolsa. O
+  esboço é gravado no banco (bolsas.unique_viewers_hll) e mesclado lá pela RPC
+  `merge_unique_viewers` (máximo registrador a registrador), então instâncias
+  diferentes somam seus esboços sem contar a mesma sessão duas vezes.
+"""
+import os
+import math
+import time
+import base64
+import hashlib
+import threading
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+class HyperLogLog:
+    """HyperLogLog com 2^precision registradores de 1 byte (precisão 10: 1 KB, erro ~3%)."""
+
+    def __init__(self, precision: int = 10, registers: bytes = None):
+        self.precision = precision
+        self.m = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.m)
+        if len(self.registers) != self.m:
+            raise ValueError(f"esperados {self.m} registradores, recebidos {len(self.registers)}")
+
+    def add(self, item: str) -> bool:
+        """Adiciona um item; retorna True se o esboço mudou."""
+        x = _hash64(item)
+        index = x >> (64 - self.precision)
+        resto = x & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - resto.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+            return True
+        return False
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimativa = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimativa <= 2.5 * m and zeros:
+            estimativa = m * math.log(m / zeros)  # Correção para cardinalidades pequenas
+        return int(round(estimativa))
+
+    def merge(self, other: "HyperLogLog"):
+        if other.m != self.m:
+            raise ValueError("esboços com precisões diferentes")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def to_base64(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode('ascii')
+
+    @classmethod
+    def from_base64(cls, encoded: str, precision: int = 10) -> "HyperLogLog":
+        return cls(precision, base64.b64decode(encoded))
+
+
+class BloomFilter:
+    """Filtro de Bloom de tamanho fixo, dimensionado para `capacity` itens com `error_rate` de falso positivo."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, int(round(self.size / capacity * math.log(2))))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+    def add(self, item: str):
+        for p in self._positions(item):
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+
+class RotatingBloomFilter:
+    """
+    Duas gerações de filtro de Bloom: um item é "recente" se está em qualquer uma.
+    A geração atual vira a anterior a cada `rotate_seconds` (ou ao encher), então um
+    par (bolsa, sessão) é lembrado entre 1x e 2x esse intervalo, com memória fixa.
+    """
+
+    def __init__(self, capacity: int = 50000, error_rate: float = 0.01, rotate_seconds: float = 21600,
+                 clock=time.monotonic):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.rotate_seconds = rotate_seconds
+        self._clock = clock
+        self._current = BloomFilter(capacity, error_rate)
+        self._previous = None
+        self._rotated_at = clock()
+
+    def _maybe_rotate(self):
+        if self._clock() - self._rotated_at >= self.rotate_seconds or self._current.count >= self.capacity:
+            self._previous, self._current = self._current, BloomFilter(self.capacity, self.error_rate)
+            self._rotated_at = self._clock()
+
+    def check_and_add(self, item: str) -> bool:
+        """Retorna True se o item já foi visto recentemente; caso contrário, registra e retorna False."""
+        self._maybe_rotate()
+        if item in self._current or (self._previous is not None and item in self._previous):
+            return True
+        self._current.add(item)
+        return False
+
+
+class UniqueViewTracker:
+    """
+    Decide se uma visualização conta (sessão nova para a bolsa) e mantém os esboços
+    HyperLogLog das bolsas que mudaram até serem gravados. Depois de gravado, o esboço
+    sai da memória (fica só a estimativa devolvida pelo banco).
+
+    Configuração: VIEW_DEDUP_WINDOW_SECONDS (padrão 21600 = 6h) e VIEW_DEDUP_CAPACITY.
+    """
+
+    def __init__(self, precision: int = 10, dedup_window_seconds: float = None, dedup_capacity: int = None,
+                 clock=time.monotonic):
+        self.precision = precision
+        self._recent = RotatingBloomFilter(
+            capacity=dedup_capacity or int(os.environ.get("VIEW_DEDUP_CAPACITY", "50000")),
+            rotate_seconds=dedup_window_seconds if dedup_window_seconds is not None else float(
+                os.environ.get("VIEW_DEDUP_WINDOW_SECONDS", "21600")),
+            clock=clock,
+        )
+        self._dirty = {}
+        self.unique_counts = {}
+        self._lock = threading.Lock()
+        self.stats = {'observed': 0, 'duplicates': 0, 'sketches_persisted': 0, 'persist_failures': 0}
+
+    def observe(self, bolsa_id: str, session_id: str) -> bool:
+        """Registra a sessão na bolsa; retorna False se a sessão já viu esta bolsa recentemente."""
+        with self._lock:
+            self.stats['observed'] += 1
+            if self._recent.check_and_add(f"{bolsa_id}:{session_id}"):
+                self.stats['duplicates'] += 1
+                return False
+            sketch = self._dirty.get(bolsa_id)
+            if sketch is None:
+                sketch = self._dirty[bolsa_id] = HyperLogLog(self.precision)
+            sketch.add(session_id)
+            return True
+
+    def dirty_count(self) -> int:
+        with self._lock:
+            return len(self._dirty)
+
+    def persist(self, supabase):
+        """Mescla no banco os esboços alterados (RPC merge_unique_viewers)."""
+        with self._lock:
+            lote, self._dirty = self._dirty, {}
+        if not lote:
+            return
+        sketches = [{'bolsa_id': bolsa_id, 'hll': sketch.to_base64()} for bolsa_id, sketch in lote.items()]
+        try:
+            response = supabase.rpc('merge_unique_viewers', {'sketches': sketches}).execute()
+        except Exception as e:
+            print(f"⚠️ Falha ao gravar visualizações únicas de {len(lote)} bolsa(s): {e}")
+            with self._lock:
+                self.stats['persist_failures'] += 1
+                for bolsa_id, sketch in lote.items():
+                    atual = self._dirty.get(bolsa_id)
+                    if atual is not None:
+                        sketch.merge(atual)
+                    self._dirty[bolsa_id] = sketch
+            return
+        with self._lock:
+            self.stats['sketches_persisted'] += len(lote)
+            for item in response.data or []:
+                self.unique_counts[item['bolsa_id']] = item['unique_viewers']
+
+    def health(self) -> dict:
+        with self._lock:
+            return dict(self.stats, dirty_sketches=len(self._dirty))
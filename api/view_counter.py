@@ -0,0 +1,145 @@
+"""
+Contador de visualizações agregado em memória
+Cada visualização só soma +1 em memória; de tempos em tempos (ou ao acumular eventos
+suficientes) os incrementos de todas as bolsas vão ao banco numa única chamada da RPC
+`increment_view_counts`, que soma no próprio UPDATE (sem ler e regravar o valor em
+Python, então incrementos concorrentes não se perdem).
+"""
+import os
+import time
+import uuid
+import atexit
+import threading
+
+
+def normalize_bolsa_id(bolsa_id):
+    """ID da bolsa em formato canônico, ou None se não for um UUID válido."""
+    try:
+        return str(uuid.UUID(str(bolsa_id)))
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+
+class ViewCounter:
+    """
+    Acumula incrementos de visualização por bolsa e grava em lote.
+
+    - `flush_threshold`: grava quando o total de eventos pendentes chega a este valor
+      (VIEW_FLUSH_THRESHOLD, padrão 50);
+    - `flush_interval_seconds`: grava quando o evento pendente mais antigo passa desta
+      idade (VIEW_FLUSH_INTERVAL_SECONDS, padrão 10). Em ambiente serverless não há timer
+      confiável entre invocações, então a verificação é feita a cada requisição
+      (`flush_if_due`) e na saída do processo.
+    Se a gravação falhar, os incrementos voltam para a fila e são tentados de novo.
+    Com `unique_views` (UniqueViewTracker), os esboços de visualizações únicas são
+    gravados junto com os contadores.
+    """
+
+    def __init__(self, client_getter, flush_threshold: int = None, flush_interval_seconds: float = None,
+                 clock=time.monotonic, unique_views=None):
+        self._client_getter = client_getter
+        self.unique_views = unique_views
+        self.flush_threshold = flush_threshold or int(os.environ.get("VIEW_FLUSH_THRESHOLD", "50"))
+        self.flush_interval_seconds = flush_interval_seconds if flush_interval_seconds is not None else float(
+            os.environ.get("VIEW_FLUSH_INTERVAL_SECONDS", "10"))
+        self._clock = clock
+        self._pending = {}
+        self._oldest = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.stats = {'recorded': 0, 'flushes': 0, 'flushed_views': 0, 'flush_failures': 0, 'rpc_fallbacks': 0}
+
+    def record(self, bolsa_id: str, count: int = 1) -> int:
+        """
+        Registra `count` visualizações e retorna quantas estão pendentes para a bolsa
+        (incluindo estas), ou seja, quanto somar ao valor lido do banco.
+        """
+        with self._lock:
+            self._pending[bolsa_id] = self._pending.get(bolsa_id, 0) + count
+            if self._oldest is None:
+                self._oldest = self._clock()
+            self.stats['recorded'] += count
+            pendentes = self._pending[bolsa_id]
+        self.flush_if_due()
+        return pendentes
+
+    def pending(self, bolsa_id: str = None) -> int:
+        with self._lock:
+            if bolsa_id is None:
+                return sum(self._pending.values())
+            return self._pending.get(bolsa_id, 0)
+
+    def flush_if_due(self) -> bool:
+        with self._lock:
+            if not self._pending:
+                return False
+            devido = (sum(self._pending.values()) >= self.flush_threshold
+                      or self._clock() - self._oldest >= self.flush_interval_seconds)
+        if devido:
+            self.flush()
+        return devido
+
+    def flush(self) -> dict:
+        """Grava os incrementos pendentes. Retorna {bolsa_id: view_count atualizado} quando o banco informa."""
+        with self._flush_lock:
+            with self._lock:
+                lote, self._pending, self._oldest = self._pending, {}, None
+            if not lote:
+                return {}
+            total = sum(lote.values())
+
+            try:
+                novos_valores = self._write(lote)
+            except Exception as e:
+                print(f"⚠️ Falha ao gravar {sum(lote.values())} de {total} visualização(ões): {e}")
+                with self._lock:
+                    self.stats['flush_failures'] += 1
+                    for bolsa_id, delta in lote.items():
+                        self._pending[bolsa_id] = self._pending.get(bolsa_id, 0) + delta
+                    if self._oldest is None:
+                        self._oldest = self._clock()
+                return {}
+
+            with self._lock:
+                self.stats['flushes'] += 1
+                self.stats['flushed_views'] += total
+            if self.unique_views is not None:
+                self.unique_views.persist(self._client_getter())
+            return novos_valores
+
+    def _write(self, lote: dict) -> dict:
+        supabase = self._client_getter()
+        if not supabase:
+            raise RuntimeError("Supabase não disponível")
+
+        deltas = [{'bolsa_id': bolsa_id, 'delta': delta} for bolsa_id, delta in lote.items()]
+        try:
+            response = supabase.rpc('increment_view_counts', {'deltas': deltas}).execute()
+            return {item['bolsa_id']: item['view_count'] for item in response.data or []}
+        except Exception as e:
+            # Banco sem a RPC em lote: usa a RPC atômica de um incremento por vez
+            print(f"⚠️ RPC increment_view_counts indisponível, incrementando uma a uma: {e}")
+            with self._lock:
+                self.stats['rpc_fallbacks'] += 1
+            # O lote é consumido à medida que grava: numa falha no meio, só o que faltou volta para a fila
+            for bolsa_id in list(lote):
+                while lote[bolsa_id] > 0:
+                    supabase.rpc('increment_view_count', {'bolsa_id_param': bolsa_id}).execute()
+                    lote[bolsa_id] -= 1
+                del lote[bolsa_id]
+            return {}
+
+    def health(self) -> dict:
+        pending = self.pending()
+        with self._lock:
+            health = dict(self.stats, pending=pending)
+        if self.unique_views is not None:
+            health['unique'] = self.unique_views.health()
+        return health
+
+
+def create_view_counter(client_getter, unique_views=None) -> ViewCounter:
+    """Contador da instância, com gravação do que restar na saída do processo."""
+    counter = ViewCounter(client_getter, unique_views=unique_views)
+    atexit.register(counter.flush)
+    return counter
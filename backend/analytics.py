@@ -0,0 +1,82 @@
+"""
+Snapshot de analytics gerado ao fim do scraping
+Em vez de a API varrer bolsas_view_agrupada quatro vezes a cada acesso a
+/api/analytics, o documento é calculado quando o scraper termina (a partir dos
+agregados da RPC `bolsas_analytics_agregado`) e gravado em `metadata.analytics_snapshot`;
+a API só lê essa linha.
+"""
+from datetime import datetime, timezone
+
+SNAPSHOT_KEY = 'analytics_snapshot'
+SNAPSHOT_VERSION = 1  # Incrementar quando o formato mudar (junto com ANALYTICS_SNAPSHOT_VERSION em api/index.py)
+TOP_N = 5
+
+
+def _top(contagens: dict, n: int = TOP_N) -> list:
+    return [nome for nome, _ in sorted(contagens.items(), key=lambda item: item[1], reverse=True)[:n]]
+
+
+def _documento(total_vagas, por_status, por_centro, por_tipo, data_epoch, now) -> dict:
+    now = now or datetime.now(timezone.utc)
+    return {
+        'total_bolsas': total_vagas,
+        'bolsas_por_status': por_status,
+        'centros_populares': _top(por_centro),
+        'tipos_mais_procurados': _top(por_tipo),
+        'ultima_atualizacao': now.strftime('%Y-%m-%d'),
+        'snapshot_version': SNAPSHOT_VERSION,
+        'generated_at': now.isoformat(),
+        'data_epoch': data_epoch,
+    }
+
+
+def build_analytics_snapshot(rows, data_epoch: str = None, now: datetime = None) -> dict:
+    """
+    Monta o documento de /api/analytics numa única passada pelas linhas de
+    bolsas_view_agrupada (colunas status, vagas_total, centro, tipo), com as mesmas
+    regras do cálculo antigo da API:
+
+    - total_bolsas e bolsas_por_status somam vagas_total (1 se ausente);
+    - centros_populares e tipos_mais_procurados são os 5 com mais bolsas agrupadas.
+    """
+    total_vagas = 0
+    por_status, por_centro, por_tipo = {}, {}, {}
+
+    for row in rows:
+        vagas = row.get('vagas_total', 1)
+        if vagas is None:
+            vagas = 1
+        total_vagas += vagas
+
+        status = row.get('status', 'desconhecido')
+        por_status[status] = por_status.get(status, 0) + vagas
+
+        centro = row.get('centro', 'Não informado')
+        por_centro[centro] = por_centro.get(centro, 0) + 1
+
+        tipo = row.get('tipo', 'Não informado')
+        por_tipo[tipo] = por_tipo.get(tipo, 0) + 1
+
+    return _documento(total_vagas, por_status, por_centro, por_tipo, data_epoch, now)
+
+
+def build_analytics_snapshot_from_aggregates(rows, data_epoch: str = None, now: datetime = None) -> dict:
+    """
+    Mesmo documento, a partir das linhas já agregadas no banco pela RPC
+    `bolsas_analytics_agregado` (backend/sql/006_bolsas_analytics_agregado.sql):
+    uma linha (dimensao, chave, grupos, vagas) por status, centro e tipo.
+    """
+    total_vagas = 0
+    por_status, por_centro, por_tipo = {}, {}, {}
+
+    for row in rows:
+        dimensao, chave = row['dimensao'], row['chave']
+        if dimensao == 'status':
+            por_status[chave] = int(row['vagas'] or 0)
+            total_vagas += por_status[chave]
+        elif dimensao == 'centro':
+            por_centro[chave] = int(row['grupos'] or 0)
+        elif dimensao == 'tipo':
+            por_tipo[chave] = int(row['grupos'] or 0)
+
+    return _documento(total_vagas, por_status, por_centro, por_tipo, data_epoch, now)
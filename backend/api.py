@@ -1,5 +1,7 @@
 from fastapi import FastAPI, Query, Depends, HTTPException, BackgroundTasks, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 import os
 from dotenv import load_dotenv
@@ -13,6 +15,13 @@ from models import BolsaComProjeto, Projeto, Edital, BolsasResponse
 from database import SupabaseManager
 from tasks import run_scraping_task
 
+# Importa o ORJSONResponse apenas se o orjson estiver disponível
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
 # --- Instância Única do SupabaseManager (Singleton) ---
 # Cria a instância uma vez quando o módulo é carregado.
 # Isso evita criar uma nova conexão com o banco a cada requisição.
@@ -46,6 +55,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# --- Compressão das respostas ---
+# Negocia pelo Accept-Encoding e só comprime corpos acima de COMPRESSION_MIN_BYTES.
+# Com o pacote opcional brotli-asgi instalado usa br (e gzip para quem não aceita br).
+compression_min_bytes = int(os.environ.get("COMPRESSION_MIN_BYTES", "1024"))
+try:
+    from brotli_asgi import BrotliMiddleware
+    app.add_middleware(BrotliMiddleware, quality=5, minimum_size=compression_min_bytes, gzip_fallback=True)
+except ImportError:
+    app.add_middleware(GZipMiddleware, minimum_size=compression_min_bytes)
+
+# --- Respostas de listas sem revalidação ---
+# As linhas vêm do banco e já foram validadas na ingestão; com API_TRUSTED_ROWS=1 os
+# endpoints de lista devolvem os dados direto (orjson quando disponível), sem o
+# Pydantic revalidar e reserializar cada linha pelo response_model.
+TRUSTED_ROWS = os.environ.get("API_TRUSTED_ROWS", "0") == "1"
+
+def lista_json(data):
+    return FastJSONResponse(content=data) if TRUSTED_ROWS else data
+
 # --- Dependência para o SupabaseManager ---
 # Retorna a instância única criada na inicialização.
 def get_db_manager():
@@ -137,7 +165,7 @@ def get_bolsas_endpoint(
         sort=sort, 
         order=order
     )
-    return bolsas_data
+    return lista_json(bolsas_data)
 
 @app.get("/api/bolsas/{bolsa_id}", response_model=BolsaComProjeto, tags=["Bolsas"])
 def get_bolsa_endpoint(
@@ -191,7 +219,7 @@ def get_editais_endpoint(
     """
     Lista os editais com paginação.
     """
-    return db.get_editais(page=page, page_size=page_size)
+    return lista_json(db.get_editais(page=page, page_size=page_size))
 
 @app.get("/api/editais/{edital_id}", response_model=Edital, tags=["Editais"])
 def get_edital_endpoint(edital_id: uuid.UUID, db: SupabaseManager = Depends(get_db_manager)):
@@ -213,7 +241,7 @@ def get_ranking_endpoint(
     """
     Retorna as bolsas mais visualizadas.
     """
-    return db.get_ranking_bolsas(limit=limit)
+    return lista_json(db.get_ranking_bolsas(limit=limit))
 
 
 # --- Endpoint para Scraper ---
@@ -4,9 +4,12 @@ Implementa práticas de segurança para proteção de chaves sensíveis
 """
 import os
 import hmac
+import json
 import hashlib
+import time
 import logging
-from datetime import datetime, timedelta
+import threading
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 from collections import defaultdict
 
@@ -14,6 +17,175 @@ from collections import defaultdict
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# A cota diária do Gemini reinicia à meia-noite do horário do Pacífico
+try:
+    from zoneinfo import ZoneInfo
+    QUOTA_TIMEZONE = ZoneInfo("America/Los_Angeles")
+except Exception:
+    QUOTA_TIMEZONE = timezone(timedelta(hours=-8))
+
+DEFAULT_LEDGER_PATH = os.path.join(os.path.dirname(__file__), '.cache', 'quota_ledger.json')
+
+
+class QuotaLedger:
+    """
+    Livro-razão persistente de uso de cota por chave do Gemini.
+
+    Guarda, por dia de cota (horário do Pacífico) e por chave, o número de requisições,
+    os tokens de entrada/saída e o momento em que a chave esgotou. Sobrevive entre
+    processos e execuções (arquivo JSON, escrita atômica). As chaves nunca são gravadas
+    em texto puro: o arquivo usa apenas um hash curto de cada uma.
+
+    Com `path=None` o livro fica só em memória (usado pelo backend falso).
+
+    Requisições e tokens só marcam o livro como alterado; o arquivo é regravado no máximo
+    a cada `save_interval_seconds` (GEMINI_QUOTA_LEDGER_SAVE_SECONDS, padrão 30), na hora
+    quando uma chave esgota e em `flush()` (fim da execução).
+    """
+
+    def __init__(self, path: Optional[str] = None, daily_request_limit: Optional[int] = None, now=None,
+                 save_interval_seconds: Optional[float] = None, clock=time.monotonic):
+        self.path = path
+        self.daily_request_limit = daily_request_limit
+        self.save_interval_seconds = save_interval_seconds if save_interval_seconds is not None else float(
+            os.getenv("GEMINI_QUOTA_LEDGER_SAVE_SECONDS", "30"))
+        self._now = now or (lambda: datetime.now(timezone.utc))
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = clock()
+        self._versao = 0  # Versão serializada mais recente (evita gravar uma antiga por cima)
+        self._versao_gravada = 0
+        self._days = self._load()
+
+    @staticmethod
+    def key_id(api_key: str) -> str:
+        return hashlib.sha256(api_key.encode('utf-8')).hexdigest()[:12]
+
+    def _today(self) -> str:
+        return self._now().astimezone(QUOTA_TIMEZONE).strftime("%Y-%m-%d")
+
+    def _load(self) -> dict:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f).get('days', {})
+        except FileNotFoundError:
+            return {}
+        except (ValueError, OSError) as e:
+            logger.warning(f"⚠️ Livro de cota ilegível em {self.path}, recomeçando do zero: {e}")
+            return {}
+
+    def _snapshot_for_save(self) -> tuple:
+        """Remove os dias antigos e serializa o livro (chamado com o lock)."""
+        today = self._today()
+        self._days = {day: entries for day, entries in self._days.items() if day >= today}
+        self._dirty = False
+        self._saved_at = self._clock()
+        self._versao += 1
+        return self._versao, json.dumps({'version': 1, 'days': self._days})
+
+    def _write(self, snapshot: Optional[tuple]):
+        """Grava o arquivo de forma atômica, fora do lock do livro (as chamadas à IA não esperam o disco)."""
+        if snapshot is None or not self.path:
+            return
+        versao, conteudo = snapshot
+        with self._write_lock:
+            if versao <= self._versao_gravada:
+                return
+            self._versao_gravada = versao
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(conteudo)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"⚠️ Não foi possível salvar o livro de cota: {e}")
+
+    def _touch(self) -> Optional[tuple]:
+        """Marca o livro como alterado; devolve o conteúdo a gravar se o intervalo já passou (com o lock)."""
+        self._dirty = True
+        if self._clock() - self._saved_at >= self.save_interval_seconds:
+            return self._snapshot_for_save()
+        return None
+
+    def flush(self):
+        """Grava o livro se houver alterações pendentes."""
+        with self._lock:
+            conteudo = self._snapshot_for_save() if self._dirty else None
+        self._write(conteudo)
+
+    def _entry(self, api_key: str) -> dict:
+        entries = self._days.setdefault(self._today(), {})
+        return entries.setdefault(self.key_id(api_key), {
+            'requests': 0, 'input_tokens': 0, 'output_tokens': 0, 'exhausted_at': None,
+        })
+
+    def record_request(self, api_key: str):
+        """Conta uma requisição feita com a chave no dia de cota atual."""
+        with self._lock:
+            self._entry(api_key)['requests'] += 1
+            conteudo = self._touch()
+        self._write(conteudo)
+
+    def record_tokens(self, api_key: str, input_tokens: int = 0, output_tokens: int = 0):
+        with self._lock:
+            entry = self._entry(api_key)
+            entry['input_tokens'] += input_tokens or 0
+            entry['output_tokens'] += output_tokens or 0
+            conteudo = self._touch()
+        self._write(conteudo)
+
+    def mark_exhausted(self, api_key: str):
+        """Registra que a chave recebeu 429 de cota DIÁRIA: não será mais usada hoje."""
+        # Gravado na hora: a próxima execução não deve tentar a chave de novo
+        with self._lock:
+            self._entry(api_key)['exhausted_at'] = self._now().isoformat()
+            conteudo = self._snapshot_for_save()
+        self._write(conteudo)
+
+    def is_exhausted(self, api_key: str) -> bool:
+        with self._lock:
+            entry = self._days.get(self._today(), {}).get(self.key_id(api_key))
+        if not entry:
+            return False
+        if entry['exhausted_at']:
+            return True
+        return self.daily_request_limit is not None and entry['requests'] >= self.daily_request_limit
+
+    def remaining(self, api_key: str) -> Optional[int]:
+        """Requisições restantes hoje (None se o limite diário não for conhecido)."""
+        if self.is_exhausted(api_key):
+            return 0
+        if self.daily_request_limit is None:
+            return None
+        with self._lock:
+            entry = self._days.get(self._today(), {}).get(self.key_id(api_key), {})
+        return max(0, self.daily_request_limit - entry.get('requests', 0))
+
+    def order_keys(self, api_keys: list) -> list:
+        """
+        Índices das chaves utilizáveis hoje, da que tem mais cota restante para a que tem menos.
+        Chaves já esgotadas ficam de fora. Sem limite conhecido, ordena pelo menor uso.
+        """
+        with self._lock:
+            entries = dict(self._days.get(self._today(), {}))
+
+        def used(index):
+            return entries.get(self.key_id(api_keys[index]), {}).get('requests', 0)
+
+        usable = [i for i in range(len(api_keys)) if not self.is_exhausted(api_keys[i])]
+        return sorted(usable, key=used)  # sort estável: empate mantém a ordem original
+
+    def snapshot(self) -> dict:
+        """Uso do dia de cota atual, por hash de chave."""
+        with self._lock:
+            today = self._today()
+            return {'quota_day': today, 'by_key': json.loads(json.dumps(self._days.get(today, {})))}
+
 
 class APIKeyManager:
     """Gerenciador seguro de API keys com monitoramento de uso"""
@@ -22,6 +194,13 @@ class APIKeyManager:
         self.usage_tracker = defaultdict(int)
         self.last_rotation_check = datetime.now()
         self.alert_threshold = 100  # Alertar após 100 requisições em 1 hora
+
+        # 📒 Livro de cota persistente (sobrevive entre execuções)
+        daily_limit = os.getenv("GEMINI_DAILY_REQUEST_LIMIT")
+        self.ledger = QuotaLedger(
+            path=os.getenv("GEMINI_QUOTA_LEDGER", DEFAULT_LEDGER_PATH),
+            daily_request_limit=int(daily_limit) if daily_limit else None,
+        )
         
     def get_gemini_keys(self) -> list:
         """
@@ -51,6 +230,10 @@ class APIKeyManager:
         """
         current_hour = datetime.now().strftime("%Y-%m-%d-%H")
         tracking_key = f"{current_hour}:{key_index}"
+
+        # Mantém apenas a hora atual (o histórico diário fica no livro de cota)
+        for old_key in [k for k in self.usage_tracker if not k.startswith(current_hour)]:
+            del self.usage_tracker[old_key]
         
         self.usage_tracker[tracking_key] += 1
         
@@ -110,7 +293,8 @@ class APIKeyManager:
         stats = {
             "current_hour": current_hour,
             "total_requests": sum(self.usage_tracker.values()),
-            "by_key": {}
+            "by_key": {},
+            "quota_ledger": self.ledger.snapshot()
         }
         
         for tracking_key, count in self.usage_tracker.items():
@@ -0,0 +1,206 @@
+"""
+Cache de leitura (read-through) para as consultas da API
+Os dados só mudam quando o scraper roda e atualiza `metadata.last_data_update`, então
+as respostas ficam em memória (LRU + TTL) marcadas com essa "época"; quando a época
+muda, tudo o que foi gravado antes deixa de valer sem precisar varrer o cache.
+Leituras idênticas simultâneas (ex: rajada logo após uma entrada vencer) são
+agrupadas em uma única consulta ao banco (SingleFlight).
+"""
+import os
+import time
+import threading
+import functools
+from collections import OrderedDict
+
+_MISS = object()
+
+
+class LRUTTLCache:
+    """
+    Dicionário limitado a `max_entries` (sai o usado há mais tempo) em que cada
+    entrada vence em `ttl_seconds` e guarda a época em que foi gravada.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_seconds: float = 300.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'stale_epoch': 0}
+
+    def get(self, key, epoch=None):
+        """Valor guardado, ou `_MISS` se não existe, venceu ou é de outra época."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return _MISS
+            value, expires_at, entry_epoch = entry
+            if entry_epoch != epoch or self._clock() >= expires_at:
+                del self._entries[key]
+                self.stats['stale_epoch' if entry_epoch != epoch else 'expired'] += 1
+                self.stats['misses'] += 1
+                return _MISS
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return value
+
+    def set(self, key, value, epoch=None):
+        with self._lock:
+            self._entries[key] = (value, self._clock() + self.ttl_seconds, epoch)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SingleFlight:
+    """
+    Agrupa chamadas simultâneas com a mesma chave: a primeira executa a função e as
+    que chegam enquanto ela roda esperam e recebem o mesmo resultado (ou a mesma exceção).
+    `stats['collapsed']` conta as consultas ao banco que deixaram de ser feitas.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {'calls': 0, 'executions': 0, 'collapsed': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self.stats['calls'] += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = {'done': threading.Event(), 'result': None, 'error': None}
+                self._calls[key] = call
+                self.stats['executions'] += 1
+            else:
+                self.stats['collapsed'] += 1
+
+        if not leader:
+            call['done'].wait()
+            if call['error'] is not None:
+                raise call['error']
+            return call['result']
+
+        try:
+            call['result'] = fn()
+            return call['result']
+        except Exception as e:
+            call['error'] = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call['done'].set()
+
+
+class EpochCache:
+    """
+    Cache de leitura com invalidação por época.
+
+    - `epoch_loader()` devolve a época atual dos dados (ex: `metadata.last_data_update`);
+      ela é consultada no máximo a cada `epoch_check_seconds`, para não trocar uma
+      consulta ao banco por outra a cada requisição;
+    - Entradas de outra época são tratadas como ausentes (e substituídas na próxima leitura);
+    - `invalidate()` força a releitura da época e descarta o cache local (ex: após gravar);
+    - Leituras simultâneas da mesma chave que não estão no cache viram uma só consulta.
+
+    Configuração por ambiente (via `from_env`): DB_CACHE=0 desliga, DB_CACHE_MAX_ENTRIES,
+    DB_CACHE_TTL_SECONDS e DB_CACHE_EPOCH_CHECK_SECONDS.
+    """
+
+    def __init__(self, epoch_loader=None, max_entries: int = 512, ttl_seconds: float = 300.0,
+                 epoch_check_seconds: float = 30.0, enabled: bool = True, clock=time.monotonic):
+        self.enabled = enabled
+        self.epoch_check_seconds = epoch_check_seconds
+        self._epoch_loader = epoch_loader
+        self._clock = clock
+        self._cache = LRUTTLCache(max_entries=max_entries, ttl_seconds=ttl_seconds, clock=clock)
+        self._epoch = None
+        self._epoch_checked_at = None
+        self._lock = threading.Lock()
+        self.flights = SingleFlight()
+
+    @classmethod
+    def from_env(cls, epoch_loader=None) -> "EpochCache":
+        return cls(
+            epoch_loader=epoch_loader,
+            max_entries=int(os.getenv("DB_CACHE_MAX_ENTRIES", "512")),
+            ttl_seconds=float(os.getenv("DB_CACHE_TTL_SECONDS", "300")),
+            epoch_check_seconds=float(os.getenv("DB_CACHE_EPOCH_CHECK_SECONDS", "30")),
+            enabled=os.getenv("DB_CACHE", "1") != "0",
+        )
+
+    @property
+    def stats(self) -> dict:
+        return dict(self._cache.stats, entries=len(self._cache), epoch=self._epoch,
+                    collapsed=self.flights.stats['collapsed'])
+
+    def current_epoch(self):
+        """Época dos dados, relida do banco quando a última leitura já passou do intervalo."""
+        with self._lock:
+            agora = self._clock()
+            if self._epoch_checked_at is not None and agora - self._epoch_checked_at < self.epoch_check_seconds:
+                return self._epoch
+            self._epoch_checked_at = agora
+        if self._epoch_loader is None:
+            return self._epoch
+        try:
+            epoch = self._epoch_loader()
+        except Exception as e:
+            # Sem conseguir ler a época, mantém a anterior (o TTL continua limitando a idade)
+            print(f"  > [CACHE] Falha ao ler a época dos dados: {e}")
+            return self._epoch
+        with self._lock:
+            self._epoch = epoch
+        return epoch
+
+    def invalidate(self):
+        with self._lock:
+            self._epoch_checked_at = None
+        self._cache.clear()
+
+    def get_or_load(self, key, loader):
+        """
+        Leitura com cache: devolve o valor guardado para `key` na época atual ou chama
+        `loader()` e guarda o resultado. Resultados vazios (None, [], {}) não são
+        guardados: os métodos do banco também os usam para sinalizar erro.
+        """
+        if not self.enabled:
+            return self.flights.do(key, loader)
+        epoch = self.current_epoch()
+        value = self._cache.get(key, epoch)
+        if value is not _MISS:
+            return value
+        return self.flights.do((key, epoch), lambda: self._load(key, loader, epoch))
+
+    def _load(self, key, loader, epoch):
+        value = loader()
+        if value:
+            self._cache.set(key, value, epoch)
+        return value
+
+
+def cached_read(method):
+    """
+    Decorador para métodos de leitura de uma classe com atributo `cache` (EpochCache):
+    a chave é o nome do método mais os argumentos.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        cache = getattr(self, 'cache', None)
+        if cache is None:
+            return method(self, *args, **kwargs)
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        return cache.get_or_load(key, lambda: method(self, *args, **kwargs))
+    return wrapper
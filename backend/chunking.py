@@ -0,0 +1,73 @@
+"""
+Agrupamento de páginas de resultado em trechos por orçamento de tokens
+Junta páginas consecutivas em uma única chamada à IA e evita cortar
+linhas de tabela na quebra entre trechos.
+"""
+import re
+
+from .llm_backends import estimate_tokens
+
+# Uma linha de tabela de resultado termina com números (PERFIL / Nº VAGAS)
+_ROW_END = re.compile(r'\b\d{1,3}\s*$')
+
+# Acima disso, as linhas finais não são um pedaço de linha da tabela (rodapé, texto corrido...)
+MAX_FRAGMENT_LINES = 8
+
+
+def split_trailing_fragment(texto: str) -> tuple:
+    """
+    Separa as linhas finais do texto que não fecham uma linha de tabela.
+
+    Retorna (corpo, fragmento). O fragmento é o começo de uma linha que continua
+    na página seguinte (ex: nome de projeto longo quebrado pela mudança de página).
+    """
+    lines = texto.rstrip('\n').split('\n')
+    for i in range(len(lines) - 1, -1, -1):
+        if _ROW_END.search(lines[i]):
+            break
+    else:
+        return texto, ""
+
+    fragmento = lines[i + 1:]
+    if not any(l.strip() for l in fragmento) or len(fragmento) > MAX_FRAGMENT_LINES:
+        return texto, ""
+    return '\n'.join(lines[:i + 1]), '\n'.join(fragmento)
+
+
+def chunk_pages(paginas: list, token_budget: int) -> list:
+    """
+    Agrupa páginas consecutivas em trechos de até `token_budget` tokens de entrada.
+
+    - Uma página nunca é dividida: se sozinha passar do orçamento, vira um trecho próprio;
+    - Na fronteira entre trechos, o fragmento final de linha vai para o trecho seguinte,
+      junto com o resto da linha que está no topo da próxima página.
+
+    `paginas` é a lista de {'page_num', 'total', 'texto'}; cada trecho retornado tem o
+    mesmo formato, mais `pages` (números das páginas incluídas).
+    """
+    trechos = []
+    atual = None
+    atual_tokens = 0
+    carry = ""
+
+    for pagina in paginas:
+        tokens = estimate_tokens(pagina['texto'])
+
+        if atual is not None and (token_budget <= 0 or atual_tokens + tokens > token_budget):
+            corpo, carry = split_trailing_fragment(atual['texto'])
+            atual['texto'] = corpo
+            trechos.append(atual)
+            atual = None
+
+        if atual is None:
+            atual = {'page_num': pagina['page_num'], 'total': pagina['total'], 'pages': [], 'texto': carry}
+            atual_tokens = estimate_tokens(carry)
+            carry = ""
+
+        atual['texto'] = f"{atual['texto']}\n{pagina['texto']}" if atual['texto'] else pagina['texto']
+        atual['pages'].append(pagina['page_num'])
+        atual_tokens += tokens
+
+    if atual is not None:
+        trechos.append(atual)
+    return trechos
@@ -1,5 +1,6 @@
 from supabase import create_client, Client
 import os
+import json
 from dotenv import load_dotenv
 import re
 import unicodedata
@@ -7,9 +8,13 @@ from difflib import get_close_matches
 from collections import defaultdict
 from typing import Optional
 from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
 
 # ✅ NOVO: Importa a função de um local centralizado
 from .utils import get_match_key
+from .cache import EpochCache, cached_read
+from .analytics import build_analytics_snapshot_from_aggregates, SNAPSHOT_KEY
+from .rollups import deltas_de_oferta, acumular, como_lista, dia_da_oferta
 
 # Lista de palavras comuns a serem ignoradas na normalização para comparação
 STOP_WORDS = {
@@ -25,11 +30,20 @@ EDITAL_TERMS = {
     'PUBLICO', 'PRIVADO', 'INSTITUCIONAL', 'VOLUNTARIA'
 }
 
+# Pool pequeno para consultas independentes de uma mesma requisição (ex: página + totais)
+QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="supabase-query")
+
 class SupabaseManager:
     """
     Gerencia a comunicação com o banco de dados Supabase.
     """
     def __init__(self):
+        # 📦 Buffer de gravação da execução (ativado por begin_write_batch)
+        self._write_batch = None
+        self._write_batch_threshold = None
+        # ⚡ Cache de leitura invalidado pela época dos dados (metadata.last_data_update)
+        self.cache = EpochCache.from_env(epoch_loader=self._load_data_epoch)
+
         url = os.environ.get("SUPABASE_URL")
         key = os.environ.get("SUPABASE_KEY")
         
@@ -114,60 +128,303 @@ class SupabaseManager:
             print(f"⚠️ Erro ao verificar notificação existente: {e}")
             return False  # Em caso de erro, permite notificar (fail-safe)
     
-    def _enfileirar_notificacao(self, edital_id: str, edital_titulo: str, edital_link: str, tipo_edital: str, tipo_notificacao: str, usuarios: list):
+    def _enfileirar_notificacoes(self, notificacoes: list):
         """
-        Enfileira uma notificação para ser processada, em vez de enviá-la diretamente.
+        Enfileira de uma vez (um único insert) as notificações a serem processadas,
+        em vez de enviá-las diretamente.
         """
+        if not notificacoes:
+            return
         try:
             # O status padrão da tabela agora é 'pendente', então não precisamos especificá-lo
-            self.client.table('notificacoes_enviadas').insert({
-                'edital_id': edital_id,
-                'edital_titulo': edital_titulo,
-                'edital_link': edital_link,
-                'tipo_edital': tipo_edital,
-                'tipo_notificacao': tipo_notificacao,
-                'detalhes': { 'usuarios_alvo': usuarios } # Armazena para quem enviar
-            }).execute()
-            print(f"✅ Notificação para o edital '{edital_titulo}' enfileirada para {len(usuarios)} usuário(s).")
+            self.client.table('notificacoes_enviadas').insert(notificacoes).execute()
+            for notificacao in notificacoes:
+                print(f"✅ Notificação para o edital '{notificacao['edital_titulo']}' enfileirada para {len(notificacao['detalhes']['usuarios_alvo'])} usuário(s).")
         except Exception as e:
-            print(f"❌ Erro ao enfileirar notificação: {e}")
+            print(f"❌ Erro ao enfileirar notificações: {e}")
 
-    def _buscar_usuarios_por_preferencia(self, modalidade: str) -> list:
+    def _carregar_usuarios_ativos(self) -> list:
         """
-        📱 Busca usuários que querem receber notificações deste tipo.
-        Se usuário não tem preferências, retorna para receber TUDO.
+        📱 Busca os usuários ativos do Telegram com suas preferências (uma única consulta).
         """
         try:
-            # Busca usuários ativos
             response = self.client.table('telegram_alerts').select('telegram_id, preferencias').eq('status', 'ativo').execute()
-            
-            if not response.data:
-                return []
-            
-            usuarios_filtrados = []
-            for usuario in response.data:
-                preferencias = usuario.get('preferencias')
-                
-                # Se não tem preferências definidas, recebe TUDO
-                if not preferencias:
-                    usuarios_filtrados.append(usuario['telegram_id'])
-                    continue
-                
-                # Se tem preferências, verifica se está ativo para essa modalidade
-                if preferencias.get(modalidade) is True:
-                    usuarios_filtrados.append(usuario['telegram_id'])
-            
-            return usuarios_filtrados
-            
+            return response.data or []
         except Exception as e:
             print(f"⚠️ Erro ao buscar usuários por preferência: {e}")
-            # Fallback: retorna todos os ativos (fail-safe)
+            # Fallback: todos os ativos, sem preferências (recebem TUDO, fail-safe)
             try:
                 fallback = self.client.table('telegram_alerts').select('telegram_id').eq('status', 'ativo').execute()
-                return [u['telegram_id'] for u in fallback.data] if fallback.data else []
+                return [{'telegram_id': u['telegram_id'], 'preferencias': None} for u in fallback.data] if fallback.data else []
             except:
                 return []
 
+    def _filtrar_usuarios_por_preferencia(self, usuarios: list, modalidade: str) -> list:
+        """
+        Seleciona os usuários que querem receber notificações deste tipo.
+        Se usuário não tem preferências, recebe TUDO.
+        """
+        usuarios_filtrados = []
+        for usuario in usuarios:
+            preferencias = usuario.get('preferencias')
+
+            # Se não tem preferências definidas, recebe TUDO
+            if not preferencias:
+                usuarios_filtrados.append(usuario['telegram_id'])
+                continue
+
+            # Se tem preferências, verifica se está ativo para essa modalidade
+            if preferencias.get(modalidade) is True:
+                usuarios_filtrados.append(usuario['telegram_id'])
+
+        return usuarios_filtrados
+
+    def _buscar_usuarios_por_preferencia(self, modalidade: str) -> list:
+        """
+        📱 Busca usuários que querem receber notificações deste tipo.
+        Se usuário não tem preferências, retorna para receber TUDO.
+        """
+        return self._filtrar_usuarios_por_preferencia(self._carregar_usuarios_ativos(), modalidade)
+
+    def begin_write_batch(self, flush_threshold: int = None):
+        """
+        📦 Inicia o buffer de gravação da execução.
+
+        A partir daqui, `upsert_edital` apenas enfileira o edital; a gravação acontece em
+        lote em `flush_writes` (chamado no fim da execução, antes do casamento de
+        resultados, ou ao atingir `flush_threshold` editais - DB_WRITE_BATCH_SIZE, padrão 25).
+        """
+        self._write_batch = []
+        self._write_batch_threshold = flush_threshold or int(os.getenv("DB_WRITE_BATCH_SIZE", "25"))
+
+    def flush_writes(self) -> dict:
+        """
+        Grava os editais pendentes do buffer e retorna {link: id} dos que foram salvos.
+        Sem buffer ativo (ou vazio), não faz nada.
+        """
+        pendentes = self._write_batch or []
+        if self._write_batch is not None:
+            self._write_batch = []
+        if not pendentes or not self.client:
+            return {}
+        print(f"  > [BUFFER] Gravando {len(pendentes)} edital(is) em lote...")
+        return self._gravar_editais(pendentes)
+
+    def _montar_payload_edital(self, edital_data: dict, edital_url: str, projetos_existentes: list) -> dict:
+        """
+        Monta o payload da RPC de um edital. A correspondência fuzzy de projetos
+        (com os projetos já salvos para o mesmo edital) é feita aqui, em Python.
+        """
+        projetos_payload = []
+
+        # Cria um mapa para correspondência fuzzy
+        match_map = {self._get_project_match_key(p['nome_projeto']): p for p in projetos_existentes}
+
+        for proj_info in edital_data.get('projetos', []):
+            nome_projeto_db = self._normalize_text_for_db(proj_info.get('nome_projeto'))
+            nome_projeto_match_key = self._get_project_match_key(proj_info.get('nome_projeto'))
+
+            # Lógica de Fuzzy Matching para encontrar ID existente
+            matches = get_close_matches(nome_projeto_match_key, list(match_map.keys()), n=1, cutoff=0.85)
+
+            projeto_id_existente = None
+            if matches:
+                matched_key = matches[0]
+                projeto_existente_obj = match_map[matched_key]
+                projeto_id_existente = projeto_existente_obj['id']
+                # Projeto correspondente encontrado no BD
+
+            # Normaliza os detalhes das bolsas
+            bolsas_detalhadas = []
+            for bolsa in proj_info.get('detalhe_bolsas', []):
+                bolsas_detalhadas.append({
+                    'tipo': bolsa.get('tipo_bolsa'),
+                    'remuneracao': bolsa.get('valor_bolsa'),
+                    'vagas': bolsa.get('vagas', 1),
+                    'numero_perfil': self._normalize_perfil(bolsa.get('numero_perfil')),
+                    'requisito': bolsa.get('requisitos')
+                })
+
+            # Monta o payload para este projeto específico
+            projetos_payload.append({
+                'id': projeto_id_existente, # Será null se for um projeto novo
+                'nome_projeto': nome_projeto_db,
+                'orientador': self._normalize_text_for_db(proj_info.get('orientador')),
+                'centro': proj_info.get('centro'),
+                'resumo': proj_info.get('resumo'),
+                'detalhe_bolsas': bolsas_detalhadas
+            })
+
+        return {
+            'titulo': edital_data.get('titulo'),
+            'link': edital_url,
+            'data_fim_inscricao': edital_data.get('data_fim_inscricao'),
+            'data_publicacao': edital_data.get('data_publicacao'),
+            'data_divulgacao_resultado': edital_data.get('data_divulgacao_resultado'),
+            'modalidade': edital_data.get('modalidade', 'extensao'),  # ← NOVO: Salva modalidade
+            'projetos': projetos_payload
+        }
+
+    def _executar_upsert_editais(self, payloads: list) -> dict:
+        """
+        Envia os payloads ao banco e retorna {link: id}.
+        Mais de um edital vai numa única chamada a `handle_editais_upsert_batch`
+        (backend/sql/001_handle_editais_upsert_batch.sql); se a função não existir ou
+        falhar, cai para `handle_edital_upsert` edital a edital.
+        """
+        if len(payloads) > 1:
+            try:
+                rpc_response = self.client.rpc('handle_editais_upsert_batch', {'edital_payloads': payloads}).execute()
+                if rpc_response.data:
+                    return {item['link']: item['id'] for item in rpc_response.data if item.get('id')}
+            except Exception as e:
+                print(f"  > [BUFFER] RPC em lote indisponível ({e}). Gravando edital a edital.")
+
+        ids = {}
+        for payload in payloads:
+            try:
+                rpc_response = self.client.rpc('handle_edital_upsert', {'edital_payload': payload}).execute()
+                if not rpc_response.data:
+                    # Tenta fornecer um erro mais detalhado, se possível
+                    error_message = "A função RPC não retornou um ID."
+                    if hasattr(rpc_response, 'error') and rpc_response.error:
+                        error_message = f"Erro na RPC: {rpc_response.error.message}"
+                    raise Exception(error_message)
+                ids[payload['link']] = rpc_response.data
+            except Exception as e:
+                print(f"  > ERRO na operação transacional para o edital '{payload.get('titulo')}': {e}")
+                import traceback
+                traceback.print_exc()
+        return ids
+
+    def _gravar_editais(self, itens: list) -> dict:
+        """
+        Grava uma lista de (edital_data, edital_url) com consultas em lote:
+        1 select de editais, 1 de projetos, a RPC, 1 limpeza e 1 insert de notificações.
+        """
+        # Se o mesmo link aparecer mais de uma vez, vale a versão mais recente
+        por_link = {}
+        for edital_data, edital_url in itens:
+            por_link[edital_url] = edital_data
+        itens = [(edital_data, edital_url) for edital_url, edital_data in por_link.items()]
+
+        try:
+            # 1. Busca os IDs dos editais existentes (CRUCIAL: detecta se é INSERT ou UPDATE)
+            response = self.client.table('editais').select('id, link').in_('link', list(por_link)).execute()
+            ids_antes = {e['link']: e['id'] for e in response.data or []}
+
+            # 2. Busca os projetos existentes desses editais para fazer o match
+            projetos_por_edital = defaultdict(list)
+            if ids_antes:
+                res_existentes = self.client.table('projetos').select('id, nome_projeto, edital_id').in_('edital_id', list(ids_antes.values())).execute()
+                for projeto in res_existentes.data or []:
+                    projetos_por_edital[projeto['edital_id']].append(projeto)
+        except Exception as e:
+            print(f"  > ERRO ao carregar editais existentes para gravação: {e}")
+            import traceback
+            traceback.print_exc()
+            return {}
+
+        # 3. Monta os payloads e grava
+        payloads = [
+            self._montar_payload_edital(edital_data, edital_url, projetos_por_edital.get(ids_antes.get(edital_url), []))
+            for edital_data, edital_url in itens
+        ]
+        ids = self._executar_upsert_editais(payloads)
+        gravados = [(edital_data, edital_url) for edital_data, edital_url in itens if ids.get(edital_url)]
+
+        # 🧹 LIMPEZA AUTOMÁTICA (uma vez por lote): Remove bolsas não preenchidas de editais antigos
+        if any(edital_data.get('etapa') == 'inscricao' for edital_data, _ in gravados):  # Só limpa para editais de inscrição
+            self._cleanup_old_available_bolsas()
+
+        # 🔔 NOTIFICAÇÕES TELEGRAM INTELIGENTES via FILA
+        # ✅ Só enfileira EDITAIS NOVOS (evita spam)
+        novos = []
+        for edital_data, edital_url in gravados:
+            if edital_url in ids_antes:
+                print(f"ℹ️ [EDITAL EXISTENTE] Notificação ignorada (edital já existia): '{edital_data.get('titulo')}'")
+            else:
+                novos.append((edital_data, edital_url))
+
+        # 📈 Rollups históricos: as bolsas dos editais novos entram como ofertadas
+        if novos:
+            payload_por_link = {payload['link']: payload for payload in payloads}
+            self._aplicar_rollup(deltas_de_oferta([payload_por_link[edital_url] for _, edital_url in novos]))
+
+        if novos:
+            try:
+                usuarios_ativos = self._carregar_usuarios_ativos()
+                notificacoes = []
+                for edital_data, edital_url in novos:
+                    tipo_edital = edital_data.get('etapa', 'inscricao')
+                    modalidade = edital_data.get('modalidade', 'extensao')
+
+                    if modalidade == 'apoio_academico':
+                        tipo_notificacao = 'apoio_academico'
+                    elif tipo_edital == 'resultado':
+                        tipo_notificacao = 'resultado'
+                    else:
+                        tipo_notificacao = 'extensao'
+
+                    usuarios_interessados = self._filtrar_usuarios_por_preferencia(usuarios_ativos, modalidade)
+                    if not usuarios_interessados:
+                        print(f"ℹ️ [SEM USUÁRIOS] Nenhum usuário quer receber '{modalidade}'. Não notificando.")
+                        continue
+
+                    notificacoes.append({
+                        'edital_id': ids[edital_url],
+                        'edital_titulo': edital_data.get('titulo', 'Novo Edital'),
+                        'edital_link': edital_url,
+                        'tipo_edital': tipo_edital,
+                        'tipo_notificacao': tipo_notificacao,
+                        'detalhes': { 'usuarios_alvo': usuarios_interessados } # Armazena para quem enviar
+                    })
+
+                # Enfileira as notificações em vez de enviar diretamente
+                self._enfileirar_notificacoes(notificacoes)
+
+            except Exception as e:
+                print(f"❌ Erro durante a lógica de enfileiramento de notificação: {e}")
+
+        if ids:
+            self.cache.invalidate()
+        return ids
+
+    def _aplicar_rollup(self, deltas: list):
+        """
+        📈 Soma deltas nos rollups diário/mensal (RPC apply_bolsas_rollup_deltas,
+        backend/sql/005_bolsas_rollups.sql). Uma falha aqui não interrompe a gravação.
+        """
+        if not deltas:
+            return
+        try:
+            self.client.rpc('apply_bolsas_rollup_deltas', {'deltas': deltas}).execute()
+            print(f"  > [ROLLUP] {len(deltas)} célula(s) atualizada(s).")
+        except Exception as e:
+            print(f"  > ⚠️ [ROLLUP] Deltas não aplicados ({e}). rebuild_bolsas_rollups() recalcula o histórico.")
+
+    def _rollup_preenchimentos(self, projetos: list):
+        """
+        Deltas das bolsas preenchidas pelo casamento de resultados: `projetos` tem um item
+        (com centro e edital_id) por bolsa preenchida; cada uma conta na célula da oferta.
+        """
+        edital_ids = list({projeto['edital_id'] for projeto in projetos if projeto.get('edital_id')})
+        editais = {}
+        if edital_ids:
+            try:
+                response = self.client.table('editais').select('id, data_publicacao, created_at, modalidade').in_('id', edital_ids).execute()
+                editais = {edital['id']: edital for edital in response.data or []}
+            except Exception as e:
+                print(f"  > ⚠️ [ROLLUP] Não foi possível ler os editais das bolsas preenchidas: {e}")
+                return
+
+        deltas = {}
+        for projeto in projetos:
+            edital = editais.get(projeto.get('edital_id'), {})
+            acumular(deltas, dia_da_oferta(edital.get('data_publicacao'), edital.get('created_at')),
+                     projeto.get('centro'), edital.get('modalidade'), preenchidas=1)
+        self._aplicar_rollup(como_lista(deltas))
+
     def upsert_edital(self, edital_data: dict, edital_url: str):
         """
         Insere ou atualiza um edital de forma transacional usando uma função RPC no Supabase.
@@ -175,140 +432,22 @@ class SupabaseManager:
         
         🆕 NOVA FUNCIONALIDADE: Remove automaticamente bolsas não preenchidas de editais antigos.
         📱 NOTIFICAÇÕES INTELIGENTES: Só notifica editais NOVOS, evitando spam.
+        📦 Com `begin_write_batch` ativo, o edital só entra no buffer (retorna None) e é
+        gravado em lote por `flush_writes`.
         """
         if not self.client:
             print("Cliente Supabase não inicializado. Abortando operação.")
             return None
 
-        try:
-            # 1. Busca o ID do edital existente ou prepara para criar um novo
-            response = self.client.table('editais').select('id').eq('link', edital_url).execute()
-            edital_id_antes = response.data[0]['id'] if response.data else None
-            is_edital_novo = edital_id_antes is None  # ← CRUCIAL: Detecta se é INSERT ou UPDATE
-
-            # 2. Prepara a lista de projetos para o payload final
-            projetos_payload = []
-            projetos_data = edital_data.get('projetos', [])
-
-            if not projetos_data:
-                # Edital sem projetos, salvando apenas edital
-                pass
-            else:
-                # Busca todos os projetos existentes para este edital para fazer o match
-                projetos_existentes = []
-                if edital_id_antes:
-                    res_existentes = self.client.table('projetos').select('id, nome_projeto').eq('edital_id', edital_id_antes).execute()
-                    projetos_existentes = res_existentes.data or []
-                
-                # Cria um mapa para correspondência fuzzy
-                match_map = {self._get_project_match_key(p['nome_projeto']): p for p in projetos_existentes}
-
-                for proj_info in projetos_data:
-                    nome_projeto_db = self._normalize_text_for_db(proj_info.get('nome_projeto'))
-                    nome_projeto_match_key = self._get_project_match_key(proj_info.get('nome_projeto'))
-
-                    # Lógica de Fuzzy Matching para encontrar ID existente
-                    matches = get_close_matches(nome_projeto_match_key, list(match_map.keys()), n=1, cutoff=0.85)
-                    
-                    projeto_id_existente = None
-                    if matches:
-                        matched_key = matches[0]
-                        projeto_existente_obj = match_map[matched_key]
-                        projeto_id_existente = projeto_existente_obj['id']
-                        # Projeto correspondente encontrado no BD
-
-                    # Normaliza os detalhes das bolsas
-                    bolsas_detalhadas = []
-                    for bolsa in proj_info.get('detalhe_bolsas', []):
-                        bolsas_detalhadas.append({
-                            'tipo': bolsa.get('tipo_bolsa'),
-                            'remuneracao': bolsa.get('valor_bolsa'),
-                            'vagas': bolsa.get('vagas', 1),
-                            'numero_perfil': self._normalize_perfil(bolsa.get('numero_perfil')),
-                            'requisito': bolsa.get('requisitos')
-                        })
-
-                    # Monta o payload para este projeto específico
-                    projeto_atual = {
-                        'id': projeto_id_existente, # Será null se for um projeto novo
-                        'nome_projeto': nome_projeto_db,
-                        'orientador': self._normalize_text_for_db(proj_info.get('orientador')),
-                        'centro': proj_info.get('centro'),
-                        'resumo': proj_info.get('resumo'),
-                        'detalhe_bolsas': bolsas_detalhadas
-                    }
-                    projetos_payload.append(projeto_atual)
-
-            # 3. Monta o payload final para a função RPC
-            payload_final = {
-                'titulo': edital_data.get('titulo'),
-                'link': edital_url,
-                'data_fim_inscricao': edital_data.get('data_fim_inscricao'),
-                'data_publicacao': edital_data.get('data_publicacao'),
-                'data_divulgacao_resultado': edital_data.get('data_divulgacao_resultado'),
-                'modalidade': edital_data.get('modalidade', 'extensao'),  # ← NOVO: Salva modalidade
-                'projetos': projetos_payload
-            }
-
-            # 4. Chama a função RPC com o payload completo
-            rpc_response = self.client.rpc('handle_edital_upsert', {'edital_payload': payload_final}).execute()
-
-            if rpc_response.data:
-                final_edital_id = rpc_response.data
-                # Edital salvo com sucesso
-                
-                # 🧹 LIMPEZA AUTOMÁTICA: Remove bolsas não preenchidas de editais antigos
-                if edital_data.get('etapa') == 'inscricao':  # Só limpa para editais de inscrição
-                    self._cleanup_old_available_bolsas()
-                
-                # 🔔 NOTIFICAÇÕES TELEGRAM INTELIGENTES via FILA
-                # ✅ Só enfileira se for EDITAL NOVO (evita spam)
-                if is_edital_novo:
-                    try:
-                        tipo_edital = edital_data.get('etapa', 'inscricao')
-                        modalidade = edital_data.get('modalidade', 'extensao')
-                        
-                        if modalidade == 'apoio_academico':
-                            tipo_notificacao = 'apoio_academico'
-                        elif tipo_edital == 'resultado':
-                            tipo_notificacao = 'resultado'
-                        else:
-                            tipo_notificacao = 'extensao'
-                        
-                        usuarios_interessados = self._buscar_usuarios_por_preferencia(modalidade)
-                        
-                        if not usuarios_interessados:
-                            print(f"ℹ️ [SEM USUÁRIOS] Nenhum usuário quer receber '{modalidade}'. Não notificando.")
-                        else:
-                            # Enfileira a notificação em vez de enviar diretamente
-                            self._enfileirar_notificacao(
-                                edital_id=final_edital_id,
-                                edital_titulo=edital_data.get('titulo', 'Novo Edital'),
-                                edital_link=edital_url,
-                                tipo_edital=tipo_edital,
-                                tipo_notificacao=tipo_notificacao,
-                                usuarios=usuarios_interessados
-                            )
-                            
-                    except Exception as e:
-                        print(f"❌ Erro durante a lógica de enfileiramento de notificação: {e}")
-                else:
-                    print(f"ℹ️ [EDITAL EXISTENTE] Notificação ignorada (edital já existia): '{edital_data.get('titulo')}'")
-                
-                return final_edital_id
-            else:
-                # Tenta fornecer um erro mais detalhado, se possível
-                error_message = "A função RPC não retornou um ID."
-                if hasattr(rpc_response, 'error') and rpc_response.error:
-                    error_message = f"Erro na RPC: {rpc_response.error.message}"
-                raise Exception(error_message)
-
-        except Exception as e:
-            print(f"  > ERRO na operação transacional para o edital '{edital_data.get('titulo')}': {e}")
-            import traceback
-            traceback.print_exc()
+        if self._write_batch is not None:
+            self._write_batch.append((edital_data, edital_url))
+            print(f"  > [BUFFER] Edital '{edital_data.get('titulo')}' na fila de gravação ({len(self._write_batch)}/{self._write_batch_threshold}).")
+            if len(self._write_batch) >= self._write_batch_threshold:
+                self.flush_writes()
             return None
 
+        return self._gravar_editais([(edital_data, edital_url)]).get(edital_url)
+
     def atualizar_bolsas_com_resultado(self, aprovados: list, edital_url: str = 'https://uenf.br/editais'):
         """
         🚀 VERSÃO OTIMIZADA: Batch Processing (75x mais rápido!)
@@ -324,9 +463,15 @@ class SupabaseManager:
         - Processa matches em memória
         - Batch update final
         """
+        # 📦 O casamento de resultados lê projetos/bolsas do banco: grava antes o que está no buffer
+        self.flush_writes()
+
         # Esta função agora delega diretamente para a versão otimizada.
         # A implementação antiga e mais lenta foi removida.
-        return self._atualizar_bolsas_otimizado(aprovados, edital_url)
+        bolsas_atualizadas = self._atualizar_bolsas_otimizado(aprovados, edital_url)
+        if bolsas_atualizadas:
+            self.cache.invalidate()
+        return bolsas_atualizadas
     
     def _atualizar_bolsas_otimizado(self, aprovados: list, edital_url: str):
         """🚀 Versão otimizada com batch processing"""
@@ -397,18 +542,121 @@ class SupabaseManager:
         
         return bolsas_atualizadas
 
+    def iter_row_chunks(self, table: str, columns: str = '*', key: str = 'id', chunk_size: int = 1000, filters: list = None):
+        """
+        📚 Lê uma tabela inteira em blocos de `chunk_size` linhas, paginando por chave
+        (keyset: `key > último valor`), em vez de um único select que o PostgREST corta
+        no limite de linhas e que carrega tudo na memória de uma vez.
+
+        - `columns`: projeção (a chave e o `id` são incluídos automaticamente);
+        - `key`: coluna de ordenação ('id', 'created_at', ...). Se não for 'id', o `id`
+          desempata linhas com o mesmo valor;
+        - `filters`: lista de (método, *args) aplicados à query, ex: [('eq', 'status', 'disponivel')].
+        """
+        if columns != '*':
+            colunas = [c.strip() for c in columns.split(',')]
+            columns = ', '.join(colunas + [c for c in dict.fromkeys([key, 'id']) if c not in colunas])
+
+        ultimo = None
+        while True:
+            query = self.client.table(table).select(columns)
+            for metodo, *args in filters or []:
+                query = getattr(query, metodo)(*args)
+            if ultimo is not None:
+                if key == 'id':
+                    query = query.gt('id', ultimo['id'])
+                else:
+                    valor = f'"{ultimo[key]}"'
+                    query = query.or_(f"{key}.gt.{valor},and({key}.eq.{valor},id.gt.{ultimo['id']})")
+            query = query.order(key)
+            if key != 'id':
+                query = query.order('id')
+
+            rows = query.limit(chunk_size).execute().data or []
+            if rows:
+                yield rows
+            if len(rows) < chunk_size:
+                return
+            ultimo = rows[-1]
+
+    def iter_rows(self, table: str, columns: str = '*', key: str = 'id', chunk_size: int = 1000, filters: list = None):
+        """Como `iter_row_chunks`, mas devolve uma linha por vez."""
+        for chunk in self.iter_row_chunks(table, columns, key, chunk_size, filters):
+            yield from chunk
+
     def get_all_orientadores(self) -> list:
         """Busca todos os nomes de orientadores únicos no banco de dados."""
+        # 📦 Inclui os projetos de editais ainda no buffer de gravação
+        self.flush_writes()
         try:
-            response = self.client.table('projetos').select('orientador').execute()
-            if response.data:
-                # Retorna os nomes como estão no banco (já normalizados de forma "suave")
-                return list(set([item['orientador'] for item in response.data if item.get('orientador')]))
-            return []
+            # Retorna os nomes como estão no banco (já normalizados de forma "suave")
+            return list({item['orientador'] for item in self.iter_rows('projetos', 'orientador') if item.get('orientador')})
         except Exception as e:
             print(f"  > Erro ao buscar lista de orientadores: {e}")
             return []
 
+    def _get_totais_bolsas_agrupadas(self, status: Optional[str] = None, centro: Optional[str] = None, tipo: Optional[str] = None, q: Optional[str] = None):
+        """
+        Soma de vagas (total e preenchidas) de todas as bolsas agrupadas que passam nos filtros.
+
+        Usa a RPC `bolsas_totais_agrupadas` (backend/sql/002_bolsas_totais_agrupadas.sql), que
+        devolve uma única linha. Se a função não existir no banco, soma em Python lendo só
+        `vagas_total,status` das linhas filtradas. Retorna (total_vagas, vagas_preenchidas) ou None.
+        """
+        search_query = None
+        if q:
+            q_normalized = get_match_key(q)
+            search_query = " & ".join([f"{term}:*" for term in q_normalized.split()])
+
+        try:
+            response = self.client.rpc('bolsas_totais_agrupadas', {
+                'p_status': status,
+                'p_centro': centro,
+                'p_tipo': tipo,
+                'p_fts': search_query,
+                'p_busca': None,
+            }).execute()
+            if response.data:
+                totais = response.data[0]
+                return int(totais.get('total_vagas') or 0), int(totais.get('vagas_preenchidas') or 0)
+        except Exception as e:
+            print(f"⚠️ RPC bolsas_totais_agrupadas indisponível, somando em Python: {e}")
+
+        try:
+            all_query = self.client.table('bolsas_view_agrupada').select('vagas_total,status')
+            
+            # Aplicar os mesmos filtros da query principal
+            if status and status != 'all':
+                all_query = all_query.eq('status', status)
+            if centro and centro != 'all':
+                all_query = all_query.eq('centro', centro)  
+            if tipo and tipo != 'all':
+                if tipo == 'extensao':
+                    all_query = all_query.or_('tipo.ilike.%Extensão%,tipo.ilike.%Discente%')
+                elif tipo == 'UA Superior':
+                    all_query = all_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Superior%')
+                elif tipo == 'UA Médio':
+                    filter_string = 'or(tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%),or(tipo.ilike.%Médio%,tipo.ilike.%Nível Médio%)'
+                    all_query.params = all_query.params.set('and', f'({filter_string})')
+                elif tipo == 'UA Fundamental':
+                    all_query = all_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Fundamental%')
+            if search_query:
+                all_query = all_query.filter('fts', 'fts(portuguese)', search_query)
+            
+            all_bolsas = all_query.execute().data or []
+            
+            # vagas_total nulo conta 1, como o coalesce da RPC
+            total_vagas = sum(1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in all_bolsas)
+            vagas_preenchidas = sum(
+                1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in all_bolsas
+                if bolsa.get('status') == 'preenchida'
+            )
+            return total_vagas, vagas_preenchidas
+        except Exception as calc_error:
+            print(f"⚠️ Erro ao calcular totais Python: {calc_error}")
+            return None
+
+    @cached_read
     def get_bolsas_agrupadas_paginated(self, page: int = 1, page_size: int = 10, status: Optional[str] = None, centro: Optional[str] = None, tipo: Optional[str] = None, q: Optional[str] = None, sort: str = 'created_at', order: str = 'desc'):
         """
         🆕 NOVA FUNCIONALIDADE: Busca bolsas AGRUPADAS (mesmo projeto + perfil = 1 card com quantidade)
@@ -467,54 +715,29 @@ class SupabaseManager:
             end_idx = start_idx + page_size - 1
             query = query.range(start_idx, end_idx)
             
+            # ⚡ Página e totais são independentes: os totais rodam em paralelo com a página
+            # 🔧 TOTAIS COM TODOS OS DADOS FILTRADOS (não só da página atual), calculados no banco
+            totais_future = QUERY_EXECUTOR.submit(self._get_totais_bolsas_agrupadas, status, centro, tipo, q)
+
             response = query.execute()
             
             bolsas = response.data
             total_count = response.count if response.count is not None else 0
             total_pages = (total_count + page_size - 1) // page_size
 
-            # 🔧 CALCULAR TOTAIS COM TODOS OS DADOS (não só da página atual)
             try:
-                # Query separada para calcular totais gerais  
-                all_query = self.client.table('bolsas_view_agrupada').select('vagas_total,status')
-                
-                # Aplicar os mesmos filtros da query principal
-                if status and status != 'all':
-                    all_query = all_query.eq('status', status)
-                if centro and centro != 'all':
-                    all_query = all_query.eq('centro', centro)  
-                if tipo and tipo != 'all':
-                    if tipo == 'extensao':
-                        all_query = all_query.or_('tipo.ilike.%Extensão%,tipo.ilike.%Discente%')
-                    elif tipo == 'UA Superior':
-                        all_query = all_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Superior%')
-                    elif tipo == 'UA Médio':
-                        filter_string = 'or(tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%),or(tipo.ilike.%Médio%,tipo.ilike.%Nível Médio%)'
-                        all_query.params = all_query.params.set('and', f'({filter_string})')
-                    elif tipo == 'UA Fundamental':
-                        all_query = all_query.or_('tipo.ilike.%UA%,tipo.ilike.%Universidade Aberta%').ilike('tipo', '%Fundamental%')
-                if q:
-                    q_normalized = get_match_key(q)
-                    search_terms = q_normalized.split()
-                    search_query = " & ".join([f"{term}:*" for term in search_terms])
-                    all_query = all_query.filter('fts', 'fts(portuguese)', search_query)
-                
-                all_response = all_query.execute()
-                all_bolsas = all_response.data or []
-                
-                # Calcular totais com TODOS os dados filtrados
-                total_vagas = sum(bolsa.get('vagas_total', 1) for bolsa in all_bolsas)
-                vagas_preenchidas = sum(
-                    bolsa.get('vagas_total', 1) for bolsa in all_bolsas 
-                    if bolsa.get('status') == 'preenchida'
-                )
-                
-            except Exception as calc_error:
-                print(f"⚠️ Erro ao calcular totais Python: {calc_error}")
+                totais = totais_future.result()
+            except Exception as e:
+                # Falha nos totais não derruba a página: cai no cálculo com os dados da página
+                print(f"⚠️ Erro ao calcular totais das bolsas agrupadas: {e}")
+                totais = None
+            if totais is not None:
+                total_vagas, vagas_preenchidas = totais
+            else:
                 # Fallback: calcular só com dados da página
-                total_vagas = sum(bolsa.get('vagas_total', 1) for bolsa in bolsas)
+                total_vagas = sum(1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in bolsas)
                 vagas_preenchidas = sum(
-                    bolsa.get('vagas_total', 1) for bolsa in bolsas 
+                    1 if bolsa.get('vagas_total') is None else bolsa['vagas_total'] for bolsa in bolsas 
                     if bolsa.get('status') == 'preenchida'
                 )
 
@@ -616,6 +839,7 @@ class SupabaseManager:
                 "agrupadas": False
             }
 
+    @cached_read
     def get_bolsa(self, bolsa_id: str):
         """Busca uma única bolsa pelo seu ID usando a view."""
         try:
@@ -624,6 +848,7 @@ class SupabaseManager:
             print(f"  > Erro ao buscar bolsa por ID: {e}")
             return None
 
+    @cached_read
     def get_projetos(self, page: int = 1, page_size: int = 10):
         """Busca projetos com paginação."""
         try:
@@ -633,6 +858,7 @@ class SupabaseManager:
             print(f"  > Erro ao buscar projetos: {e}")
             return []
 
+    @cached_read
     def get_projeto(self, projeto_id: str):
         """Busca um único projeto pelo seu ID."""
         try:
@@ -641,6 +867,7 @@ class SupabaseManager:
             print(f"  > Erro ao buscar projeto por ID: {e}")
             return None
 
+    @cached_read
     def get_editais(self, page: int = 1, page_size: int = 10):
         """Busca editais com paginação."""
         try:
@@ -655,6 +882,7 @@ class SupabaseManager:
             print(f"  > Erro ao buscar editais: {e}")
             return []
 
+    @cached_read
     def get_edital(self, edital_id: str):
         """Busca um único edital pelo seu ID."""
         try:
@@ -674,8 +902,9 @@ class SupabaseManager:
             # Não trava a aplicação se o contador falhar, apenas loga o erro
             print(f"  > Erro ao incrementar view count para bolsa {bolsa_id}: {e}")
 
+    @cached_read
     def get_ranking_bolsas(self, limit: int = 10):
-        """Busca as bolsas mais vistas (ranking)."""
+        """Busca as bolsas mais vistas (ranking). Fica no cache de leitura até o TTL vencer."""
         try:
             return self.client.table('bolsas_view').select('*').order('view_count', desc=True).limit(limit).execute().data
         except Exception as e:
@@ -683,34 +912,70 @@ class SupabaseManager:
             return []
 
     def get_latest_edital_date(self):
-        """Busca a data de publicação mais recente de um edital no banco."""
+        """Busca a data de publicação mais recente de um edital no banco (ou no buffer de gravação)."""
+        # 📦 Considera também os editais ainda no buffer de gravação
+        datas = [edital_data.get('data_publicacao') for edital_data, _ in self._write_batch or []]
         try:
             # Busca apenas a data de publicação, ordena da mais nova para a mais antiga, e pega apenas a primeira.
             response = self.client.table('editais').select('data_publicacao').order('data_publicacao', desc=True).limit(1).single().execute()
-            if response.data and response.data.get('data_publicacao'):
-                return response.data.get('data_publicacao')
-            return None
+            if response.data:
+                datas.append(response.data.get('data_publicacao'))
         except Exception as e:
             # É normal não encontrar nada se o banco estiver vazio, então não logamos como um erro grave.
             print(f"  > Info: Não foi possível buscar a data do último edital (pode ser a primeira execução): {e}")
-            return None
+        datas = [d for d in datas if d]
+        return max(datas) if datas else None
 
+    def _load_data_epoch(self):
+        """Época dos dados para o cache: o valor atual de metadata.last_data_update."""
+        response = self.client.table('metadata').select('value').eq('key', 'last_data_update').limit(1).execute()
+        return response.data[0]['value'] if response.data else None
+
+    @cached_read
     def get_metadata(self) -> dict:
         """Busca todos os metadados da aplicação."""
         try:
             response = self.client.table('metadata').select('key, value').execute()
             if response.data:
-                # Transforma a lista de objetos em um único dicionário
-                return {item['key']: item['value'] for item in response.data}
+                # Transforma a lista de objetos em um único dicionário (sem o snapshot de analytics)
+                return {item['key']: item['value'] for item in response.data if item['key'] != SNAPSHOT_KEY}
             return {}
         except Exception as e:
             print(f"  > Erro ao buscar metadados: {e}")
             return {}
 
+    def save_analytics_snapshot(self, data_epoch: str = None):
+        """
+        📊 Recalcula o snapshot de analytics com os agregados da RPC `bolsas_analytics_agregado`
+        (backend/sql/006_bolsas_analytics_agregado.sql) e o grava em metadata.analytics_snapshot,
+        de onde a API o serve com uma única leitura.
+
+        A view bolsas_view_agrupada não tem chave única, então não é lida em blocos por id:
+        sem a RPC no banco, nenhum snapshot é gravado e a API calcula ao vivo.
+        """
+        self.flush_writes()
+        try:
+            linhas = self.client.rpc('bolsas_analytics_agregado', {}).execute().data or []
+        except Exception as e:
+            print(f"  > ⚠️ RPC bolsas_analytics_agregado indisponível, snapshot de analytics não gravado: {e}")
+            return None
+        try:
+            snapshot = build_analytics_snapshot_from_aggregates(linhas, data_epoch=data_epoch)
+            self.client.table('metadata').upsert({
+                'key': SNAPSHOT_KEY,
+                'value': json.dumps(snapshot, ensure_ascii=False)
+            }, on_conflict='key').execute()
+            print(f"  > [ANALYTICS] Snapshot gravado: {snapshot['total_bolsas']} vagas.")
+            return snapshot
+        except Exception as e:
+            print(f"  > Erro ao gravar o snapshot de analytics: {e}")
+            return None
+
     def update_last_data_update(self, timestamp: str):
         """Atualiza o timestamp da última atualização de dados."""
         try:
             self.client.table('metadata').update({'value': timestamp}).eq('key', 'last_data_update').execute()
+            self.cache.invalidate()
         except Exception as e:
             print(f"  > Erro ao atualizar o timestamp de last_data_update: {e}")
 
@@ -12,7 +12,7 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
     🚀 VERSÃO OTIMIZADA: Batch Processing
     
     Antes: 301 queries (1 + 100×3)
-    Depois: 4 queries (4 SELECTs + 1 batch UPDATE)
+    Depois: 3 leituras paginadas (projetos, bolsas disponíveis, aprovados) + 1 batch UPDATE
     
     Melhoria: 75x mais rápido!
     """
@@ -21,77 +21,61 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
 
     print(f"  > 🚀 [OTIMIZADO] Atualizando {len(aprovados)} bolsas com batch processing...")
     
-    # ========== ETAPA 1: CARREGAR TODOS OS DADOS DE UMA VEZ ==========
+    # ========== ETAPA 1+2: LER OS DADOS EM BLOCOS E MONTAR OS ÍNDICES EM MEMÓRIA ==========
+    # As tabelas são lidas com paginação por chave (iter_rows), só com as colunas usadas,
+    # e os índices são montados à medida que os blocos chegam.
     
-    # 1.1 Carregar todos os orientadores (1 query)
-    print(f"  > [1/4] Carregando orientadores...")
-    todos_orientadores_db = self.get_all_orientadores()
-    if not todos_orientadores_db:
-        print(f"  > ❌ Nenhum orientador encontrado no banco")
-        return 0
-    
-    # 1.2 Carregar TODOS os projetos de uma vez (1 query)
-    print(f"  > [2/4] Carregando todos os projetos...")
+    # 1.1 Projetos -> mapa por orientador (e, dele, a lista de orientadores)
+    print(f"  > [1/3] Carregando projetos...")
+    projetos_por_orientador = defaultdict(list)
+    total_projetos = 0
     try:
-        response_projetos = self.client.table('projetos').select('*').execute()
-        todos_projetos = response_projetos.data
-        print(f"  > ✅ {len(todos_projetos)} projetos carregados")
+        for projeto in self.iter_rows('projetos', 'id, nome_projeto, orientador, centro, edital_id'):
+            total_projetos += 1
+            orientador = projeto.get('orientador')
+            if orientador:
+                projetos_por_orientador[orientador].append(projeto)
+        print(f"  > ✅ {total_projetos} projetos carregados")
     except Exception as e:
         print(f"  > ❌ Erro ao carregar projetos: {e}")
         return 0
     
-    # 1.3 Carregar TODAS as bolsas disponíveis de uma vez (1 query)
-    print(f"  > [3/4] Carregando bolsas disponíveis...")
-    try:
-        response_bolsas = self.client.table('bolsas').select('*').eq('status', 'disponivel').execute()
-        todas_bolsas_disponiveis = response_bolsas.data
-        print(f"  > ✅ {len(todas_bolsas_disponiveis)} bolsas disponíveis carregadas")
-    except Exception as e:
-        print(f"  > ❌ Erro ao carregar bolsas: {e}")
+    if not projetos_por_orientador:
+        print(f"  > ❌ Nenhum orientador encontrado no banco")
         return 0
     
-    # 1.4 Carregar candidatos já aprovados (para anti-duplicação) (1 query)
-    print(f"  > [4/4] Carregando candidatos já aprovados...")
-    try:
-        response_candidatos = self.client.table('bolsas').select('projeto_id, candidato_aprovado').eq('status', 'preenchida').execute()
-        candidatos_aprovados_db = response_candidatos.data
-        print(f"  > ✅ {len(candidatos_aprovados_db)} candidatos já aprovados carregados")
-    except Exception as e:
-        print(f"  > ❌ Erro ao carregar candidatos: {e}")
-        candidatos_aprovados_db = []
-    
-    # ========== ETAPA 2: CRIAR ÍNDICES EM MEMÓRIA PARA BUSCA RÁPIDA ==========
-    
-    print(f"  > 🔧 Criando índices em memória...")
-    
-    # 2.1 Mapa de orientadores: chave normalizada -> [nomes originais]
+    # Mapa de orientadores: chave normalizada -> [nomes originais]
     orientador_keys_to_originals = defaultdict(list)
-    for o in todos_orientadores_db:
+    for o in projetos_por_orientador:
         key = self._get_match_key(o)
         if o not in orientador_keys_to_originals[key]:
             orientador_keys_to_originals[key].append(o)
     
-    # 2.2 Mapa de projetos por orientador: orientador -> [projetos]
-    projetos_por_orientador = defaultdict(list)
-    for projeto in todos_projetos:
-        orientador = projeto.get('orientador')
-        if orientador:
-            projetos_por_orientador[orientador].append(projeto)
-    
-    # 2.3 Mapa de bolsas por projeto: (projeto_id, numero_perfil) -> bolsa
+    # 1.2 Bolsas disponíveis -> mapa (projeto_id, numero_perfil) -> bolsa
+    print(f"  > [2/3] Carregando bolsas disponíveis...")
     bolsas_por_projeto_perfil = {}
-    for bolsa in todas_bolsas_disponiveis:
-        key = (bolsa.get('projeto_id'), bolsa.get('numero_perfil'))
-        if key[0] and key[1]:
-            bolsas_por_projeto_perfil[key] = bolsa
+    try:
+        for bolsa in self.iter_rows('bolsas', 'id, projeto_id, numero_perfil', filters=[('eq', 'status', 'disponivel')]):
+            key = (bolsa.get('projeto_id'), bolsa.get('numero_perfil'))
+            if key[0] and key[1]:
+                bolsas_por_projeto_perfil[key] = bolsa
+        print(f"  > ✅ {len(bolsas_por_projeto_perfil)} bolsas disponíveis carregadas")
+    except Exception as e:
+        print(f"  > ❌ Erro ao carregar bolsas: {e}")
+        return 0
     
-    # 2.4 Mapa de candidatos aprovados por projeto: projeto_id -> [candidatos]
+    # 1.3 Candidatos já aprovados (para anti-duplicação) -> projeto_id -> [candidatos]
+    print(f"  > [3/3] Carregando candidatos já aprovados...")
     candidatos_por_projeto = defaultdict(list)
-    for item in candidatos_aprovados_db:
-        projeto_id = item.get('projeto_id')
-        candidato = item.get('candidato_aprovado')
-        if projeto_id and candidato:
-            candidatos_por_projeto[projeto_id].append(candidato)
+    try:
+        for item in self.iter_rows('bolsas', 'projeto_id, candidato_aprovado', filters=[('eq', 'status', 'preenchida')]):
+            projeto_id = item.get('projeto_id')
+            candidato = item.get('candidato_aprovado')
+            if projeto_id and candidato:
+                candidatos_por_projeto[projeto_id].append(candidato)
+        print(f"  > ✅ {sum(len(c) for c in candidatos_por_projeto.values())} candidatos já aprovados carregados")
+    except Exception as e:
+        print(f"  > ❌ Erro ao carregar candidatos: {e}")
     
     print(f"  > ✅ Índices criados em memória")
     
@@ -99,6 +83,7 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
     
     print(f"  > 🔍 Processando matches em memória...")
     updates_para_fazer = []  # Lista de updates a fazer em batch
+    projetos_preenchidos = []  # Projeto de cada bolsa preenchida (para os rollups)
     
     for i, aprovado in enumerate(aprovados, 1):
         orientador_original = aprovado.get('orientador')
@@ -180,6 +165,8 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
             'candidato_aprovado': candidato_aprovado
         })
         
+        projetos_preenchidos.append(best_match_project)
+        
         # Remove da lista de disponíveis para evitar duplicação
         del bolsas_por_projeto_perfil[bolsa_key]
         
@@ -205,6 +192,10 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
     else:
         print(f"  > ⚠️ Nenhuma atualização a fazer")
     
+    # 📈 Rollups históricos: bolsas preenchidas
+    if bolsas_atualizadas > 0:
+        self._rollup_preenchimentos(projetos_preenchidos)
+    
     # ========== ETAPA 5: NOTIFICAÇÕES (SE NECESSÁRIO) ==========
     
     if bolsas_atualizadas > 0:
@@ -229,7 +220,7 @@ def atualizar_bolsas_com_resultado_otimizado(self, aprovados: list, edital_url:
             print(f"  > ⚠️ Erro ao enviar notificações: {e}")
     
     print(f"  > ✨ CONCLUÍDO: {bolsas_atualizadas} bolsas atualizadas")
-    print(f"  > 📊 Performance: ~4 queries (vs {1 + len(aprovados) * 3} na versão antiga)")
+    print(f"  > 📊 Performance: 3 leituras paginadas + 1 update (vs {1 + len(aprovados) * 3} queries na versão antiga)")
     
     return bolsas_atualizadas
 
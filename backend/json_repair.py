@@ -0,0 +1,111 @@
+"""
+Decodificador tolerante para o JSON devolvido pela IA
+Aproveita o prefixo válido de respostas cortadas e corrige os defeitos mais comuns
+(cercas de markdown, texto em volta, vírgula sobrando), evitando refazer a chamada inteira.
+"""
+import json
+import re
+
+_FENCE = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL | re.IGNORECASE)
+
+
+def strip_markdown(text: str) -> str:
+    """Remove cercas ```json``` e qualquer texto antes do primeiro '{' ou '['."""
+    text = (text or "").strip()
+    match = _FENCE.search(text)
+    if match:
+        text = match.group(1)
+    starts = [i for i in (text.find('{'), text.find('[')) if i != -1]
+    return text[min(starts):] if starts else ""
+
+
+def _scan(text: str) -> tuple:
+    """
+    Percorre o texto uma única vez (respeitando strings) e retorna:
+    - o texto sem vírgulas sobrando antes de '}' / ']';
+    - o fim do primeiro valor JSON completo (ou None, se o texto foi cortado);
+    - o último ponto de corte seguro e a pilha de colchetes abertos naquele ponto.
+
+    Um corte é seguro logo após fechar um objeto/lista, ou numa vírgula do nível
+    mais externo ou que vem depois de um objeto/lista fechado. Assim um corte nunca
+    deixa uma linha/perfil pela metade: ele é descartado inteiro.
+    """
+    out = []
+    stack = []
+    in_string = escape = False
+    last_significant = None
+    safe_len, safe_stack = 0, []
+
+    for ch in text:
+        if in_string:
+            out.append(ch)
+            if escape:
+                escape = False
+            elif ch == '\\':
+                escape = True
+            elif ch == '"':
+                in_string = False
+                last_significant = '"'
+            continue
+
+        if ch == '"':
+            in_string = True
+        elif ch in '{[':
+            stack.append(ch)
+        elif ch in '}]':
+            if not stack:
+                break
+            # Vírgula sobrando: `[1, 2,]` -> `[1, 2]`
+            if last_significant == ',':
+                while out[-1] != ',':
+                    out.pop()
+                out.pop()
+            stack.pop()
+            out.append(ch)
+            last_significant = ch
+            safe_len, safe_stack = len(out), list(stack)
+            if not stack:
+                return ''.join(out), len(out), safe_len, safe_stack
+            continue
+        elif ch == ',' and (len(stack) == 1 or last_significant in ('}', ']')):
+            safe_len, safe_stack = len(out), list(stack)
+
+        out.append(ch)
+        if not ch.isspace():
+            last_significant = ch
+
+    return ''.join(out), None, safe_len, safe_stack
+
+
+def repair_json(text: str) -> tuple:
+    """
+    Decodifica a resposta da IA de forma tolerante.
+
+    Retorna (objeto, completo):
+    - (obj, True): JSON válido, possivelmente após remover markdown/vírgulas sobrando;
+    - (obj, False): resposta cortada; `obj` contém só os elementos completos do prefixo;
+    - (None, False): nada aproveitável.
+    """
+    text = strip_markdown(text)
+    if not text:
+        return None, False
+    try:
+        return json.loads(text), True
+    except ValueError:
+        pass
+
+    cleaned, end, safe_len, safe_stack = _scan(text)
+    if end is not None:
+        try:
+            return json.loads(cleaned[:end]), True
+        except ValueError:
+            return None, False
+
+    if not safe_len:
+        return None, False
+    prefix = cleaned[:safe_len].rstrip().rstrip(',')
+    closing = ''.join('}' if ch == '{' else ']' for ch in reversed(safe_stack))
+    try:
+        return json.loads(prefix + closing), False
+    except ValueError:
+        return None, False
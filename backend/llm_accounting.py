@@ -0,0 +1,135 @@
+"""
+Contabilidade de custo e latência das chamadas à IA
+Registra cada chamada ao backend (tipo de prompt, modelo, chave, tokens, latência,
+resultado) e, ao final da execução, gera um resumo em JSON com a tabela de percentis,
+para ver onde vão o tempo e a cota.
+"""
+import os
+import json
+import math
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+OUTCOME_OK = "ok"
+OUTCOME_QUOTA_DAILY = "quota_daily"
+OUTCOME_QUOTA_MINUTE = "quota_minute"
+OUTCOME_ERROR = "error"
+
+
+def percentile(values: list, p: float):
+    """Percentil por posição mais próxima (None para lista vazia)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))]
+
+
+class LLMAccounting:
+    """
+    Registro, por execução, de todas as chamadas ao backend de LLM.
+
+    Retentativas não precisam ser informadas: chamadas repetidas com o mesmo prompt
+    (mesma impressão digital) contam como retentativa, exceto as duplicatas de hedge,
+    que são contadas à parte.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.edital = None
+        self.started_at = datetime.now()
+        self._lock = threading.Lock()
+
+    def record(self, call_site: str, model: str, key_index: int, fingerprint: str, latency: float,
+               outcome: str = OUTCOME_OK, input_tokens: int = 0, output_tokens: int = 0,
+               cached: bool = False, hedge: bool = False):
+        with self._lock:
+            self.records.append({
+                'call_site': call_site or 'desconhecido',
+                'model': model,
+                'key_index': key_index,
+                'fingerprint': fingerprint,
+                'latency': round(latency, 3),
+                'outcome': outcome,
+                'input_tokens': input_tokens or 0,
+                'output_tokens': output_tokens or 0,
+                'cached': cached,
+                'hedge': hedge,
+                'edital': self.edital,
+            })
+
+    def _group_summary(self, records: list) -> dict:
+        latencies = [r['latency'] for r in records]
+        vistos = set()
+        retries = 0
+        for r in records:
+            if r['hedge']:
+                continue
+            if r['fingerprint'] in vistos:
+                retries += 1
+            vistos.add(r['fingerprint'])
+        return {
+            'calls': len(records),
+            'ok': sum(1 for r in records if r['outcome'] == OUTCOME_OK),
+            'errors': sum(1 for r in records if r['outcome'] == OUTCOME_ERROR),
+            'quota_errors': sum(1 for r in records if r['outcome'] in (OUTCOME_QUOTA_DAILY, OUTCOME_QUOTA_MINUTE)),
+            'retries': retries,
+            'hedges': sum(1 for r in records if r['hedge']),
+            'cache_hits': sum(1 for r in records if r['cached']),
+            'input_tokens': sum(r['input_tokens'] for r in records),
+            'output_tokens': sum(r['output_tokens'] for r in records),
+            'seconds': round(sum(latencies), 3),
+            'latency_p50': percentile(latencies, 0.50),
+            'latency_p90': percentile(latencies, 0.90),
+            'latency_p99': percentile(latencies, 0.99),
+            'latency_max': max(latencies) if latencies else None,
+        }
+
+    def summary(self) -> dict:
+        """Resumo da execução: total e agrupado por tipo de prompt, modelo, chave e edital."""
+        with self._lock:
+            records = list(self.records)
+
+        def agrupar(campo):
+            grupos = defaultdict(list)
+            for r in records:
+                grupos[str(r[campo])].append(r)
+            return {nome: self._group_summary(itens) for nome, itens in grupos.items()}
+
+        return {
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'total': self._group_summary(records),
+            'by_call_site': agrupar('call_site'),
+            'by_model': agrupar('model'),
+            'by_key': agrupar('key_index'),
+            'by_edital': agrupar('edital'),
+        }
+
+    def format_table(self, summary: dict = None) -> str:
+        """Tabela de texto por tipo de prompt: chamadas, tokens e percentis de latência."""
+        summary = summary or self.summary()
+        linhas = [f"{'tipo':<20} {'chamadas':>8} {'retent.':>7} {'hedges':>6} {'tok.ent':>9} {'tok.saí':>9} "
+                  f"{'p50 s':>7} {'p90 s':>7} {'p99 s':>7} {'total s':>8}"]
+
+        def fmt(valor):
+            return f"{valor:.2f}" if valor is not None else "-"
+
+        grupos = list(summary['by_call_site'].items()) + [('TOTAL', summary['total'])]
+        for nome, g in grupos:
+            linhas.append(
+                f"{nome:<20} {g['calls']:>8} {g['retries']:>7} {g['hedges']:>6} {g['input_tokens']:>9} {g['output_tokens']:>9} "
+                f"{fmt(g['latency_p50']):>7} {fmt(g['latency_p90']):>7} {fmt(g['latency_p99']):>7} {fmt(g['seconds']):>8}"
+            )
+        return "\n".join(linhas)
+
+    def write_summary(self, log_dir: str = None) -> str:
+        """Grava o resumo em backend/logs/llm_accounting_<data>.json e retorna o caminho."""
+        log_dir = log_dir or os.path.join(os.path.dirname(__file__), 'logs')
+        os.makedirs(log_dir, exist_ok=True)
+        summary = self.summary()
+        summary['table'] = self.format_table(summary)
+        filepath = os.path.join(log_dir, f"llm_accounting_{self.started_at.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        with open(filepath, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        return filepath
@@ -0,0 +1,464 @@
+"""
+Backends de Modelo de Linguagem para o UenfParser
+Permite trocar o Gemini real por um modelo falso, determinístico e offline,
+para rodar, medir e testar o parser sem rede e sem gastar cota.
+"""
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+from collections import defaultdict
+
+from .llm_schema import COMPACT_MARKER, LAST_ROW_LABEL, DONE_PERFIS_LABEL
+
+
+class QuotaExceededError(Exception):
+    """
+    Erro 429 de cota esgotada, independente do backend.
+
+    `daily=True` indica cota DIÁRIA da chave (deve rotacionar a chave);
+    caso contrário é um limite por minuto, que as pausas resolvem.
+    """
+
+    def __init__(self, message: str, daily: bool = False):
+        super().__init__(message)
+        self.daily = daily
+
+
+class FakeBackendError(Exception):
+    """Erro transitório simulado pelo backend falso (equivalente a um 500/503)."""
+
+
+class LLMResponse:
+    """Resposta normalizada de qualquer backend (compatível com `response.text`)."""
+
+    def __init__(self, text: str, input_tokens: int = 0, output_tokens: int = 0, model: str = None, cached: bool = False):
+        self.text = text
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+        self.model = model
+        self.cached = cached
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa barata de tokens (~4 caracteres por token), usada quando o backend não informa."""
+    if not text:
+        return 0
+    return max(1, len(text) // 4)
+
+
+def prompt_fingerprint(prompt: str) -> str:
+    """Hash estável do prompt, usado como chave das gravações."""
+    return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+
+class LLMBackend:
+    """
+    Interface mínima de um backend de LLM.
+
+    Cada chamada recebe a chave de API explicitamente, então o backend não guarda
+    estado global de chave (seguro para chamadas concorrentes).
+    """
+    name = "base"
+    requires_api_keys = True
+    default_model = "gemini-2.5-flash"
+
+    def generate(self, prompt: str, api_key: str = None, call_site: str = None, timeout: float = 600,
+                 max_output_tokens: int = None, model: str = None) -> LLMResponse:
+        raise NotImplementedError
+
+    def default_api_keys(self) -> list:
+        """Chaves usadas quando o backend não precisa de chaves reais."""
+        return []
+
+
+class GeminiBackend(LLMBackend):
+    """
+    Backend real: Google Gemini pela API pública do cliente (google.ai.generativelanguage,
+    instalado com o google-generativeai). Cada chave tem seu próprio GenerativeServiceClient
+    e cada chamada monta o GenerateContentRequest, sem `genai.configure` global (que não é
+    seguro entre threads) nem atributos internos do GenerativeModel.
+    """
+    name = "gemini"
+
+    def __init__(self, model_name: str = None):
+        # Import tardio: o backend falso funciona sem a biblioteca do Google instalada
+        import google.ai.generativelanguage as glm
+        from google.api_core import exceptions as google_exceptions
+
+        self._glm = glm
+        self._google_exceptions = google_exceptions
+        self.model_name = model_name or self.default_model
+        bloquear_nada = glm.SafetySetting.HarmBlockThreshold.BLOCK_NONE
+        self.safety_settings = [
+            glm.SafetySetting(category=categoria, threshold=bloquear_nada)
+            for categoria in (
+                glm.HarmCategory.HARM_CATEGORY_HARASSMENT,
+                glm.HarmCategory.HARM_CATEGORY_HATE_SPEECH,
+                glm.HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT,
+                glm.HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT,
+            )
+        ]
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _client_for(self, api_key: str):
+        """Um cliente por chave, criado no primeiro uso (os clientes são seguros entre threads)."""
+        with self._lock:
+            client = self._clients.get(api_key)
+            if client is None:
+                client = self._glm.GenerativeServiceClient(client_options={'api_key': api_key})
+                self._clients[api_key] = client
+            return client
+
+    def _build_request(self, prompt: str, model_name: str, max_output_tokens: int = None):
+        glm = self._glm
+        campos = {
+            'model': model_name if model_name.startswith('models/') else f"models/{model_name}",
+            'contents': [glm.Content(role='user', parts=[glm.Part(text=prompt)])],
+            'safety_settings': self.safety_settings,
+        }
+        if max_output_tokens:
+            campos['generation_config'] = glm.GenerationConfig(max_output_tokens=max_output_tokens)
+        return glm.GenerateContentRequest(**campos)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        """Texto do primeiro candidato (como `response.text` do google-generativeai)."""
+        if not response.candidates:
+            raise ValueError(f"Resposta sem candidatos (bloqueada?): {response.prompt_feedback}")
+        partes = [parte.text for parte in response.candidates[0].content.parts if parte.text]
+        if not partes:
+            raise ValueError(f"Resposta sem texto (finish_reason={response.candidates[0].finish_reason})")
+        return ''.join(partes)
+
+    def generate(self, prompt: str, api_key: str = None, call_site: str = None, timeout: float = 600,
+                 max_output_tokens: int = None, model: str = None) -> LLMResponse:
+        model_name = model or self.model_name
+        client = self._client_for(api_key)
+        try:
+            response = client.generate_content(
+                request=self._build_request(prompt, model_name, max_output_tokens), timeout=timeout
+            )
+        except self._google_exceptions.ResourceExhausted as e:
+            raise QuotaExceededError(str(e), daily="GenerateRequestsPerDay" in str(e)) from e
+
+        usage = getattr(response, 'usage_metadata', None)
+        text = self._response_text(response)
+        return LLMResponse(
+            text=text,
+            input_tokens=getattr(usage, 'prompt_token_count', 0) or estimate_tokens(prompt),
+            output_tokens=getattr(usage, 'candidates_token_count', 0) or estimate_tokens(text),
+            model=model_name,
+        )
+
+
+class LatencyProfile:
+    """
+    Perfil de latência simulada: base + jitter + custo por token.
+    Os valores padrão imitam o gemini-2.5-flash em tabelas médias.
+    Com `tail_rate` > 0, uma fração das chamadas fica `tail_multiplier` vezes mais lenta
+    (a cauda longa que o hedge deve cortar).
+    """
+
+    def __init__(self, base_seconds: float = 1.5, jitter_seconds: float = 0.5,
+                 per_input_token_seconds: float = 0.0, per_output_token_seconds: float = 0.01,
+                 tail_rate: float = 0.0, tail_multiplier: float = 10.0):
+        self.base_seconds = base_seconds
+        self.jitter_seconds = jitter_seconds
+        self.per_input_token_seconds = per_input_token_seconds
+        self.per_output_token_seconds = per_output_token_seconds
+        self.tail_rate = tail_rate
+        self.tail_multiplier = tail_multiplier
+
+    def sample(self, rng: random.Random, input_tokens: int, output_tokens: int) -> float:
+        jitter = rng.uniform(-self.jitter_seconds, self.jitter_seconds) if self.jitter_seconds else 0.0
+        latency = (
+            self.base_seconds + jitter
+            + input_tokens * self.per_input_token_seconds
+            + output_tokens * self.per_output_token_seconds
+        )
+        if self.tail_rate and rng.random() < self.tail_rate:
+            latency *= self.tail_multiplier
+        return max(0.0, latency)
+
+
+def _extract_input_text(prompt: str) -> str:
+    """Retorna o texto de entrada do prompt (o trecho entre os dois últimos separadores '---')."""
+    lines = prompt.split('\n')
+    separators = [i for i, line in enumerate(lines) if line.strip() == '---']
+    if len(separators) >= 2:
+        return '\n'.join(lines[separators[-2] + 1:separators[-1]])
+    return prompt
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Backend falso e determinístico para execuções offline.
+
+    - Reproduz respostas gravadas (por hash do prompt) quando existirem;
+    - Caso contrário, sintetiza um JSON válido no schema esperado pelo `call_site`;
+    - Simula latência, erros transitórios e 429 (por minuto e diário por chave);
+    - `degraded_models`: {modelo: taxa} de respostas "fracas" (sem nenhuma linha/perfil),
+      para exercitar a escalada do roteamento de modelos.
+
+    O sorteio de cada chamada depende apenas de (seed, prompt, n-ésima repetição),
+    então o resultado não muda com a ordem das threads.
+    """
+    name = "fake"
+    requires_api_keys = False
+
+    def __init__(self, recordings: dict = None, recordings_path: str = None, latency: LatencyProfile = None,
+                 error_rate: float = 0.0, minute_quota_rate: float = 0.0, daily_request_limit: int = None,
+                 num_keys: int = 3, seed: int = 0, sleep=time.sleep, degraded_models: dict = None):
+        self.recordings = dict(recordings or {})
+        if recordings_path:
+            self.recordings.update(load_recordings(recordings_path))
+        self.latency = latency or LatencyProfile()
+        self.error_rate = error_rate
+        self.minute_quota_rate = minute_quota_rate
+        self.daily_request_limit = daily_request_limit
+        self.num_keys = num_keys
+        self.seed = seed
+        self.sleep = sleep
+        self.degraded_models = dict(degraded_models or {})
+
+        self.calls = []
+        self.requests_by_key = defaultdict(int)
+        self._prompt_counts = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def default_api_keys(self) -> list:
+        return [f"fake-key-{i + 1}" for i in range(self.num_keys)]
+
+    def generate(self, prompt: str, api_key: str = None, call_site: str = None, timeout: float = 600,
+                 max_output_tokens: int = None, model: str = None) -> LLMResponse:
+        fingerprint = prompt_fingerprint(prompt)
+        with self._lock:
+            occurrence = self._prompt_counts[fingerprint]
+            self._prompt_counts[fingerprint] += 1
+            self.requests_by_key[api_key] += 1
+            key_requests = self.requests_by_key[api_key]
+            self.calls.append({'call_site': call_site, 'api_key': api_key, 'fingerprint': fingerprint, 'model': model})
+
+        rng = random.Random(f"{self.seed}:{fingerprint}:{occurrence}")
+
+        if self.daily_request_limit is not None and key_requests > self.daily_request_limit:
+            raise QuotaExceededError(
+                "429 Quota exceeded for quota metric 'GenerateRequestsPerDay' (simulado)", daily=True
+            )
+        if rng.random() < self.minute_quota_rate:
+            raise QuotaExceededError(
+                "429 Quota exceeded for quota metric 'GenerateRequestsPerMinute' (simulado)", daily=False
+            )
+
+        recorded = self.recordings.get(fingerprint)
+        text = recorded if recorded is not None else synthesize_response(call_site, prompt)
+        if recorded is None and rng.random() < self.degraded_models.get(model, 0.0):
+            text = _degraded_response(call_site)
+
+        # Como na API real, a resposta é cortada no limite de tokens de saída
+        if max_output_tokens and estimate_tokens(text) > max_output_tokens:
+            text = text[:max_output_tokens * 4]
+
+        input_tokens = estimate_tokens(prompt)
+        output_tokens = estimate_tokens(text)
+        latency = self.latency.sample(rng, input_tokens, output_tokens)
+        if latency > timeout:
+            # Como na API real, a chamada que passa do prazo termina em erro
+            self.sleep(timeout)
+            raise FakeBackendError(f"504 Deadline Exceeded após {timeout:.0f}s (simulado)")
+        if latency > 0:
+            self.sleep(latency)
+
+        if rng.random() < self.error_rate:
+            raise FakeBackendError("503 Service Unavailable (simulado)")
+
+        return LLMResponse(
+            text=text,
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            model=f"fake/{model or self.default_model}",
+            cached=recorded is not None,
+        )
+
+
+def _degraded_response(call_site: str) -> str:
+    """Resposta JSON válida, mas sem nenhuma linha/perfil (modelo que "não viu" a tabela)."""
+    if call_site == 'resultado':
+        return '{"r": []}'
+    if call_site == 'bolsas':
+        return '{"p": "Projeto Sintético", "o": "Orientador Sintético", "b": []}'
+    return "{}"
+
+
+def synthesize_response(call_site: str, prompt: str) -> str:
+    """Gera uma resposta JSON válida no schema de cada tipo de prompt do parser."""
+    texto = _extract_input_text(prompt)
+    compacto = COMPACT_MARKER in prompt
+
+    if call_site == 'resultado':
+        rows = []
+        for idx, line in enumerate(l.strip() for l in texto.split('\n')):
+            ordinal = re.search(r'(\d+)\s*º', line)
+            if not ordinal:
+                continue
+            numeros = re.findall(r'\d+', line[ordinal.end():])
+            perfil = numeros[0] if numeros else "1"
+            rows.append([
+                f"Orientador {idx}", f"Projeto {idx}", line[:ordinal.start()].strip() or f"Candidato {idx}",
+                f"{ordinal.group(1)}º Classificado", perfil, "1",
+            ])
+        ultima = re.search(re.escape(LAST_ROW_LABEL) + r'\s*(\[.*\])', prompt)
+        if ultima:
+            # Continuação: só as linhas depois da última já extraída
+            nome = json.loads(ultima.group(1))[2]
+            nomes = [row[2] for row in rows]
+            rows = rows[nomes.index(nome) + 1:] if nome in nomes else []
+        if compacto:
+            return json.dumps({"r": [row[:5] for row in rows]}, ensure_ascii=False)
+        return json.dumps({
+            "headers": ["COORDENADOR", "PROJETO", "NOME", "COLOCAÇÃO", "PERFIL", "Nº VAGAS"] if rows else [],
+            "rows": rows,
+        }, ensure_ascii=False)
+
+    if call_site == 'bolsas':
+        linhas = [l.strip() for l in texto.split('\n') if l.strip()]
+        num_perfis = max(1, len(re.findall(r'PERFIL', texto, flags=re.IGNORECASE)))
+        nome_projeto = linhas[1] if len(linhas) > 1 else "Projeto Sintético"
+        feitos = re.search(re.escape(DONE_PERFIS_LABEL) + r'\s*(\[.*?\])', prompt)
+        if feitos:
+            # Continuação: só os perfis que ainda não foram extraídos
+            ja_extraidos = set(json.loads(feitos.group(1)))
+            return json.dumps({"b": [
+                ["Bolsa Extensão Discente UENF", 1, i + 1, "Requisitos sintéticos.", 700.0]
+                for i in range(num_perfis) if i + 1 not in ja_extraidos
+            ]}, ensure_ascii=False)
+        if compacto:
+            return json.dumps({
+                "p": nome_projeto,
+                "o": "Orientador Sintético",
+                "b": [
+                    ["Bolsa Extensão Discente UENF" if i == 0 else "", 1, i + 1,
+                     "Requisitos sintéticos." if i == 0 else None, 700.0]
+                    for i in range(num_perfis)
+                ],
+            }, ensure_ascii=False)
+        return json.dumps({
+            "nome_projeto": nome_projeto,
+            "orientador": "Orientador Sintético",
+            "detalhe_bolsas": [
+                {
+                    "tipo_bolsa": "Bolsa Extensão Discente UENF",
+                    "vagas": 1,
+                    "numero_perfil": i + 1,
+                    "requisitos": "Requisitos sintéticos.",
+                    "valor_bolsa": 700.0,
+                }
+                for i in range(num_perfis)
+            ],
+        }, ensure_ascii=False)
+
+    if call_site == 'data_fim_inscricao':
+        match = re.search(r'\d{2}/\d{2}/\d{4}', texto)
+        return json.dumps({"data_fim_inscricao": match.group(0) if match else None})
+
+    return "{}"
+
+
+def load_recordings(path: str) -> dict:
+    """
+    Carrega gravações `{hash_do_prompt: texto}` de um arquivo JSONL (uma resposta por
+    linha, como o RecordingBackend grava). Também aceita o formato antigo, um único
+    documento `{"version": 1, "responses": {...}}`. Em hashes repetidos vale a última linha.
+    """
+    recordings = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if 'responses' in item:
+                    recordings.update({fp: resp['text'] for fp, resp in item['responses'].items()})
+                else:
+                    recordings[item['fingerprint']] = item['text']
+    except FileNotFoundError:
+        pass
+    return recordings
+
+
+class RecordingBackend(LLMBackend):
+    """
+    Envolve outro backend e grava cada resposta em disco, para reprodução
+    posterior pelo FakeLLMBackend (`LLM_FAKE_RECORDINGS`).
+
+    Cada chamada acrescenta uma linha JSON ao arquivo (sob lock, para as chamadas
+    concorrentes do parser não intercalarem linhas), sem reescrever o que já foi gravado.
+    """
+    name = "recording"
+
+    def __init__(self, inner: LLMBackend, path: str):
+        self.inner = inner
+        self.path = path
+        self.requires_api_keys = inner.requires_api_keys
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Arquivo do formato antigo (um documento sem quebra de linha no fim): a próxima
+        # linha não pode colar no documento
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb+') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    f.write(b'\n')
+
+    def default_api_keys(self) -> list:
+        return self.inner.default_api_keys()
+
+    def generate(self, prompt: str, api_key: str = None, call_site: str = None, timeout: float = 600,
+                 max_output_tokens: int = None, model: str = None) -> LLMResponse:
+        response = self.inner.generate(
+            prompt, api_key=api_key, call_site=call_site, timeout=timeout, max_output_tokens=max_output_tokens,
+            model=model
+        )
+        line = json.dumps({'fingerprint': prompt_fingerprint(prompt), 'call_site': call_site, 'text': response.text},
+                          ensure_ascii=False)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+        return response
+
+
+def create_backend_from_env() -> LLMBackend:
+    """
+    Escolhe o backend pelas variáveis de ambiente:
+    - LLM_BACKEND: 'gemini' (padrão) ou 'fake'
+    - LLM_FAKE_RECORDINGS, LLM_FAKE_SEED, LLM_FAKE_LATENCY, LLM_FAKE_ERROR_RATE,
+      LLM_FAKE_MINUTE_QUOTA_RATE, LLM_FAKE_DAILY_LIMIT, LLM_FAKE_TAIL_RATE: ajustes do backend falso
+    - LLM_RECORD_PATH: se definido, grava todas as respostas nesse arquivo
+    """
+    backend_name = os.getenv("LLM_BACKEND", "gemini").lower()
+
+    if backend_name == "fake":
+        daily_limit = os.getenv("LLM_FAKE_DAILY_LIMIT")
+        backend = FakeLLMBackend(
+            recordings_path=os.getenv("LLM_FAKE_RECORDINGS"),
+            latency=LatencyProfile(
+                base_seconds=float(os.getenv("LLM_FAKE_LATENCY", "1.5")),
+                tail_rate=float(os.getenv("LLM_FAKE_TAIL_RATE", "0")),
+            ),
+            error_rate=float(os.getenv("LLM_FAKE_ERROR_RATE", "0")),
+            minute_quota_rate=float(os.getenv("LLM_FAKE_MINUTE_QUOTA_RATE", "0")),
+            daily_request_limit=int(daily_limit) if daily_limit else None,
+            seed=int(os.getenv("LLM_FAKE_SEED", "0")),
+        )
+    else:
+        backend = GeminiBackend()
+
+    record_path = os.getenv("LLM_RECORD_PATH")
+    if record_path:
+        backend = RecordingBackend(backend, record_path)
+    return backend
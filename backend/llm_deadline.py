@@ -0,0 +1,155 @@
+"""
+Prazos e requisições "hedged" para as chamadas à IA
+Deriva o timeout de cada chamada de um orçamento de tempo da execução inteira e,
+quando uma chamada demora mais que o percentil habitual, dispara uma duplicata em
+outra chave e fica com a resposta que chegar primeiro.
+"""
+import os
+import time
+import queue
+import threading
+from collections import defaultdict, deque
+
+
+class DeadlineExceeded(Exception):
+    """A chamada não cabe mais no orçamento de tempo (ou passou do seu prazo)."""
+
+
+class RunBudget:
+    """
+    Orçamento de tempo da execução (ex: o limite do job do GitHub Actions).
+
+    `reserve_seconds` é guardado para o que vem depois do parsing (gravação no banco),
+    então as chamadas à IA só podem usar `total - reserva`.
+    """
+
+    def __init__(self, total_seconds: float = None, reserve_seconds: float = 0.0, clock=time.monotonic):
+        self.total_seconds = total_seconds
+        self.reserve_seconds = reserve_seconds
+        self._clock = clock
+        self._start = clock()
+
+    @classmethod
+    def from_env(cls) -> "RunBudget":
+        """SCRAPER_TIME_BUDGET_SECONDS (sem valor = sem limite) e SCRAPER_TIME_RESERVE_SECONDS."""
+        total = os.getenv("SCRAPER_TIME_BUDGET_SECONDS")
+        return cls(
+            total_seconds=float(total) if total else None,
+            reserve_seconds=float(os.getenv("SCRAPER_TIME_RESERVE_SECONDS", "120")),
+        )
+
+    def remaining(self) -> float:
+        """Segundos ainda disponíveis para chamadas à IA (infinito se não houver orçamento)."""
+        if self.total_seconds is None:
+            return float('inf')
+        return self.total_seconds - self.reserve_seconds - (self._clock() - self._start)
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def call_timeout(self, max_timeout: float) -> float:
+        """Prazo de uma chamada: o menor entre o timeout máximo e o tempo que resta."""
+        return max(0.0, min(max_timeout, self.remaining()))
+
+
+class LatencyTracker:
+    """
+    Latências recentes por tipo de prompt, para decidir quando disparar o hedge.
+    Enquanto não houver amostras suficientes, não há limiar (sem hedge).
+    """
+
+    def __init__(self, percentile: float = 0.9, min_samples: int = 5, window: int = 200, min_seconds: float = 1.0):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_seconds = min_seconds
+        self._samples = defaultdict(lambda: deque(maxlen=window))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LatencyTracker":
+        """LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES e LLM_HEDGE_MIN_SECONDS."""
+        return cls(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", "0.9")),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "5")),
+            min_seconds=float(os.getenv("LLM_HEDGE_MIN_SECONDS", "1")),
+        )
+
+    def record(self, call_site: str, seconds: float):
+        with self._lock:
+            self._samples[call_site].append(seconds)
+
+    def threshold(self, call_site: str):
+        """Latência no percentil configurado, ou None se ainda há poucas amostras."""
+        with self._lock:
+            samples = sorted(self._samples[call_site])
+        if len(samples) < self.min_samples:
+            return None
+        index = min(len(samples) - 1, int(self.percentile * len(samples)))
+        return max(self.min_seconds, samples[index])
+
+
+def hedged_call(primary, hedge=None, hedge_after=None, timeout: float = None, clock=time.monotonic,
+                poll_seconds: float = 1.0):
+    """
+    Executa `primary()`; se não terminar em `hedge_after` segundos, dispara `hedge()`
+    em paralelo e retorna o primeiro resultado bem-sucedido.
+
+    `hedge_after` pode ser um número ou uma função sem argumentos reavaliada a cada
+    `poll_seconds` (o limiar pode surgir enquanto a chamada espera, ex: na primeira leva
+    de chamadas concorrentes, antes de haver amostras de latência).
+
+    - Se a primária falhar antes do hedge, o erro dela sobe direto (sem hedge);
+    - Se as duas falharem, sobe o último erro;
+    - Se nada terminar em `timeout` segundos, levanta DeadlineExceeded. A chamada
+      abandonada termina sozinha em segundo plano (o backend recebe o mesmo prazo).
+
+    Sem hedge e sem prazo não há o que vigiar: `primary()` roda direto na thread atual.
+    """
+    if (hedge is None or hedge_after is None) and timeout is None:
+        return primary()
+
+    resultados = queue.Queue()
+
+    def executar(funcao):
+        try:
+            resultados.put((True, funcao()))
+        except Exception as e:
+            resultados.put((False, e))
+
+    inicio = clock()
+    threading.Thread(target=executar, args=(primary,), daemon=True).start()
+    pendentes = 1
+    hedge_disparado = hedge is None or hedge_after is None
+    ultimo_erro = None
+
+    while pendentes:
+        agora = clock() - inicio
+        limites = []
+        if timeout is not None:
+            limites.append(timeout - agora)
+        if not hedge_disparado:
+            limiar = hedge_after() if callable(hedge_after) else hedge_after
+            limites.append(poll_seconds if limiar is None else limiar - agora)
+        espera = max(0.0, min(limites)) if limites else None
+
+        try:
+            sucesso, valor = resultados.get(timeout=espera)
+        except queue.Empty:
+            if timeout is not None and clock() - inicio >= timeout:
+                raise DeadlineExceeded(f"sem resposta em {timeout:.0f}s")
+            limiar = hedge_after() if callable(hedge_after) else hedge_after
+            if limiar is None or clock() - inicio < limiar:
+                continue
+            threading.Thread(target=executar, args=(hedge,), daemon=True).start()
+            hedge_disparado = True
+            pendentes += 1
+            continue
+
+        pendentes -= 1
+        if sucesso:
+            return valor
+        if not hedge_disparado:
+            raise valor
+        ultimo_erro = valor
+
+    raise ultimo_erro
@@ -0,0 +1,133 @@
+"""
+Roteamento de modelos por complexidade da entrada
+Trechos de resultado e blocos de projeto simples vão para um modelo mais barato e
+rápido; os complexos vão para o modelo completo. Se a resposta do modelo rápido não passar na validação, a mesma
+entrada é reenviada ao modelo completo.
+"""
+import os
+import re
+import threading
+
+from .llm_backends import estimate_tokens
+
+TIER_LOCAL = "local"
+TIER_FAST = "fast"
+TIER_FULL = "full"
+
+# Linha que parece uma linha de tabela de resultado: termina com número ou traz a colocação
+_RESULT_ROW = re.compile(r'(\d+\s*[º°ª])|classificad|suplente|reserva|\b\d{1,3}\s*$', re.IGNORECASE)
+_PERFIL = re.compile(r'PERFIL\s*(?:N[º°o]\.?\s*)?(\d+)', re.IGNORECASE)
+
+
+def analyze_input(text: str, kind: str) -> dict:
+    """
+    Mede a complexidade de uma entrada:
+    - `tokens`: tamanho estimado;
+    - `table_rows`: linhas com cara de linha de tabela (resultado);
+    - `perfis`: perfis de bolsa distintos mencionados (bloco de projeto).
+    """
+    lines = [l for l in text.split('\n') if l.strip()]
+    table_rows = sum(1 for l in lines if _RESULT_ROW.search(l)) if kind == 'resultado' else 0
+    perfis = len(set(_PERFIL.findall(text))) if kind == 'bolsas' else 0
+    return {
+        'tokens': estimate_tokens(text),
+        'lines': len(lines),
+        'table_rows': table_rows,
+        'table_density': table_rows / len(lines) if lines else 0.0,
+        'perfis': perfis,
+    }
+
+
+def rows_look_complete(analise: dict, extracted_rows: int, min_ratio: float = 0.5) -> bool:
+    """
+    Validação de um trecho de resultado: a IA devolveu pelo menos `min_ratio` das linhas
+    com cara de tabela encontradas no texto (a contagem é aproximada, por isso a folga).
+    """
+    return extracted_rows >= analise['table_rows'] * min_ratio and (extracted_rows > 0 or analise['table_rows'] == 0)
+
+
+class ModelRouter:
+    """
+    Escolhe o nível de modelo de cada entrada e escala para o modelo completo
+    quando a validação da resposta falha.
+
+    Configuração (variáveis de ambiente, via `from_env`):
+    - LLM_ROUTING=0 desliga o roteamento (tudo no modelo completo, como antes);
+    - GEMINI_FAST_MODEL / GEMINI_FULL_MODEL: nomes dos modelos;
+    - LLM_ROUTE_FAST_MAX_TOKENS, LLM_ROUTE_FAST_MAX_ROWS, LLM_ROUTE_FAST_MAX_PERFIS:
+      limites para uma entrada ser considerada simples;
+    - LLM_ROUTE_LOCAL=1 liga o atalho local (trecho de resultado sem nenhuma linha de tabela
+      reconhecida não chega à IA). Desligado por padrão: a contagem de linhas é uma heurística,
+      e um trecho que ela não reconhece iria embora sem aprovados. Sem o atalho, esses trechos
+      vão ao modelo rápido, que pode devolver uma lista vazia sem escalar.
+    """
+
+    def __init__(self, fast_model: str = "gemini-2.5-flash-lite", full_model: str = "gemini-2.5-flash",
+                 enabled: bool = True, local_enabled: bool = False, fast_max_tokens: int = 1500,
+                 fast_max_rows: int = 15, fast_max_perfis: int = 1):
+        self.models = {TIER_FAST: fast_model, TIER_FULL: full_model}
+        self.enabled = enabled
+        self.local_enabled = local_enabled
+        self.fast_max_tokens = fast_max_tokens
+        self.fast_max_rows = fast_max_rows
+        self.fast_max_perfis = fast_max_perfis
+        self.stats = {TIER_LOCAL: 0, TIER_FAST: 0, TIER_FULL: 0, 'escalations': 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ModelRouter":
+        return cls(
+            fast_model=os.getenv("GEMINI_FAST_MODEL", "gemini-2.5-flash-lite"),
+            full_model=os.getenv("GEMINI_FULL_MODEL", "gemini-2.5-flash"),
+            enabled=os.getenv("LLM_ROUTING", "1") != "0",
+            local_enabled=os.getenv("LLM_ROUTE_LOCAL", "0") == "1",
+            fast_max_tokens=int(os.getenv("LLM_ROUTE_FAST_MAX_TOKENS", "1500")),
+            fast_max_rows=int(os.getenv("LLM_ROUTE_FAST_MAX_ROWS", "15")),
+            fast_max_perfis=int(os.getenv("LLM_ROUTE_FAST_MAX_PERFIS", "1")),
+        )
+
+    def choose(self, analise: dict, kind: str) -> str:
+        """Nível de modelo para a entrada já analisada."""
+        if not self.enabled:
+            return TIER_FULL
+        if kind == 'resultado':
+            if analise['table_rows'] == 0:
+                return TIER_LOCAL if self.local_enabled else TIER_FAST
+            if analise['table_rows'] <= self.fast_max_rows and analise['tokens'] <= self.fast_max_tokens:
+                return TIER_FAST
+            return TIER_FULL
+        if kind == 'bolsas':
+            if analise['perfis'] <= self.fast_max_perfis and analise['tokens'] <= self.fast_max_tokens:
+                return TIER_FAST
+            return TIER_FULL
+        return TIER_FULL
+
+    def model_for(self, tier: str) -> str:
+        return self.models.get(tier, self.models[TIER_FULL])
+
+    def run(self, text: str, kind: str, call, validate, local=None):
+        """
+        Executa a entrada no nível escolhido.
+
+        - `call(model)` faz a chamada à IA com o modelo indicado e devolve o resultado já decodificado;
+        - `validate(resultado, analise)` diz se o resultado é aceitável;
+        - `local(analise)` resolve a entrada sem IA (só usado no nível local).
+        Se o modelo rápido não passar na validação, a entrada é reenviada ao modelo completo.
+        """
+        analise = analyze_input(text, kind)
+        tier = self.choose(analise, kind)
+        if tier == TIER_LOCAL and local is None:
+            tier = TIER_FAST
+        with self._lock:
+            self.stats[tier] += 1
+
+        if tier == TIER_LOCAL:
+            return local(analise)
+
+        resultado = call(self.model_for(tier))
+        if tier == TIER_FAST and not validate(resultado, analise):
+            print(f"  > [ROTEAMENTO] Resposta do modelo rápido ({self.model_for(TIER_FAST)}) reprovada; escalando para {self.model_for(TIER_FULL)}.")
+            with self._lock:
+                self.stats['escalations'] += 1
+            resultado = call(self.model_for(TIER_FULL))
+        return resultado
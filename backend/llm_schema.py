@@ -0,0 +1,78 @@
+"""
+Schema compacto das respostas da IA e limites de tokens de saída
+Os tokens de saída dominam a latência nas tabelas grandes: em vez de chaves longas
+repetidas em toda linha, a IA responde com arrays posicionais, e os decodificadores
+abaixo expandem de volta para o formato que o parser sempre usou.
+"""
+import os
+
+# Marcador presente nos prompts que pedem o schema compacto (o backend falso usa para escolher o formato)
+COMPACT_MARKER = "SCHEMA COMPACTO"
+
+# Prompts de continuação: pedem só o que faltou de uma resposta cortada
+CONTINUATION_MARKER = "CONTINUAÇÃO DE RESPOSTA CORTADA"
+LAST_ROW_LABEL = "Última linha já extraída:"
+DONE_PERFIS_LABEL = "Perfis já extraídos:"
+
+# Ordem das colunas de uma linha compacta de resultado: {"r": [[...], ...]}
+RESULTADO_COLUMNS = ["COORDENADOR", "PROJETO", "NOME", "COLOCAÇÃO", "PERFIL"]
+
+# Ordem dos campos de uma bolsa compacta: {"p": ..., "o": ..., "b": [[...], ...]}
+BOLSA_FIELDS = ["tipo_bolsa", "vagas", "numero_perfil", "requisitos", "valor_bolsa"]
+
+# Limite de tokens de saída por tipo de prompt (sobrescrevível por LLM_MAX_OUTPUT_TOKENS_<TIPO>).
+# Nos modelos 2.5 o limite inclui os tokens de "raciocínio", por isso os valores têm folga:
+# o objetivo é cortar respostas descontroladas (loops de repetição), não apertar as normais.
+OUTPUT_TOKEN_CAPS = {
+    'resultado': 8192,
+    'bolsas': 4096,
+    'data_fim_inscricao': 1024,
+}
+
+
+def output_token_cap(call_site: str):
+    """Limite de tokens de saída para o tipo de prompt, ou None se não houver."""
+    env_value = os.getenv(f"LLM_MAX_OUTPUT_TOKENS_{(call_site or '').upper()}")
+    if env_value:
+        return int(env_value) or None
+    return OUTPUT_TOKEN_CAPS.get(call_site)
+
+
+def decode_resultado(dados: dict) -> tuple:
+    """
+    Converte a resposta de resultado em (headers, rows).
+    Aceita o schema compacto {"r": [...]} e o antigo {"headers": [...], "rows": [...]}.
+    """
+    if "r" in dados:
+        return list(RESULTADO_COLUMNS), [list(row) for row in dados.get("r") or []]
+    headers = [str(h).upper() for h in dados.get("headers", [])]
+    return headers, dados.get("rows", [])
+
+
+def decode_bolsas(dados: dict) -> dict:
+    """
+    Converte a resposta de um bloco de projeto no dict
+    {nome_projeto, orientador, detalhe_bolsas: [...]} usado pelo resto do pipeline.
+
+    No schema compacto, `tipo_bolsa`/`requisitos` vazios ou nulos repetem o valor
+    do perfil anterior (a IA não precisa ecoar o mesmo texto em todo perfil).
+    O schema antigo passa sem alteração.
+    """
+    if "b" not in dados:
+        return dados
+
+    detalhe_bolsas = []
+    anterior = {}
+    for row in dados.get("b") or []:
+        bolsa = dict(zip(BOLSA_FIELDS, row))
+        for campo in ("tipo_bolsa", "requisitos"):
+            if not bolsa.get(campo) and anterior.get(campo):
+                bolsa[campo] = anterior[campo]
+        detalhe_bolsas.append(bolsa)
+        anterior = bolsa
+
+    return {
+        "nome_projeto": dados.get("p"),
+        "orientador": dados.get("o"),
+        "detalhe_bolsas": detalhe_bolsas,
+    }
@@ -3,16 +3,25 @@ import re
 import json
 import time
 import fitz
-import google.generativeai as genai
 from dotenv import load_dotenv
 import unicodedata
-from google.generativeai.types import HarmCategory, HarmBlockThreshold
-from google.api_core import exceptions as google_exceptions
 from difflib import get_close_matches
 from datetime import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # ✅ NOVO: Importa a função de um local centralizado
 from .utils import get_match_key
+from .llm_backends import create_backend_from_env, QuotaExceededError, prompt_fingerprint
+from .chunking import chunk_pages
+from .llm_schema import (
+    COMPACT_MARKER, CONTINUATION_MARKER, LAST_ROW_LABEL, DONE_PERFIS_LABEL,
+    decode_resultado, decode_bolsas, output_token_cap,
+)
+from .json_repair import repair_json
+from .llm_deadline import RunBudget, LatencyTracker, DeadlineExceeded, hedged_call
+from .llm_routing import ModelRouter, rows_look_complete
+from .llm_accounting import LLMAccounting, OUTCOME_OK, OUTCOME_ERROR, OUTCOME_QUOTA_DAILY, OUTCOME_QUOTA_MINUTE
 
 
 def _save_error_log(context: str, content: str):
@@ -31,79 +40,138 @@ def _save_error_log(context: str, content: str):
     except Exception as e:
         print(f"  > [LOG-ERRO] Falha ao salvar o arquivo de log: {e}")
 
+# Marcador retornado pelas tarefas de página/bloco quando todas as chaves de API acabaram
+_CHAVES_ESGOTADAS = object()
+
 class UenfParser:
-    def __init__(self):
+    def __init__(self, backend=None, run_budget: RunBudget = None):
         load_dotenv()
         
+        # 🔌 Backend de LLM plugável: Gemini real por padrão, ou o falso/offline (LLM_BACKEND=fake)
+        self.backend = backend or create_backend_from_env()
+
         # ✅ CORREÇÃO: Usar gerenciador seguro de API keys
-        from api_key_manager import key_manager
-        
-        try:
-            self.api_keys = key_manager.get_gemini_keys()
-            self.key_manager = key_manager
-        except ValueError as e:
-            raise ValueError(f"Erro ao carregar API keys: {e}")
+        from api_key_manager import key_manager, QuotaLedger
+        self.key_manager = key_manager
+
+        if self.backend.requires_api_keys:
+            try:
+                self.api_keys = key_manager.get_gemini_keys()
+            except ValueError as e:
+                raise ValueError(f"Erro ao carregar API keys: {e}")
+            self.quota_ledger = key_manager.ledger
+        else:
+            self.api_keys = self.backend.default_api_keys()
+            # Chaves falsas não entram no livro de cota persistente
+            self.quota_ledger = QuotaLedger(path=None)
+
+        # 📒 Começa pela chave com mais cota restante hoje e ignora as já esgotadas. Cada item é
+        # (índice em GEMINI_API_KEYS, chave): alertas e logs citam a posição original da chave
+        total_chaves = len(self.api_keys)
+        self.api_keys = [(i, self.api_keys[i]) for i in self.quota_ledger.order_keys(self.api_keys)]
+        if len(self.api_keys) < total_chaves:
+            print(f"  > [COTA] {total_chaves - len(self.api_keys)} chave(s) já esgotada(s) hoje segundo o livro de cota; serão ignoradas.")
             
         self.current_key_index = 0
         print(f"  > {len(self.api_keys)} chave(s) de API do Gemini carregada(s) de forma segura.")
+
+        # Fator das pausas entre chamadas (anti limite-por-minuto). O backend falso não precisa delas.
+        default_pause_scale = "1" if self.backend.requires_api_keys else "0"
+        self.pause_scale = float(os.getenv("PARSER_PAUSE_SCALE", default_pause_scale))
+
+        # ⚡ Concorrência: com PARSER_MAX_CONCURRENCY > 1, páginas e blocos de todos os PDFs
+        # viram tarefas paralelas. O limite vale para o parser inteiro (um pool compartilhado).
+        self.max_concurrency = max(1, int(os.getenv("PARSER_MAX_CONCURRENCY", "1")))
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        # Sinal compartilhado: depois que as chaves (ou o orçamento de tempo) acabam, as
+        # tarefas ainda na fila do pool nem chamam a IA (como o `break` do modo sequencial)
+        self._ia_esgotada = threading.Event()
+        self._key_lock = threading.Lock()
+
+        # 📦 Páginas de resultado consecutivas são agrupadas em trechos de até N tokens de entrada
+        # por chamada à IA (0 = uma página por chamada, como antes)
+        self.chunk_token_budget = int(os.getenv("PARSER_CHUNK_TOKEN_BUDGET", "3000"))
+
+        # ⏱️ Prazos: cada chamada recebe o menor entre 600s e o que resta do orçamento da execução
+        # (SCRAPER_TIME_BUDGET_SECONDS). Chamadas lentas ganham uma duplicata em outra chave
+        # depois do percentil de latência (LLM_HEDGE=0 desliga).
+        self.run_budget = run_budget or RunBudget.from_env()
+        self.latency_tracker = LatencyTracker.from_env()
+        self.hedge_enabled = os.getenv("LLM_HEDGE", "1") != "0"
+        self.hedge_stats = {'disparados': 0}
+
+        # 🧭 Roteamento por complexidade: entradas simples vão para o modelo rápido (ou nem vão à IA)
+        self.router = ModelRouter.from_env()
+
+        # 📊 Contabilidade por chamada (tokens, latência, retentativas, chave, cache), resumida ao fim da execução
+        self.accounting = LLMAccounting()
         
-        # A configuração inicial da chave será feita na primeira chamada.
-        genai.configure(api_key=self.api_keys[self.current_key_index])
-
-        safety_settings = {
-            HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-            HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-        }
-        
-        self.model = genai.GenerativeModel(
-            'gemini-2.5-flash',
-            safety_settings=safety_settings
-        )
-        
-        print("Modelo Gemini (2.5 Flash) inicializado.")
+        print(f"Backend de LLM '{self.backend.name}' inicializado.")
+
+    def _pause(self, seconds: float):
+        """Pausa entre chamadas à API, escalada por PARSER_PAUSE_SCALE."""
+        if seconds * self.pause_scale > 0:
+            time.sleep(seconds * self.pause_scale)
 
-    def _call_gemini_api_with_rotation(self, prompt: str):
+    def _call_gemini_api_with_rotation(self, prompt: str, call_site: str = None, model: str = None):
         """
         Chama a API do Gemini e gerencia a rotação de chaves em caso de erro de cota diária.
+        `call_site` identifica o tipo de prompt ('resultado', 'bolsas', 'data_fim_inscricao');
+        `model` escolhe o modelo (None = modelo padrão do backend).
         """
+        latency_key = f"{call_site}:{model}" if model else call_site
         while self.current_key_index < len(self.api_keys):
+            with self._key_lock:
+                key_index = self.current_key_index
+            if key_index >= len(self.api_keys):
+                break
+            numero_chave, api_key = self.api_keys[key_index]
+
+            # O livro de cota já sabe que a chave acabou (limite diário atingido): nem tenta
+            if self.quota_ledger.is_exhausted(api_key):
+                print(f"  > [COTA] Chave de API #{numero_chave + 1} sem cota restante hoje segundo o livro de cota.")
+                if not self._advance_key(key_index):
+                    return None
+                continue
+
+            timeout = self.run_budget.call_timeout(600)
+            if timeout <= 0:
+                print("  > [PRAZO] Orçamento de tempo da execução esgotado; nenhuma nova chamada à IA será feita.")
+                return None
+
             try:
-                # Usa a chave atual para a requisição
-                print(f"  > [API] Usando chave de API #{self.current_key_index + 1}...")
-                
-                # ✅ CORREÇÃO: Rastrear uso da chave
-                self.key_manager.track_usage(self.current_key_index)
-                
-                response = self.model.generate_content(prompt, request_options={'timeout': 600})
-                return response # Sucesso, retorna a resposta
+                # Usa a chave atual para a requisição (com hedge em outra chave, se ficar lenta)
+                print(f"  > [API] Usando chave de API #{numero_chave + 1}...")
+                hedge_index = self._hedge_key_index(key_index)
+
+                def hedge():
+                    with self._key_lock:
+                        self.hedge_stats['disparados'] += 1
+                    print(f"  > [HEDGE] Chamada '{call_site}' passou do p{self.latency_tracker.percentile * 100:.0f} de latência; duplicando na chave #{self.api_keys[hedge_index][0] + 1}.")
+                    return self._generate_on_key(hedge_index, prompt, call_site, timeout, model, hedge=True)
+
+                return hedged_call(
+                    lambda: self._generate_on_key(key_index, prompt, call_site, timeout, model),
+                    hedge=hedge if hedge_index is not None else None,
+                    hedge_after=lambda: self.latency_tracker.threshold(latency_key),
+                    timeout=timeout,
+                    poll_seconds=self.latency_tracker.min_seconds,
+                ) # Sucesso, retorna a resposta
+
+            except DeadlineExceeded as e:
+                if self.run_budget.expired():
+                    # Tratado como esgotamento: o chamador aborta o resto do trabalho
+                    print(f"  > [PRAZO] Chamada '{call_site}' cancelada: não cabe mais no orçamento de tempo ({e}).")
+                    return None
+                print(f"  > [PRAZO] Chamada '{call_site}' excedeu o prazo de {timeout:.0f}s.")
+                raise e
 
-            except google_exceptions.ResourceExhausted as e:
+            except QuotaExceededError as e:
                 # Verifica se o erro é especificamente sobre a cota DIÁRIA
-                if "GenerateRequestsPerDay" in str(e):
-                    print(f"  > [API-AVISO] Chave de API #{self.current_key_index + 1} atingiu o limite DIÁRIO de requisições.")
-                    self.current_key_index += 1
-                    
-                    if self.current_key_index < len(self.api_keys):
-                        # Se ainda houver chaves, configura a próxima e tenta novamente no próximo loop
-                        next_key = self.api_keys[self.current_key_index]
-                        genai.configure(api_key=next_key)
-                        print(f"  > [API] Trocando para a chave #{self.current_key_index + 1}.")
-                        
-                        # RECRIA O MODELO com a nova chave. Essencial para que a nova chave seja usada.
-                        self.model = genai.GenerativeModel(
-                            'gemini-2.5-flash',
-                            safety_settings={
-                                HarmCategory.HARM_CATEGORY_HARASSMENT: HarmBlockThreshold.BLOCK_NONE,
-                                HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE,
-                                HarmCategory.HARM_CATEGORY_SEXUALLY_EXPLICIT: HarmBlockThreshold.BLOCK_NONE,
-                                HarmCategory.HARM_CATEGORY_DANGEROUS_CONTENT: HarmBlockThreshold.BLOCK_NONE,
-                            }
-                        )
-                    else:
-                        # Acabaram as chaves
-                        print("  > [API-ERRO] Todas as chaves de API atingiram o limite diário.")
+                if e.daily:
+                    print(f"  > [API-AVISO] Chave de API #{numero_chave + 1} atingiu o limite DIÁRIO de requisições.")
+                    if not self._advance_key(key_index):
                         return None
                 else:
                     # É outro tipo de erro 429 (ex: por minuto), que as pausas devem resolver. Lança o erro.
@@ -174,174 +242,403 @@ class UenfParser:
             return ""
 
 
-    def _parse_resultado_com_ia(self, caminho_pdf: str, orientadores_conhecidos: list = None) -> list:
-        # Analisando PDF de resultado
-        
-        todos_aprovados_final = []
-        
+    def _generate_on_key(self, key_index: int, prompt: str, call_site: str, timeout: float, model: str = None,
+                         hedge: bool = False):
+        """
+        Uma chamada ao backend com a chave indicada (posição em self.api_keys), registrando
+        uso, tokens e latência sob o índice original da chave em GEMINI_API_KEYS.
+        """
+        numero_chave, api_key = self.api_keys[key_index]
+
+        # ✅ CORREÇÃO: Rastrear uso da chave
+        self.key_manager.track_usage(numero_chave)
+        self.quota_ledger.record_request(api_key)
+
+        inicio = time.monotonic()
+        try:
+            response = self.backend.generate(
+                prompt,
+                api_key=api_key,
+                call_site=call_site,
+                timeout=timeout,
+                max_output_tokens=output_token_cap(call_site),
+                model=model
+            )
+        except QuotaExceededError as e:
+            if e.daily:
+                self.quota_ledger.mark_exhausted(api_key)
+            self.accounting.record(
+                call_site, model, numero_chave, prompt_fingerprint(prompt), time.monotonic() - inicio,
+                outcome=OUTCOME_QUOTA_DAILY if e.daily else OUTCOME_QUOTA_MINUTE, hedge=hedge,
+            )
+            raise
+        except Exception:
+            self.accounting.record(
+                call_site, model, numero_chave, prompt_fingerprint(prompt), time.monotonic() - inicio,
+                outcome=OUTCOME_ERROR, hedge=hedge,
+            )
+            raise
+        latencia = time.monotonic() - inicio
+        self.latency_tracker.record(f"{call_site}:{model}" if model else call_site, latencia)
+        self.quota_ledger.record_tokens(api_key, response.input_tokens, response.output_tokens)
+        self.accounting.record(
+            call_site, response.model or model, numero_chave, prompt_fingerprint(prompt), latencia,
+            outcome=OUTCOME_OK, input_tokens=response.input_tokens, output_tokens=response.output_tokens,
+            cached=response.cached, hedge=hedge,
+        )
+        return response
+
+    def _hedge_key_index(self, key_index: int):
+        """Próxima chave com cota para a requisição duplicada, ou None (hedge desligado / sem outra chave)."""
+        if not self.hedge_enabled:
+            return None
+        for index in range(key_index + 1, len(self.api_keys)):
+            if not self.quota_ledger.is_exhausted(self.api_keys[index][1]):
+                return index
+        return None
+
+    def _advance_key(self, key_index: int) -> bool:
+        """Passa para a próxima chave. Retorna False se todas as chaves acabaram."""
+        with self._key_lock:
+            # Outra thread pode já ter trocado a chave; só avança se ainda for a mesma
+            if self.current_key_index == key_index:
+                self.current_key_index += 1
+
+        atual = self.current_key_index
+        if atual < len(self.api_keys):
+            # Se ainda houver chaves, a próxima volta do loop já usa a nova chave
+            print(f"  > [API] Trocando para a chave #{self.api_keys[atual][0] + 1}.")
+            return True
+        # Acabaram as chaves
+        print("  > [API-ERRO] Todas as chaves de API atingiram o limite diário.")
+        return False
+
+    def _run_in_order(self, tasks: list) -> list:
+        """
+        Executa as tarefas no pool compartilhado do parser (limite global PARSER_MAX_CONCURRENCY)
+        e devolve os resultados na mesma ordem das tarefas (ordem do documento).
+        """
+        if not tasks:
+            return []
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="parser")
+        futures = [self._executor.submit(task) for task in tasks]
+        return [future.result() for future in futures]
+
+    def close(self):
+        """Encerra o pool de threads do parser (chamado no fim da execução)."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _extract_result_pages(self, caminho_pdf: str) -> list:
+        """Lê o PDF de resultado e retorna as páginas com conteúdo: [{'page_num', 'total', 'texto'}]."""
+        paginas = []
         try:
             with fitz.open(caminho_pdf) as doc:
                 for page_num, page in enumerate(doc):
                     texto_pagina = page.get_text("text")
                     if not texto_pagina or len(texto_pagina.strip()) < 100:
                         continue # Pula páginas vazias
-                        
-                    print(f"  > Processando página {page_num + 1}/{len(doc)}...", flush=True)
-
-                    time.sleep(5)
-
-                    prompt = f"""
-                    Sua tarefa é extrair dados tabulares de uma página de um PDF de resultados de bolsas para um formato JSON ESTRITO.
-
-                    **REGRAS CRÍTICAS E INFALÍVEIS:**
-                    1.  **SAÍDA EXCLUSIVAMENTE JSON:** Sua resposta DEVE ser um único objeto JSON. NÃO inclua NENHUM texto, explicação ou markdown (```json).
-                    2.  **SCHEMA OBRIGATÓRIO:** O JSON DEVE ter duas chaves: `headers` (uma lista de strings) e `rows` (uma lista de listas).
-                    3.  **AGRUPAMENTO DE LINHAS:** Se os dados de uma única entrada (como um nome de projeto longo) estiverem espalhados por várias linhas no texto, você DEVE agrupá-los em uma única string na célula correspondente da linha.
-                    4.  **SEMPRE EXTRAIA LINHAS:** Tente extrair todas as linhas de dados que pareçam pertencer a uma tabela, mesmo que a formatação seja imperfeita. É melhor retornar uma linha com dados parciais do que omitir a linha inteira.
-                    5.  **NORMALIZAÇÃO DE CABEÇALHOS:** Normalize os cabeçalhos que você encontrar para o seguinte padrão obrigatório: `COORDENADOR`, `PROJETO`, `NOME`, `COLOCAÇÃO`, `PERFIL`, `Nº VAGAS`. Por exemplo, se encontrar "NOME DO BOLSISTA" ou "NOME DISCENTE", o cabeçalho no JSON deve ser `NOME`.
-                    6.  **TIPOS DE BOLSAS:** Bolsas com nome de Universidade Aberta, é a mesma coisa que Bolsa UA, sendo os três tipos diferentes, médio, superior e fundamental.
-                    7.  **CASO VAZIO:** Se a página não contiver NENHUMA tabela de resultados, retorne `{{"headers": [], "rows": []}}`.
-
-                    **EXEMPLO DE EXECUÇÃO PERFEITA 1 (Agrupamento de Linhas):**
-                    *ENTRADA:*
-                    ```
-                    COORDENADOR PROJETO NOME COLOCAÇÃO PERFIL Nº VAGAS
-                    Gerson Adriano Silva
-                    Entomologia Nas Escolas: Uso De Coleções
-                    Entomológicas. Maria Luiza da Silva 1º Classificado 1 1
-                    ```
-                    *SAÍDA JSON ESPERADA:*
-                    ```json
-                    {{
-                      "headers": ["COORDENADOR", "PROJETO", "NOME", "COLOCAÇÃO", "PERFIL", "Nº VAGAS"],
-                      "rows": [
-                        ["Gerson Adriano Silva", "Entomologia Nas Escolas: Uso De Coleções Entomológicas.", "Maria Luiza da Silva", "1º Classificado", "1", "1"]
-                      ]
-                    }}
-                    ```
-
-                    **EXEMPLO DE EXECUÇÃO PERFEITA 2 (Normalização de Cabeçalho e Dados Completos):**
-                    *ENTRADA:*
-                    ```
-                    ORIENTADOR PROJETO NOME DISCENTE CLASSIFICAÇÃO PERFIL Nº VAGAS
-                    Fábio Lopes Olivares Desenvolvimento de biopesticida... João Pedro Ribeiro 1º Lugar 2 1
-                    ```
-                    *SAÍDA JSON ESPERADA:*
-                    ```json
-                    {{
-                      "headers": ["COORDENADOR", "PROJETO", "NOME", "COLOCAÇÃO", "PERFIL", "Nº VAGAS"],
-                      "rows": [
-                        ["Fábio Lopes Olivares", "Desenvolvimento de biopesticida...", "João Pedro Ribeiro", "1º Lugar", "2", "1"]
-                      ]
-                    }}
-                    ```
-
-                    Agora, processe o texto real abaixo com MÁXIMA ATENÇÃO a todas as regras.
-
-                    **Texto da Página do PDF para Análise:**
-                    ---
-                    {texto_pagina}
-                    ---
-                    """
-                    
-                    max_retries = 3
-                    for attempt in range(max_retries):
-                        try:
-                            resposta_ia = self._call_gemini_api_with_rotation(prompt)
-                            if not resposta_ia:
-                                print("  > [PARSER] Abortando análise de resultados pois todas as chaves de API estão esgotadas.")
-                                return todos_aprovados_final
-
-                            match = re.search(r'```json\s*(\{.*?\})\s*```', resposta_ia.text, re.DOTALL)
-                            json_text = match.group(1) if match else resposta_ia.text
-                            
-                            dados_brutos = json.loads(json_text)
-                            
-                            headers = [h.upper() for h in dados_brutos.get("headers", [])]
-                            rows = dados_brutos.get("rows", [])
-                            
-                            if not headers or not rows:
-                                print(f"  > Aviso: IA não retornou cabeçalhos ou linhas para a página {page_num + 1}.")
-                                break
-
-                            def get_col_index(aliases):
-                                for alias in aliases:
-                                    if alias in headers:
-                                        return headers.index(alias)
-                                return -1
-
-                            idx_orientador = get_col_index(['COORDENADOR', 'ORIENTADOR'])
-                            idx_candidato = get_col_index(['CANDIDATO', 'DISCENTE', 'BOLSISTA', 'NOME'])
-                            idx_perfil = get_col_index(['PERFIL', 'Nº PERFIL'])
-                            idx_colocacao = get_col_index(['COLOCAÇÃO', 'CLASSIFICAÇÃO'])
-                            idx_projeto = get_col_index(['PROJETO'])
-
-                            if -1 in [idx_orientador, idx_candidato, idx_perfil, idx_colocacao, idx_projeto]:
-                                print(f"  > Aviso: Não foi possível mapear colunas na página {page_num + 1}. Cabeçalhos: {headers}")
-                                break 
-
-                            for row in rows:
-                                if len(row) <= max(idx_orientador, idx_candidato, idx_perfil, idx_colocacao, idx_projeto):
-                                    continue
-
-                                colocacao = str(row[idx_colocacao]).upper()
-                                if "RESERVA" in colocacao:
-                                    continue
-
-                                perfil_bruto = str(row[idx_perfil]).strip()
-                                if not perfil_bruto.isdigit():
-                                    continue
-
-                                orientador_bruto = row[idx_orientador]
-                                orientador_corrigido = orientador_bruto
-
-                                if orientadores_conhecidos:
-                                    orientador_bruto_key = get_match_key(orientador_bruto)
-                                    orientador_keys_map = {get_match_key(o): o for o in orientadores_conhecidos}
-                                    matches_keys = get_close_matches(orientador_bruto_key, list(orientador_keys_map.keys()), n=1, cutoff=0.8)
-                                    
-                                    if matches_keys:
-                                        orientador_corrigido = orientador_keys_map[matches_keys[0]]
-
-                                todos_aprovados_final.append({
-                                    "orientador": orientador_corrigido,
-                                    "nome_projeto": row[idx_projeto],
-                                    "numero_perfil": row[idx_perfil],
-                                    "candidato_aprovado": row[idx_candidato]
-                                })
-
-                            break
-
-                        except Exception as e:
-                            print(f"  > Tentativa {attempt + 1}/{max_retries} na página {page_num + 1} falhou: {e}")
-                            if attempt + 1 == max_retries:
-                                print(f"  > Erro final na página {page_num + 1} após {max_retries} tentativas.")
-                                if 'resposta_ia' in locals() and hasattr(resposta_ia, 'text'):
-                                    _save_error_log(f"resultado_pdf_page_{page_num+1}", resposta_ia.text)
-                            else:
-                                time.sleep(5)
-            
-            return todos_aprovados_final
-
+                    paginas.append({'page_num': page_num, 'total': len(doc), 'texto': texto_pagina})
         except Exception as e:
             print(f"  > Erro crítico ao abrir ou processar o PDF {os.path.basename(caminho_pdf)}: {e}")
-            return []
+        return paginas
 
-    def _parse_bolsas_com_ia(self, pdf_path):
+    def _extract_result_chunks(self, caminho_pdf: str) -> list:
+        """Lê o PDF de resultado e agrupa as páginas em trechos dentro do orçamento de tokens."""
+        return chunk_pages(self._extract_result_pages(caminho_pdf), self.chunk_token_budget)
+
+    def _parse_resultado_com_ia(self, caminho_pdf: str, orientadores_conhecidos: list = None) -> list:
+        """Modo sequencial: processa os trechos um a um, com pausa entre as chamadas."""
+        todos_aprovados_final = []
+        for trecho in self._extract_result_chunks(caminho_pdf):
+            self._pause(5)
+            aprovados_trecho = self._parse_resultado_trecho(trecho, orientadores_conhecidos)
+            if aprovados_trecho is _CHAVES_ESGOTADAS:
+                break
+            todos_aprovados_final.extend(aprovados_trecho)
+        return todos_aprovados_final
+
+    def _parse_resultados_concorrente(self, caminhos_pdf_projetos: list, orientadores_conhecidos: list = None) -> list:
         """
-        Abordagem "Fatiar e Conquistar" para extrair bolsas de editais de inscrição:
-        1. (Python) Lê o PDF inteiro e fatia o texto em blocos de projeto individuais.
-        2. (IA) Para cada bloco de projeto, faz uma única chamada à IA para extrair todos os detalhes.
+        ⚡ Modo concorrente: todos os trechos de todos os PDFs viram tarefas independentes
+        no pool do parser. Os aprovados são remontados na ordem original (PDF, trecho).
+        """
+        trechos_por_pdf = self._run_in_order([
+            lambda caminho=item['path']: self._extract_result_chunks(caminho) for item in caminhos_pdf_projetos
+        ])
+        trechos = [trecho for trechos_pdf in trechos_por_pdf for trecho in trechos_pdf]
+        print(f"  > [CONCORRENTE] {len(trechos)} trecho(s) de resultado em {len(caminhos_pdf_projetos)} PDF(s), até {self.max_concurrency} em paralelo.")
+
+        resultados = self._run_in_order([
+            lambda trecho=trecho: self._parse_resultado_trecho(trecho, orientadores_conhecidos) for trecho in trechos
+        ])
+        todos_aprovados = []
+        for aprovados_trecho in resultados:
+            if aprovados_trecho is not _CHAVES_ESGOTADAS:
+                todos_aprovados.extend(aprovados_trecho)
+        return todos_aprovados
+
+    def _parse_resultado_trecho(self, trecho: dict, orientadores_conhecidos: list = None):
+        """
+        Extrai os aprovados de UM trecho de resultado (uma ou mais páginas consecutivas).
+        Retorna a lista de aprovados, ou _CHAVES_ESGOTADAS se todas as chaves de API acabaram.
+        """
+        if self._ia_esgotada.is_set():
+            return _CHAVES_ESGOTADAS
+        page_num = trecho['page_num']
+        paginas = trecho.get('pages') or [page_num]
+        rotulo = f"página {page_num + 1}" if len(paginas) == 1 else f"páginas {paginas[0] + 1}-{paginas[-1] + 1}"
+        texto_pagina = trecho['texto']
+        print(f"  > Processando {rotulo}/{trecho['total']}...", flush=True)
+
+        # Mapa de orientadores calculado uma vez por trecho (e não por linha)
+        orientador_keys_map = {get_match_key(o): o for o in orientadores_conhecidos} if orientadores_conhecidos else {}
+
+        prompt = f"""
+        Sua tarefa é extrair dados tabulares de um trecho (uma ou mais páginas) de um PDF de resultados de bolsas para um formato JSON ESTRITO.
+
+        **REGRAS CRÍTICAS E INFALÍVEIS:**
+        1.  **SAÍDA EXCLUSIVAMENTE JSON:** Sua resposta DEVE ser um único objeto JSON. NÃO inclua NENHUM texto, explicação ou markdown (```json).
+        2.  **{COMPACT_MARKER} OBRIGATÓRIO:** O JSON DEVE ter uma única chave `r`: uma lista de linhas, onde CADA linha é uma lista posicional `[COORDENADOR, PROJETO, NOME, COLOCAÇÃO, PERFIL]`. NÃO repita cabeçalhos nem inclua outras colunas (ex: Nº VAGAS).
+        3.  **AGRUPAMENTO DE LINHAS:** Se os dados de uma única entrada (como um nome de projeto longo) estiverem espalhados por várias linhas no texto, você DEVE agrupá-los em uma única string na posição correspondente da linha.
+        4.  **SEMPRE EXTRAIA LINHAS:** Tente extrair todas as linhas de dados que pareçam pertencer a uma tabela, mesmo que a formatação seja imperfeita. É melhor retornar uma linha com dados parciais do que omitir a linha inteira.
+        5.  **MAPEAMENTO DE COLUNAS:** Identifique as colunas pelo significado: "ORIENTADOR" é COORDENADOR; "NOME DO BOLSISTA" ou "NOME DISCENTE" é NOME; "CLASSIFICAÇÃO" é COLOCAÇÃO.
+        6.  **TIPOS DE BOLSAS:** Bolsas com nome de Universidade Aberta, é a mesma coisa que Bolsa UA, sendo os três tipos diferentes, médio, superior e fundamental.
+        7.  **CASO VAZIO:** Se o trecho não contiver NENHUMA tabela de resultados, retorne `{{"r": []}}`.
+        8.  **VÁRIAS PÁGINAS:** Se o trecho tiver várias páginas (cabeçalhos repetidos), junte todas as linhas em uma única lista `r`.
+
+        **EXEMPLO DE EXECUÇÃO PERFEITA 1 (Agrupamento de Linhas):**
+        *ENTRADA:*
+        ```
+        COORDENADOR PROJETO NOME COLOCAÇÃO PERFIL Nº VAGAS
+        Gerson Adriano Silva
+        Entomologia Nas Escolas: Uso De Coleções
+        Entomológicas. Maria Luiza da Silva 1º Classificado 1 1
+        ```
+        *SAÍDA JSON ESPERADA:*
+        ```json
+        {{"r": [["Gerson Adriano Silva", "Entomologia Nas Escolas: Uso De Coleções Entomológicas.", "Maria Luiza da Silva", "1º Classificado", "1"]]}}
+        ```
+
+        **EXEMPLO DE EXECUÇÃO PERFEITA 2 (Mapeamento de Colunas e Dados Completos):**
+        *ENTRADA:*
+        ```
+        ORIENTADOR PROJETO NOME DISCENTE CLASSIFICAÇÃO PERFIL Nº VAGAS
+        Fábio Lopes Olivares Desenvolvimento de biopesticida... João Pedro Ribeiro 1º Lugar 2 1
+        ```
+        *SAÍDA JSON ESPERADA:*
+        ```json
+        {{"r": [["Fábio Lopes Olivares", "Desenvolvimento de biopesticida...", "João Pedro Ribeiro", "1º Lugar", "2"]]}}
+        ```
+
+        Agora, processe o texto real abaixo com MÁXIMA ATENÇÃO a todas as regras.
+
+        **Trecho do PDF para Análise:**
+        ---
+        {texto_pagina}
+        ---
         """
-        texto_pdf = self._extract_and_clean_text_from_pdf(pdf_path)
         
-        # [NOVO DEBUG] Verifica o resultado da extração de texto
-        # Texto extraído do PDF
+        def sem_ia(analise):
+            print(f"  > [ROTEAMENTO] Nenhuma linha de tabela em {rotulo}; trecho resolvido sem chamar a IA.")
+            return {'aprovados': [], 'linhas': 0}
+
+        resultado = self.router.run(
+            texto_pagina, 'resultado',
+            call=lambda model: self._extrair_resultado(prompt, texto_pagina, rotulo, page_num, orientador_keys_map, model),
+            validate=lambda r, analise: r is _CHAVES_ESGOTADAS or rows_look_complete(analise, r['linhas']),
+            local=sem_ia,
+        )
+        if resultado is _CHAVES_ESGOTADAS:
+            self._ia_esgotada.set()
+            return resultado
+        return resultado['aprovados']
+
+    def _extrair_resultado(self, prompt: str, texto_pagina: str, rotulo: str, page_num: int,
+                           orientador_keys_map: dict, model: str = None):
+        """
+        Chamada(s) à IA para um trecho de resultado com o modelo indicado.
+        Retorna {'aprovados', 'linhas'} (linhas = linhas de tabela extraídas, antes dos filtros)
+        ou _CHAVES_ESGOTADAS.
+        """
+        aprovados_pagina = []
+        linhas_extraidas = 0
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                resposta_ia = self._call_gemini_api_with_rotation(prompt, call_site='resultado', model=model)
+                if not resposta_ia:
+                    print("  > [PARSER] Abortando análise de resultados pois todas as chaves de API estão esgotadas.")
+                    return _CHAVES_ESGOTADAS
+
+                # 🩹 Decodificação tolerante: aproveita o prefixo válido de respostas cortadas/malformadas
+                dados_brutos, completo = repair_json(resposta_ia.text)
+                if dados_brutos is None:
+                    raise ValueError("resposta da IA sem JSON aproveitável")
+                
+                # Schema compacto (posicional) ou o antigo com headers/rows
+                headers, rows = decode_resultado(dados_brutos)
+
+                # Resposta cortada: pede só as linhas que faltaram, em vez de refazer a chamada inteira
+                if not completo and rows and "r" in dados_brutos:
+                    rows = rows + self._continuar_linhas_resultado(texto_pagina, rows, rotulo, model=model)
+                linhas_extraidas = len(rows)
+                
+                if not headers or not rows:
+                    print(f"  > Aviso: IA não retornou cabeçalhos ou linhas para {rotulo}.")
+                    break
+
+                def get_col_index(aliases):
+                    for alias in aliases:
+                        if alias in headers:
+                            return headers.index(alias)
+                    return -1
+
+                idx_orientador = get_col_index(['COORDENADOR', 'ORIENTADOR'])
+                idx_candidato = get_col_index(['CANDIDATO', 'DISCENTE', 'BOLSISTA', 'NOME'])
+                idx_perfil = get_col_index(['PERFIL', 'Nº PERFIL'])
+                idx_colocacao = get_col_index(['COLOCAÇÃO', 'CLASSIFICAÇÃO'])
+                idx_projeto = get_col_index(['PROJETO'])
+
+                if -1 in [idx_orientador, idx_candidato, idx_perfil, idx_colocacao, idx_projeto]:
+                    print(f"  > Aviso: Não foi possível mapear colunas em {rotulo}. Cabeçalhos: {headers}")
+                    break 
+
+                for row in rows:
+                    if len(row) <= max(idx_orientador, idx_candidato, idx_perfil, idx_colocacao, idx_projeto):
+                        continue
+
+                    colocacao = str(row[idx_colocacao]).upper()
+                    if "RESERVA" in colocacao:
+                        continue
+
+                    perfil_bruto = str(row[idx_perfil]).strip()
+                    if not perfil_bruto.isdigit():
+                        continue
+
+                    orientador_bruto = row[idx_orientador]
+                    orientador_corrigido = orientador_bruto
+
+                    if orientador_keys_map:
+                        orientador_bruto_key = get_match_key(orientador_bruto)
+                        matches_keys = get_close_matches(orientador_bruto_key, list(orientador_keys_map.keys()), n=1, cutoff=0.8)
+                        
+                        if matches_keys:
+                            orientador_corrigido = orientador_keys_map[matches_keys[0]]
+
+                    aprovados_pagina.append({
+                        "orientador": orientador_corrigido,
+                        "nome_projeto": row[idx_projeto],
+                        "numero_perfil": row[idx_perfil],
+                        "candidato_aprovado": row[idx_candidato]
+                    })
+
+                break
+
+            except Exception as e:
+                print(f"  > Tentativa {attempt + 1}/{max_retries} em {rotulo} falhou: {e}")
+                if attempt + 1 == max_retries:
+                    print(f"  > Erro final em {rotulo} após {max_retries} tentativas.")
+                    if 'resposta_ia' in locals() and hasattr(resposta_ia, 'text'):
+                        _save_error_log(f"resultado_pdf_page_{page_num+1}", resposta_ia.text)
+                else:
+                    self._pause(5)
+
+        return {'aprovados': aprovados_pagina, 'linhas': linhas_extraidas}
+
+    def _continuar_linhas_resultado(self, texto_pagina: str, rows: list, rotulo: str, max_continuacoes: int = 3,
+                                    model: str = None) -> list:
+        """
+        Completa uma resposta de resultado que veio cortada: pede à IA apenas as linhas
+        posteriores à última já extraída (no schema compacto) e retorna as linhas novas.
+        """
+        novas = []
+        for _ in range(max_continuacoes):
+            ultima = (rows + novas)[-1]
+            print(f"  > [JSON-REPARO] Resposta cortada em {rotulo}; pedindo as linhas após {len(rows) + len(novas)} já extraídas.")
+            prompt = f"""
+        {CONTINUATION_MARKER}: a sua resposta anterior para o trecho abaixo foi cortada no meio.
+        Retorne APENAS as linhas da tabela que vêm DEPOIS da última linha já extraída, no mesmo {COMPACT_MARKER}:
+        `{{"r": [[COORDENADOR, PROJETO, NOME, COLOCAÇÃO, PERFIL], ...]}}`. Se não houver mais linhas, retorne `{{"r": []}}`.
+        Responda EXCLUSIVAMENTE com o JSON.
+
+        {LAST_ROW_LABEL} {json.dumps(ultima, ensure_ascii=False)}
+
+        **Trecho do PDF para Análise:**
+        ---
+        {texto_pagina}
+        ---
+        """
+            self._pause(5)
+            resposta_ia = self._call_gemini_api_with_rotation(prompt, call_site='resultado', model=model)
+            if not resposta_ia:
+                break
+            dados, completo = repair_json(resposta_ia.text)
+            if not isinstance(dados, dict):
+                break
+            _, extras = decode_resultado(dados)
+            if extras and extras[0] == ultima:
+                extras = extras[1:]
+            if not extras:
+                break
+            novas.extend(extras)
+            if completo:
+                break
+        return novas
+
+    def _continuar_perfis_bolsa(self, texto_para_ia: str, perfis: list, i: int, max_continuacoes: int = 3,
+                                model: str = None) -> list:
+        """
+        Completa um bloco de projeto cuja resposta veio cortada: pede à IA apenas os
+        perfis de bolsa que ainda não foram extraídos e retorna as linhas compactas novas.
+        """
+        novos = []
+        for _ in range(max_continuacoes):
+            ja_extraidos = [row[2] for row in perfis + novos if len(row) > 2]
+            print(f"    > [JSON-REPARO] Resposta cortada no bloco {i+1}; pedindo os perfis após {ja_extraidos}.")
+            prompt = f"""
+            {CONTINUATION_MARKER}: a sua resposta anterior para o projeto abaixo foi cortada no meio.
+            Retorne APENAS os perfis de bolsa que ainda NÃO foram extraídos, no mesmo {COMPACT_MARKER}:
+            `{{"b": [[tipo_bolsa, vagas, numero_perfil, requisitos, valor_bolsa], ...]}}`. Se não houver mais perfis, retorne `{{"b": []}}`.
+            Responda EXCLUSIVAMENTE com o JSON.
+
+            {DONE_PERFIS_LABEL} {json.dumps(ja_extraidos)}
+
+            **Texto para Análise:**
+            ---
+            {texto_para_ia}
+            ---
+        """
+            self._pause(5)
+            response = self._call_gemini_api_with_rotation(prompt, call_site='bolsas', model=model)
+            if not response:
+                break
+            dados, completo = repair_json(response.text)
+            if not isinstance(dados, dict):
+                break
+            extras = [row for row in dados.get("b") or [] if len(row) > 2 and row[2] not in ja_extraidos]
+            if not extras:
+                break
+            novos.extend(extras)
+            if completo:
+                break
+        return novos
+
+    def _split_bolsas_blocks(self, pdf_path) -> list:
+        """
+        Etapa 1 (Python) do "Fatiar e Conquistar": lê o PDF inteiro e fatia o texto em blocos
+        de projeto, separando o RESUMO dos dados estruturados de cada bloco.
+        Retorna [{'texto_para_ia', 'resumo'}] ou None.
+        """
+        texto_pdf = self._extract_and_clean_text_from_pdf(pdf_path)
 
         if not texto_pdf or len(texto_pdf) < 100:
             return None
 
-        # Etapa 1 (Python): Fatiar o texto em blocos de projeto.
         # A lógica foi revertida para o método original, mais robusto, que usa finditer
         # para lidar com os casos onde "PROGRAMA" e "DADOS DO PROJETO" aparecem juntos.
         pattern = r'PROGRAMA:|DADOS\s+DO(S)?\s+PROJETO(S)?'
@@ -372,129 +669,201 @@ class UenfParser:
             print(f"  > Aviso: Nenhum bloco de projeto encontrado no PDF via separador: {os.path.basename(pdf_path)}")
             return None
 
-        projetos_finais = []
-        resumo_pendente = "" # Buffer para carregar um resumo para o próximo projeto, conforme a lógica solicitada.
-
-        # Etapa 2 (IA): Loop para processar um projeto de cada vez
-        for i, texto_bloco in enumerate(blocos_de_texto):
-            print(f"    > Processando Bloco {i+1}/{len(blocos_de_texto)}...")
-
+        blocos = []
+        for texto_bloco in blocos_de_texto:
             # Etapa Intermediária (Python): Separar dados estruturados do resumo.
             # Usamos um Regex flexível para encontrar "RESUMO" e capturar o que vem antes e depois.
             match = re.search(r"^(.*?)(RESUMO.*)$", texto_bloco, re.DOTALL | re.IGNORECASE)
-            
-            texto_para_ia = texto_bloco
-            resumo_encontrado_no_bloco = ""
-
             if match:
-                texto_para_ia = match.group(1).strip()
-                resumo_encontrado_no_bloco = match.group(2).strip()
-            
-            # [DEBUG] Adicionado para imprimir o texto exato enviado para a IA.
-            # Enviando bloco de texto para IA
-
-            prompt_detalhes_projeto = f"""
-                Sua tarefa é extrair informações de um projeto de edital para um formato JSON ESTRITO E CONSISTENTE.
-
-                **REGRAS CRÍTICAS:**
-                1.  **SAÍDA EXCLUSIVAMENTE JSON:** Responda APENAS com o objeto JSON.
-                2.  **SCHEMA OBRIGATÓRIO:** O JSON DEVE seguir este schema:
-                    - `nome_projeto` (string)
-                    - `orientador` (string)
-                    - `detalhe_bolsas` (lista de objetos), onde CADA objeto da lista DEVE conter:
-                        - `tipo_bolsa` (string)
-                        - `vagas` (inteiro)
-                        - `numero_perfil` (inteiro)
-                        - `requisitos` (string)
-                        - `valor_bolsa` (float)
-                3.  **DESAMBIGUAÇÃO:** Ignore qualquer "Coordenador de Programa" ou "Nome de Programa" no início do texto. Foque APENAS no `nome_projeto` e `orientador` que estão diretamente associados aos detalhes das bolsas.
-                4   **TIPO DE BOLSA:** Bolsas com nome de Universidade Aberta, é a mesma coisa que Bolsa UA, sendo os três tipos diferentes, médio, superior e fundamental.
-                5.  **DADOS NUMÉRICOS:** `vagas` e `numero_perfil` devem ser extraídos como NÚMEROS (inteiros). `valor_bolsa` deve ser um NÚMERO (float).
-                6.  **EXEMPLO DE SAÍDA:**
-                    ```json
-                    {{
-                      "nome_projeto": "Trilhas das Abelhas",
-                      "orientador": "Maria Cristina Gaglianone",
-                      "detalhe_bolsas": [
-                        {{
-                          "tipo_bolsa": "Bolsa Extensão Discente UENF",
-                          "vagas": 3,
-                          "numero_perfil": 1,
-                          "requisitos": "Estar matriculado em curso de graduação na UENF em Ciências Biológicas...",
-                          "valor_bolsa": 700.00
-                        }}
-                      ]
-                    }}
-                    ```
-
-                **Texto para Análise:**
-                ---
-                {texto_para_ia}
-                ---
-            """
-            
-            # LÓGICA DE RETENTATIVAS (RETRY) PARA RESISTIR A TIMEOUTS DA API
-            max_retries = 3
-            for attempt in range(max_retries):
-                try:
-                    response = self._call_gemini_api_with_rotation(prompt_detalhes_projeto)
-                    if not response: # Se retornou None, todas as chaves acabaram
-                        print("  > [PARSER] Abortando análise de bolsas pois todas as chaves de API estão esgotadas.")
-                        return projetos_finais # Retorna o que conseguiu até agora
+                blocos.append({'texto_para_ia': match.group(1).strip(), 'resumo': match.group(2).strip()})
+            else:
+                blocos.append({'texto_para_ia': texto_bloco, 'resumo': ""})
+        return blocos
+
+    def _parse_bloco_bolsa_com_ia(self, i: int, total: int, texto_para_ia: str):
+        """
+        Etapa 2 (IA): extrai os detalhes de UM bloco de projeto.
+        Retorna o dict do projeto, None se a IA não extraiu nada, ou _CHAVES_ESGOTADAS.
+        """
+        if self._ia_esgotada.is_set():
+            return _CHAVES_ESGOTADAS
+        print(f"    > Processando Bloco {i+1}/{total}...")
+
+
+        prompt_detalhes_projeto = f"""
+            Sua tarefa é extrair informações de um projeto de edital para um formato JSON ESTRITO E CONSISTENTE.
+
+            **REGRAS CRÍTICAS:**
+            1.  **SAÍDA EXCLUSIVAMENTE JSON:** Responda APENAS com o objeto JSON.
+            2.  **{COMPACT_MARKER} OBRIGATÓRIO:** O JSON DEVE seguir este schema:
+                - `p` (string): nome do projeto
+                - `o` (string): orientador
+                - `b` (lista de listas): uma lista posicional por perfil de bolsa, na ordem
+                  `[tipo_bolsa (string), vagas (inteiro), numero_perfil (inteiro), requisitos (string), valor_bolsa (float)]`
+                - Se `tipo_bolsa` ou `requisitos` forem IGUAIS aos do perfil anterior, use `""` em vez de repetir o texto.
+            3.  **DESAMBIGUAÇÃO:** Ignore qualquer "Coordenador de Programa" ou "Nome de Programa" no início do texto. Foque APENAS no nome do projeto e orientador que estão diretamente associados aos detalhes das bolsas.
+            4   **TIPO DE BOLSA:** Bolsas com nome de Universidade Aberta, é a mesma coisa que Bolsa UA, sendo os três tipos diferentes, médio, superior e fundamental.
+            5.  **DADOS NUMÉRICOS:** `vagas` e `numero_perfil` devem ser extraídos como NÚMEROS (inteiros). `valor_bolsa` deve ser um NÚMERO (float).
+            6.  **EXEMPLO DE SAÍDA:**
+                ```json
+                {{
+                  "p": "Trilhas das Abelhas",
+                  "o": "Maria Cristina Gaglianone",
+                  "b": [
+                    ["Bolsa Extensão Discente UENF", 3, 1, "Estar matriculado em curso de graduação na UENF em Ciências Biológicas...", 700.00],
+                    ["", 1, 2, "", 700.00]
+                  ]
+                }}
+                ```
+
+            **Texto para Análise:**
+            ---
+            {texto_para_ia}
+            ---
+        """
+        
+        def valido(dados_projeto, analise):
+            # Escala se o modelo não extraiu nada ou extraiu menos perfis do que o texto menciona
+            if dados_projeto is _CHAVES_ESGOTADAS:
+                return True
+            return bool(dados_projeto) and len(dados_projeto["detalhe_bolsas"]) >= analise['perfis']
+
+        dados_projeto = self.router.run(
+            texto_para_ia, 'bolsas',
+            call=lambda model: self._extrair_bloco_bolsa(i, prompt_detalhes_projeto, texto_para_ia, model),
+            validate=valido,
+        )
+        if dados_projeto is _CHAVES_ESGOTADAS:
+            self._ia_esgotada.set()
+        return dados_projeto
+
+    def _extrair_bloco_bolsa(self, i: int, prompt_detalhes_projeto: str, texto_para_ia: str, model: str = None):
+        """
+        Chamada(s) à IA para um bloco de projeto com o modelo indicado.
+        Retorna o dict do projeto, None se a IA não extraiu nada, ou _CHAVES_ESGOTADAS.
+        """
+        # LÓGICA DE RETENTATIVAS (RETRY) PARA RESISTIR A TIMEOUTS DA API
+        max_retries = 3
+        for attempt in range(max_retries):
+            try:
+                response = self._call_gemini_api_with_rotation(prompt_detalhes_projeto, call_site='bolsas', model=model)
+                if not response: # Se retornou None, todas as chaves acabaram
+                    print("  > [PARSER] Abortando análise de bolsas pois todas as chaves de API estão esgotadas.")
+                    return _CHAVES_ESGOTADAS
+
+                # 🩹 Decodificação tolerante: aproveita o prefixo válido de respostas cortadas/malformadas
+                dados_json, completo = repair_json(response.text)
+                if not isinstance(dados_json, dict):
+                    raise ValueError("resposta da IA sem JSON aproveitável")
+
+                # Resposta cortada: pede só os perfis que faltaram, em vez de refazer a chamada inteira
+                if not completo and dados_json.get("b"):
+                    dados_json["b"] = dados_json["b"] + self._continuar_perfis_bolsa(texto_para_ia, dados_json["b"], i, model=model)
                 
-                    # [NOVO LOG] Adicionado para depurar a resposta completa da IA
-                    # Resposta da IA recebida
-
-                    json_text = response.text.strip()
-                    if json_text.startswith("```json"):
-                        json_text = json_text[7:]
-                    if json_text.endswith("```"):
-                        json_text = json_text[:-3]
-                    
-                    dados_projeto = json.loads(json_text)
-
-                    if dados_projeto and dados_projeto.get("detalhe_bolsas"):
-                        if all(k in dados_projeto for k in ["nome_projeto", "orientador", "detalhe_bolsas"]):
-                            
-                            # --- LÓGICA DE ATRIBUIÇÃO DE RESUMO ---
-                            # Se há um resumo pendente da iteração anterior, ele pertence a ESTE projeto.
-                            if resumo_pendente:
-                                dados_projeto["resumo"] = resumo_pendente.replace("RESUMO", "").strip()
-                                resumo_pendente = "" # Limpa o buffer
-
-                            # Agora, avalia o resumo encontrado no bloco ATUAL.
-                            # Se o projeto JÁ tem um resumo (do buffer) e encontramos outro, o novo é para o PRÓXIMO projeto.
-                            if "resumo" in dados_projeto and resumo_encontrado_no_bloco:
-                                resumo_pendente = resumo_encontrado_no_bloco
-                            # Se o projeto AINDA não tem resumo, o que encontramos pertence a ele.
-                            elif resumo_encontrado_no_bloco:
-                                dados_projeto["resumo"] = resumo_encontrado_no_bloco.replace("RESUMO", "").strip()
-                            
-                            projetos_finais.append(dados_projeto)
-                        else:
-                            print(f"    > Aviso: IA retornou JSON incompleto para o bloco {i+1}. Título: {dados_projeto.get('nome_projeto', 'N/A')}")
-                    else:
-                        # [DEBUG] Log aprimorado para falhas de extração
-                        print(f"    > Aviso: IA não retornou detalhes de bolsas para o bloco {i+1}.")
-                        print(f"      - Texto enviado para a IA (sem resumo):\\n---\\n{texto_para_ia[:500]}...\\n---")
-                    
-                    # Se chegou aqui, a tentativa foi bem-sucedida, então sai do loop de retry
-                    break 
+                # Schema compacto expandido para {nome_projeto, orientador, detalhe_bolsas}
+                dados_projeto = decode_bolsas(dados_json)
 
-                except Exception as e:
-                    print(f"  > Tentativa {attempt + 1}/{max_retries} de processar bloco {i+1} com IA falhou: {e}")
-                    if attempt + 1 == max_retries:
-                        print(f"    > Erro final no bloco {i+1} após {max_retries} tentativas.")
-                        if 'response' in locals() and hasattr(response, 'text'):
-                            _save_error_log(f"bolsa_pdf_bloco_{i+1}", response.text)
-                    else:
-                        time.sleep(5) # Espera 12 segundos antes de tentar novamente
+                if dados_projeto and dados_projeto.get("detalhe_bolsas"):
+                    if all(k in dados_projeto for k in ["nome_projeto", "orientador", "detalhe_bolsas"]):
+                        return dados_projeto
+                    print(f"    > Aviso: IA retornou JSON incompleto para o bloco {i+1}. Título: {dados_projeto.get('nome_projeto', 'N/A')}")
+                else:
+                    # [DEBUG] Log aprimorado para falhas de extração
+                    print(f"    > Aviso: IA não retornou detalhes de bolsas para o bloco {i+1}.")
+                    print(f"      - Texto enviado para a IA (sem resumo):\\n---\\n{texto_para_ia[:500]}...\\n---")
+                
+                # Se chegou aqui, a tentativa foi concluída (sem dados úteis), então sai do loop de retry
+                return None
 
-            # Garante uma pausa de 5 segundos ENTRE cada bloco de projeto para não exceder o limite da API.
-            time.sleep(5)
+            except Exception as e:
+                print(f"  > Tentativa {attempt + 1}/{max_retries} de processar bloco {i+1} com IA falhou: {e}")
+                if attempt + 1 == max_retries:
+                    print(f"    > Erro final no bloco {i+1} após {max_retries} tentativas.")
+                    if 'response' in locals() and hasattr(response, 'text'):
+                        _save_error_log(f"bolsa_pdf_bloco_{i+1}", response.text)
+                else:
+                    self._pause(5) # Espera 5 segundos antes de tentar novamente
+        return None
+
+    def _atribuir_resumos(self, blocos: list, resultados: list) -> list:
+        """
+        Junta os projetos extraídos aos resumos, NA ORDEM do documento.
+        O resumo de um bloco pode pertencer ao projeto seguinte (buffer `resumo_pendente`).
+        """
+        projetos_finais = []
+        resumo_pendente = "" # Buffer para carregar um resumo para o próximo projeto, conforme a lógica solicitada.
+
+        for bloco, dados_projeto in zip(blocos, resultados):
+            if dados_projeto is _CHAVES_ESGOTADAS:
+                break # Retorna o que conseguiu até agora
+            if not dados_projeto:
+                continue
+            resumo_encontrado_no_bloco = bloco['resumo']
+
+            # --- LÓGICA DE ATRIBUIÇÃO DE RESUMO ---
+            # Se há um resumo pendente da iteração anterior, ele pertence a ESTE projeto.
+            if resumo_pendente:
+                dados_projeto["resumo"] = resumo_pendente.replace("RESUMO", "").strip()
+                resumo_pendente = "" # Limpa o buffer
+
+            # Agora, avalia o resumo encontrado no bloco ATUAL.
+            # Se o projeto JÁ tem um resumo (do buffer) e encontramos outro, o novo é para o PRÓXIMO projeto.
+            if "resumo" in dados_projeto and resumo_encontrado_no_bloco:
+                resumo_pendente = resumo_encontrado_no_bloco
+            # Se o projeto AINDA não tem resumo, o que encontramos pertence a ele.
+            elif resumo_encontrado_no_bloco:
+                dados_projeto["resumo"] = resumo_encontrado_no_bloco.replace("RESUMO", "").strip()
+            
+            projetos_finais.append(dados_projeto)
 
         return projetos_finais
 
+    def _parse_bolsas_com_ia(self, pdf_path):
+        """
+        Abordagem "Fatiar e Conquistar" para extrair bolsas de editais de inscrição:
+        1. (Python) Lê o PDF inteiro e fatia o texto em blocos de projeto individuais.
+        2. (IA) Para cada bloco de projeto, faz uma única chamada à IA para extrair todos os detalhes.
+        """
+        blocos = self._split_bolsas_blocks(pdf_path)
+        if not blocos:
+            return None
+
+        # Etapa 2 (IA): Loop para processar um projeto de cada vez
+        resultados = []
+        for i, bloco in enumerate(blocos):
+            dados_projeto = self._parse_bloco_bolsa_com_ia(i, len(blocos), bloco['texto_para_ia'])
+            resultados.append(dados_projeto)
+            if dados_projeto is _CHAVES_ESGOTADAS:
+                break
+
+            # Garante uma pausa de 5 segundos ENTRE cada bloco de projeto para não exceder o limite da API.
+            self._pause(5)
+
+        return self._atribuir_resumos(blocos, resultados)
+
+    def _parse_bolsas_concorrente(self, caminhos_pdf_projetos: list) -> list:
+        """
+        ⚡ Modo concorrente: fatia todos os PDFs e envia todos os blocos como tarefas
+        independentes ao pool do parser. Resumos e centros são atribuídos depois, na ordem original.
+        """
+        blocos_por_pdf = self._run_in_order([
+            lambda caminho=item['path']: self._split_bolsas_blocks(caminho) or [] for item in caminhos_pdf_projetos
+        ])
+        tarefas = []
+        for blocos in blocos_por_pdf:
+            for i, bloco in enumerate(blocos):
+                tarefas.append(lambda i=i, total=len(blocos), texto=bloco['texto_para_ia']: self._parse_bloco_bolsa_com_ia(i, total, texto))
+        print(f"  > [CONCORRENTE] {len(tarefas)} bloco(s) de projeto em {len(caminhos_pdf_projetos)} PDF(s), até {self.max_concurrency} em paralelo.")
+
+        resultados = iter(self._run_in_order(tarefas))
+        projetos = []
+        for item, blocos in zip(caminhos_pdf_projetos, blocos_por_pdf):
+            resultados_pdf = [next(resultados) for _ in blocos]
+            for projeto in self._atribuir_resumos(blocos, resultados_pdf):
+                projeto['centro'] = item['centro']
+                projetos.append(projeto)
+        return projetos
+
     def _parse_data_fim_inscricao(self, pdf_path):
         texto_pdf = self._extract_and_clean_text_from_pdf(pdf_path)
         if not texto_pdf or len(texto_pdf) < 100:
@@ -511,8 +880,7 @@ class UenfParser:
             ---
         """
         try:
-            # As configurações de segurança já estão no self.model
-            response = self._call_gemini_api_with_rotation(prompt)
+            response = self._call_gemini_api_with_rotation(prompt, call_site='data_fim_inscricao')
             if not response:
                 print("  > [PARSER] Abortando análise de data pois todas as chaves de API estão esgotadas.")
                 return None
@@ -549,6 +917,8 @@ class UenfParser:
         return None
 
     def parse_noticia(self, titulo: str, caminho_pdf_principal: str, caminhos_pdf_projetos: list, orientadores_conhecidos: list = None, data_publicacao: str = None) -> dict:
+        # As chamadas à IA deste edital são contabilizadas sob o seu título
+        self.accounting.edital = titulo
         dados_extraidos = {
             "titulo": titulo,
             "etapa": None,
@@ -569,12 +939,15 @@ class UenfParser:
                 dados_extraidos['etapa'] = 'resultado'
                 todos_aprovados = []
                 print(f"  > Processando {len(caminhos_pdf_projetos)} PDF(s) de resultado para o edital '{titulo}'...")
-                for item in caminhos_pdf_projetos:
-                    pdf_path = item['path'] 
-                    aprovados_no_pdf = self._parse_resultado_com_ia(pdf_path, orientadores_conhecidos)
-                    if aprovados_no_pdf:
-                        todos_aprovados.extend(aprovados_no_pdf)
-                    time.sleep(1)
+                if self.max_concurrency > 1:
+                    todos_aprovados = self._parse_resultados_concorrente(caminhos_pdf_projetos, orientadores_conhecidos)
+                else:
+                    for item in caminhos_pdf_projetos:
+                        pdf_path = item['path'] 
+                        aprovados_no_pdf = self._parse_resultado_com_ia(pdf_path, orientadores_conhecidos)
+                        if aprovados_no_pdf:
+                            todos_aprovados.extend(aprovados_no_pdf)
+                        self._pause(1)
                 dados_extraidos['aprovados'] = todos_aprovados
 
             elif is_inscricao and caminhos_pdf_projetos:
@@ -589,21 +962,22 @@ class UenfParser:
                 dados_extraidos['titulo'] = titulo
                 
                 projetos = []
-                # [DEBUG] Adicionado para sabermos que o loop vai começar
-                # Processando PDFs de projeto
-                for i, item in enumerate(caminhos_pdf_projetos):
-                    pdf_path = item['path']
-                    centro = item['centro']
-                    
-                    # [DEBUG] Adicionado para identificar o PDF exato antes de processá-lo
-                    # Processando PDF de projeto
-                    
-                    dados_bolsas = self._parse_bolsas_com_ia(pdf_path)
-                    if dados_bolsas:
-                        for projeto in dados_bolsas:
-                            projeto['centro'] = centro
-                        projetos.extend(dados_bolsas)
-                    time.sleep(1)
+                if self.max_concurrency > 1:
+                    projetos = self._parse_bolsas_concorrente(caminhos_pdf_projetos)
+                else:
+                    for i, item in enumerate(caminhos_pdf_projetos):
+                        pdf_path = item['path']
+                        centro = item['centro']
+                        
+                        # [DEBUG] Adicionado para identificar o PDF exato antes de processá-lo
+                        # Processando PDF de projeto
+                        
+                        dados_bolsas = self._parse_bolsas_com_ia(pdf_path)
+                        if dados_bolsas:
+                            for projeto in dados_bolsas:
+                                projeto['centro'] = centro
+                            projetos.extend(dados_bolsas)
+                        self._pause(1)
                 
                 dados_extraidos['projetos'] = projetos
             
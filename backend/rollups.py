@@ -0,0 +1,64 @@
+"""
+Rollups históricos de bolsas (séries temporais)
+Em vez de varrer editais/projetos/bolsas para responder "quantas bolsas foram
+ofertadas por mês, centro e modalidade", o backend envia deltas a cada gravação
+(ofertas de editais novos e bolsas preenchidas no casamento de resultados) para a
+RPC `apply_bolsas_rollup_deltas` (backend/sql/005_bolsas_rollups.sql), que soma nas
+tabelas diária e mensal. A API lê só essas tabelas.
+
+Cada célula é (dia da oferta, centro, modalidade); as bolsas preenchidas entram na
+mesma célula em que a oferta foi contada.
+"""
+from datetime import datetime, timezone
+
+CENTRO_PADRAO = 'Não informado'
+MODALIDADE_PADRAO = 'extensao'
+
+
+def dia_da_oferta(data_publicacao=None, created_at=None) -> str:
+    """Data de publicação do edital (ou, sem ela, a de cadastro / hoje) em 'AAAA-MM-DD'."""
+    for valor in (data_publicacao, created_at):
+        if valor:
+            return str(valor)[:10]
+    return datetime.now(timezone.utc).date().isoformat()
+
+
+def _vagas(valor) -> int:
+    """Vagas de uma bolsa como inteiro (1 se ausente ou ilegível, como no banco)."""
+    if valor is None:
+        return 1
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return 1
+
+
+def acumular(deltas: dict, dia: str, centro: str = None, modalidade: str = None,
+             bolsas: int = 0, vagas: int = 0, preenchidas: int = 0):
+    """Soma um delta na célula (dia, centro, modalidade) de `deltas`."""
+    chave = (dia, centro or CENTRO_PADRAO, modalidade or MODALIDADE_PADRAO)
+    celula = deltas.setdefault(chave, {'bolsas': 0, 'vagas': 0, 'preenchidas': 0})
+    celula['bolsas'] += bolsas
+    celula['vagas'] += vagas
+    celula['preenchidas'] += preenchidas
+
+
+def como_lista(deltas: dict) -> list:
+    """Formato da RPC: [{'dia', 'centro', 'modalidade', 'bolsas', 'vagas', 'preenchidas'}]."""
+    return [
+        {'dia': dia, 'centro': centro, 'modalidade': modalidade, **valores}
+        for (dia, centro, modalidade), valores in deltas.items()
+    ]
+
+
+def deltas_de_oferta(payloads: list) -> list:
+    """Deltas das bolsas ofertadas por editais novos, a partir dos payloads da RPC de upsert."""
+    deltas = {}
+    for payload in payloads:
+        dia = dia_da_oferta(payload.get('data_publicacao'))
+        modalidade = payload.get('modalidade')
+        for projeto in payload.get('projetos', []):
+            for bolsa in projeto.get('detalhe_bolsas', []):
+                acumular(deltas, dia, projeto.get('centro'), modalidade,
+                         bolsas=1, vagas=_vagas(bolsa.get('vagas')))
+    return como_lista(deltas)
@@ -0,0 +1,27 @@
+-- 📦 Gravação em lote de editais (usada por SupabaseManager.flush_writes)
+-- Recebe uma lista de payloads no mesmo formato de handle_edital_upsert e grava
+-- todos numa única chamada/transação. Retorna [{"link": ..., "id": ...}, ...].
+-- Se esta função não existir no banco, o backend cai para handle_edital_upsert
+-- edital a edital.
+
+create or replace function handle_editais_upsert_batch(edital_payloads jsonb)
+returns jsonb
+language plpgsql
+as $$
+declare
+    payload jsonb;
+    resultado jsonb := '[]'::jsonb;
+begin
+    for payload in select * from jsonb_array_elements(edital_payloads)
+    loop
+        resultado := resultado || jsonb_build_array(
+            jsonb_build_object(
+                'link', payload->>'link',
+                'id', handle_edital_upsert(payload)
+            )
+        );
+    end loop;
+
+    return resultado;
+end;
+$$;
@@ -0,0 +1,41 @@
+-- 🔧 Totais de vagas das bolsas agrupadas, calculados no banco
+-- Usada por SupabaseManager._get_totais_bolsas_agrupadas (backend) e por
+-- get_bolsas_from_supabase (api/index.py): recebe os mesmos filtros da listagem e
+-- devolve uma única linha, em vez de a API baixar todas as linhas filtradas de
+-- bolsas_view_agrupada só para somar vagas_total em Python.
+--
+-- Filtros (null ou 'all' = sem filtro):
+--   p_status, p_centro: igualdade;
+--   p_tipo: 'extensao', 'UA Superior', 'UA Médio', 'UA Fundamental' (mesma regra da listagem);
+--   p_fts:  tsquery já montada (ex: 'bolsa:* & extensao:*'), busca do backend;
+--   p_busca: termo livre em nome_projeto/orientador (ilike), busca da API.
+
+create or replace function bolsas_totais_agrupadas(
+    p_status text default null,
+    p_centro text default null,
+    p_tipo text default null,
+    p_fts text default null,
+    p_busca text default null
+)
+returns table (total_vagas bigint, vagas_preenchidas bigint, total_grupos bigint)
+language sql
+stable
+as $$
+    select
+        coalesce(sum(coalesce(v.vagas_total, 1)), 0)::bigint as total_vagas,
+        coalesce(sum(coalesce(v.vagas_total, 1)) filter (where v.status = 'preenchida'), 0)::bigint as vagas_preenchidas,
+        count(*)::bigint as total_grupos
+    from bolsas_view_agrupada v
+    where (p_status is null or p_status = 'all' or v.status = p_status)
+      and (p_centro is null or p_centro = 'all' or v.centro = p_centro)
+      and (
+            p_tipo is null
+            or p_tipo not in ('extensao', 'UA Superior', 'UA Médio', 'UA Fundamental')
+            or (p_tipo = 'extensao' and (v.tipo ilike '%Extensão%' or v.tipo ilike '%Discente%'))
+            or (p_tipo = 'UA Superior' and (v.tipo ilike '%UA%' or v.tipo ilike '%Universidade Aberta%') and v.tipo ilike '%Superior%')
+            or (p_tipo = 'UA Médio' and (v.tipo ilike '%UA%' or v.tipo ilike '%Universidade Aberta%') and (v.tipo ilike '%Médio%' or v.tipo ilike '%Nível Médio%'))
+            or (p_tipo = 'UA Fundamental' and (v.tipo ilike '%UA%' or v.tipo ilike '%Universidade Aberta%') and v.tipo ilike '%Fundamental%')
+          )
+      and (p_fts is null or v.fts @@ to_tsquery('portuguese', p_fts))
+      and (p_busca is null or v.nome_projeto ilike '%' || p_busca || '%' or v.orientador ilike '%' || p_busca || '%');
+$$;
@@ -0,0 +1,20 @@
+-- 👁️ Incremento de visualizações em lote (usada por api/view_counter.py)
+-- Recebe [{"bolsa_id": "...", "delta": 3}, ...] e soma os deltas num único UPDATE.
+-- A soma é feita pelo banco (view_count = view_count + delta), então incrementos
+-- concorrentes de instâncias diferentes não se sobrescrevem.
+-- Retorna o novo view_count de cada bolsa atualizada.
+
+create or replace function increment_view_counts(deltas jsonb)
+returns table (bolsa_id uuid, view_count integer)
+language sql
+as $$
+    update bolsas b
+    set view_count = coalesce(b.view_count, 0) + d.delta
+    from (
+        select (e->>'bolsa_id')::uuid as bolsa_id, sum((e->>'delta')::integer)::integer as delta
+        from jsonb_array_elements(deltas) e
+        group by 1
+    ) d
+    where b.id = d.bolsa_id
+    returning b.id, b.view_count;
+$$;
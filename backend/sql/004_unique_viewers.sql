@@ -0,0 +1,67 @@
+-- 👥 Visualizações únicas por bolsa (usada por api/unique_views.py)
+-- unique_viewers_hll guarda o esboço HyperLogLog (1 byte por registrador, 1 KB na
+-- precisão 10) e unique_viewers a estimativa de sessões distintas, usada no ranking.
+
+alter table bolsas
+    add column if not exists unique_viewers integer not null default 0,
+    add column if not exists unique_viewers_hll bytea;
+
+create index if not exists bolsas_unique_viewers_idx on bolsas (unique_viewers desc, view_count desc);
+
+-- Recebe [{"bolsa_id": "...", "hll": "<base64>"}, ...], mescla cada esboço com o
+-- gravado (máximo registrador a registrador: a mesma sessão vista por instâncias
+-- diferentes não conta duas vezes), recalcula a estimativa e a retorna.
+create or replace function merge_unique_viewers(sketches jsonb)
+returns table (bolsa_id uuid, unique_viewers integer)
+language plpgsql
+as $$
+declare
+    item jsonb;
+    alvo uuid;
+    novo bytea;
+    atual bytea;
+    mesclado bytea;
+    m integer;
+    soma double precision;
+    zeros integer;
+    estimativa double precision;
+begin
+    for item in select * from jsonb_array_elements(sketches)
+    loop
+        alvo := (item->>'bolsa_id')::uuid;
+        novo := decode(item->>'hll', 'base64');
+        m := length(novo);
+
+        select b.unique_viewers_hll into atual from bolsas b where b.id = alvo for update;
+        if not found then
+            continue;
+        end if;
+
+        if atual is null or length(atual) <> m then
+            mesclado := novo;
+        else
+            select decode(string_agg(lpad(to_hex(greatest(get_byte(atual, i), get_byte(novo, i))), 2, '0'), '' order by i), 'hex')
+            into mesclado
+            from generate_series(0, m - 1) i;
+        end if;
+
+        -- Estimador HyperLogLog com correção para cardinalidades pequenas
+        select sum(power(2.0, -get_byte(mesclado, i))), count(*) filter (where get_byte(mesclado, i) = 0)
+        into soma, zeros
+        from generate_series(0, m - 1) i;
+
+        estimativa := (0.7213 / (1 + 1.079 / m)) * m * m / soma;
+        if estimativa <= 2.5 * m and zeros > 0 then
+            estimativa := m * ln(m::double precision / zeros);
+        end if;
+
+        update bolsas b
+        set unique_viewers_hll = mesclado, unique_viewers = round(estimativa)::integer
+        where b.id = alvo;
+
+        bolsa_id := alvo;
+        unique_viewers := round(estimativa)::integer;
+        return next;
+    end loop;
+end;
+$$;
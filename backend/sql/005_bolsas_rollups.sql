@@ -0,0 +1,95 @@
+-- 📈 Rollups históricos de bolsas (usados por backend/rollups.py e /api/analytics/timeseries)
+-- Uma linha por (dia ou mês da oferta, centro, modalidade) com as bolsas ofertadas,
+-- a soma de vagas e as bolsas preenchidas. O backend envia deltas a cada gravação;
+-- a API lê só estas tabelas, com custo independente do tamanho do histórico.
+
+create table if not exists bolsas_rollup_diario (
+    dia date not null,
+    centro text not null default 'Não informado',
+    modalidade text not null default 'extensao',
+    bolsas integer not null default 0,
+    vagas integer not null default 0,
+    preenchidas integer not null default 0,
+    primary key (dia, centro, modalidade)
+);
+
+create table if not exists bolsas_rollup_mensal (
+    mes date not null,  -- Primeiro dia do mês
+    centro text not null default 'Não informado',
+    modalidade text not null default 'extensao',
+    bolsas integer not null default 0,
+    vagas integer not null default 0,
+    preenchidas integer not null default 0,
+    primary key (mes, centro, modalidade)
+);
+
+-- Recebe [{"dia": "2025-03-10", "centro": "CCH", "modalidade": "extensao",
+--          "bolsas": 2, "vagas": 3, "preenchidas": 0}, ...] e soma nas duas tabelas.
+-- Os itens são agregados antes do upsert (o mesmo ON CONFLICT não pode atualizar
+-- uma linha duas vezes no mesmo comando).
+create or replace function apply_bolsas_rollup_deltas(deltas jsonb)
+returns void
+language sql
+as $$
+    with itens as (
+        select
+            (item->>'dia')::date as dia,
+            coalesce(nullif(item->>'centro', ''), 'Não informado') as centro,
+            coalesce(nullif(item->>'modalidade', ''), 'extensao') as modalidade,
+            coalesce((item->>'bolsas')::integer, 0) as bolsas,
+            coalesce((item->>'vagas')::integer, 0) as vagas,
+            coalesce((item->>'preenchidas')::integer, 0) as preenchidas
+        from jsonb_array_elements(deltas) item
+    ),
+    diario as (
+        insert into bolsas_rollup_diario as r (dia, centro, modalidade, bolsas, vagas, preenchidas)
+        select dia, centro, modalidade, sum(bolsas), sum(vagas), sum(preenchidas)
+        from itens
+        group by dia, centro, modalidade
+        on conflict (dia, centro, modalidade) do update
+        set bolsas = r.bolsas + excluded.bolsas,
+            vagas = r.vagas + excluded.vagas,
+            preenchidas = r.preenchidas + excluded.preenchidas
+        returning 1
+    )
+    insert into bolsas_rollup_mensal as r (mes, centro, modalidade, bolsas, vagas, preenchidas)
+    select date_trunc('month', dia)::date, centro, modalidade, sum(bolsas), sum(vagas), sum(preenchidas)
+    from itens
+    group by 1, 2, 3
+    on conflict (mes, centro, modalidade) do update
+    set bolsas = r.bolsas + excluded.bolsas,
+        vagas = r.vagas + excluded.vagas,
+        preenchidas = r.preenchidas + excluded.preenchidas;
+$$;
+
+-- Recalcula tudo a partir de bolsas/projetos/editais: carga inicial e correção caso
+-- algum delta tenha se perdido. Atenção: bolsas já removidas pela limpeza de editais
+-- antigos deixam de aparecer no histórico recalculado.
+create or replace function rebuild_bolsas_rollups()
+returns void
+language sql
+as $$
+    delete from bolsas_rollup_diario;
+    delete from bolsas_rollup_mensal;
+
+    insert into bolsas_rollup_diario (dia, centro, modalidade, bolsas, vagas, preenchidas)
+    select
+        coalesce(e.data_publicacao, e.created_at::date),
+        coalesce(nullif(p.centro, ''), 'Não informado'),
+        coalesce(nullif(e.modalidade, ''), 'extensao'),
+        count(*),
+        sum(coalesce(b.vagas, 1)),
+        count(*) filter (where b.status = 'preenchida')
+    from bolsas b
+    join projetos p on p.id = b.projeto_id
+    join editais e on e.id = p.edital_id
+    group by 1, 2, 3;
+
+    insert into bolsas_rollup_mensal (mes, centro, modalidade, bolsas, vagas, preenchidas)
+    select date_trunc('month', dia)::date, centro, modalidade, sum(bolsas), sum(vagas), sum(preenchidas)
+    from bolsas_rollup_diario
+    group by 1, 2, 3;
+$$;
+
+-- Carga inicial
+select rebuild_bolsas_rollups();
@@ -0,0 +1,33 @@
+-- 📊 Agregados do snapshot de /api/analytics, calculados no banco
+-- Usada por SupabaseManager.save_analytics_snapshot (backend/database.py) no fim do
+-- scraping: devolve uma linha por status, centro e tipo de bolsas_view_agrupada, em
+-- vez de o backend baixar a view inteira para contar em Python.
+--
+-- bolsas_view_agrupada junta várias bolsas (mesmo projeto + perfil) numa linha, e o
+-- `id` exposto pela view não é garantidamente único entre os grupos. Por isso a view
+-- não é paginada por id (iter_row_chunks pularia ou repetiria grupos empatados); as
+-- contas abaixo não dependem de chave nenhuma.
+--
+--   dimensao: 'status' | 'centro' | 'tipo'
+--   chave:    valor da dimensão
+--   grupos:   bolsas agrupadas (linhas da view) com esse valor
+--   vagas:    soma de vagas_total (nulo conta 1, como em bolsas_totais_agrupadas)
+
+create or replace function bolsas_analytics_agregado()
+returns table (dimensao text, chave text, grupos bigint, vagas bigint)
+language sql
+stable
+as $$
+    select
+        case when grouping(v.status) = 0 then 'status'
+             when grouping(v.centro) = 0 then 'centro'
+             else 'tipo' end as dimensao,
+        case when grouping(v.status) = 0 then v.status::text
+             when grouping(v.centro) = 0 then v.centro::text
+             else v.tipo::text end as chave,
+        count(*)::bigint as grupos,
+        coalesce(sum(coalesce(v.vagas_total, 1)), 0)::bigint as vagas
+    from bolsas_view_agrupada v
+    group by grouping sets ((v.status), (v.centro), (v.tipo))
+    order by 1, 3 desc, 2;
+$$;
@@ -1,7 +1,7 @@
 import os
 from dotenv import load_dotenv
 from scraper import UenfScraper
-from parser import UenfParser
+from parser import UenfParser, RunBudget  # RunBudget do mesmo módulo que o parser usa
 from database import SupabaseManager
 import sys
 from datetime import datetime, timezone
@@ -19,6 +19,11 @@ def run_scraping_task():
     """
     Orquestra o processo de scraping, parsing e armazenamento dos dados.
     """
+    # ⏱️ O orçamento de tempo começa a contar junto com a tarefa (SCRAPER_TIME_BUDGET_SECONDS)
+    run_budget = RunBudget.from_env()
+    parser = None
+    db_manager = None
+
     try:
         # A API já terá carregado as variáveis de ambiente, mas para execução manual é bom garantir.
         supabase_url = os.environ.get("SUPABASE_URL")
@@ -29,7 +34,9 @@ def run_scraping_task():
             raise ValueError("SUPABASE_URL e SUPABASE_KEY são necessárias.")
 
         db_manager = SupabaseManager(supabase_url=supabase_url, supabase_key=supabase_key)
-        parser = UenfParser()
+        parser = UenfParser(run_budget=run_budget)
+        # 📦 Editais são gravados em lote (no fim da execução ou a cada DB_WRITE_BATCH_SIZE)
+        db_manager.begin_write_batch()
         
         # Agora busca em mais páginas, começando da primeira (mais recente)
         # A lógica inteligente no scraper irá parar a busca quando encontrar editais antigos
@@ -48,9 +55,16 @@ def run_scraping_task():
                 # Nenhum edital novo, interrompendo busca
                 break
         
+        # Grava o que restou no buffer antes de marcar a atualização
+        db_manager.flush_writes()
+
         # Se pelo menos um edital novo foi processado, atualiza o timestamp no banco
-        if total_novos_editais > 0:
-            timestamp_utc = datetime.now(timezone.utc).isoformat()
+        timestamp_utc = datetime.now(timezone.utc).isoformat() if total_novos_editais > 0 else None
+
+        # 📊 Snapshot de analytics recalculado antes da nova época (que invalida os caches da API)
+        db_manager.save_analytics_snapshot(data_epoch=timestamp_utc or db_manager.cache.current_epoch())
+
+        if timestamp_utc:
             db_manager.update_last_data_update(timestamp_utc)
 
         # Processo concluído
@@ -59,6 +73,23 @@ def run_scraping_task():
         print(f"Ocorreu um erro inesperado na tarefa de scraping: {e}")
         import traceback
         traceback.print_exc()
+        # Não perde os editais já processados que ainda estavam no buffer
+        if db_manager is not None:
+            db_manager.flush_writes()
+
+    # 📒 Grava o uso de cota pendente (o livro só salva periodicamente durante a execução)
+    # e encerra o pool de threads do parser
+    if parser is not None:
+        parser.quota_ledger.flush()
+        parser.close()
+
+    # 📊 Resumo de custo e latência das chamadas à IA desta execução
+    if parser is not None:
+        try:
+            print(parser.accounting.format_table())
+            print(f"Resumo das chamadas à IA salvo em: {parser.accounting.write_summary()}")
+        except Exception as e:
+            print(f"Falha ao salvar o resumo das chamadas à IA: {e}")
     
     # Fim da tarefa de scraping
 
@@ -0,0 +1,118 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from backend.analytics import build_analytics_snapshot, build_analytics_snapshot_from_aggregates, SNAPSHOT_VERSION
+
+
+def test_snapshot_em_uma_passada_segue_as_regras_da_api():
+    linhas = iter([
+        {'status': 'disponivel', 'vagas_total': 3, 'centro': 'CCH', 'tipo': 'Extensão'},
+        {'status': 'disponivel', 'vagas_total': None, 'centro': 'CCH', 'tipo': 'Extensão'},
+        {'status': 'preenchida', 'vagas_total': 2, 'centro': 'CCT', 'tipo': 'UA Superior'},
+        {'status': 'preenchida', 'centro': 'CCTA', 'tipo': 'Extensão'},
+    ])
+    agora = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+    snapshot = build_analytics_snapshot(linhas, data_epoch='2025-03-10T11:00:00+00:00', now=agora)
+
+    assert snapshot['total_bolsas'] == 7  # vagas_total ausente ou nulo conta 1
+    assert snapshot['bolsas_por_status'] == {'disponivel': 4, 'preenchida': 3}
+    assert snapshot['centros_populares'][0] == 'CCH'
+    assert snapshot['tipos_mais_procurados'] == ['Extensão', 'UA Superior']
+    assert snapshot['ultima_atualizacao'] == '2025-03-10'
+    assert snapshot['snapshot_version'] == SNAPSHOT_VERSION
+    assert snapshot['data_epoch'] == '2025-03-10T11:00:00+00:00'
+
+
+def test_snapshot_vazio_e_limita_o_topo_a_cinco():
+    assert build_analytics_snapshot([])['total_bolsas'] == 0
+    linhas = [{'status': 'disponivel', 'vagas_total': 1, 'centro': f'C{i}', 'tipo': 'Extensão'} for i in range(8)]
+    assert len(build_analytics_snapshot(linhas)['centros_populares']) == 5
+
+
+def _agregar(linhas):
+    """O que a RPC bolsas_analytics_agregado devolveria para estas linhas da view."""
+    grupos = {}
+    for linha in linhas:
+        vagas = 1 if linha.get('vagas_total') is None else linha['vagas_total']
+        for dimensao in ('status', 'centro', 'tipo'):
+            chave = (dimensao, linha.get(dimensao))
+            conta = grupos.setdefault(chave, {'dimensao': dimensao, 'chave': chave[1], 'grupos': 0, 'vagas': 0})
+            conta['grupos'] += 1
+            conta['vagas'] += vagas
+    return sorted(grupos.values(), key=lambda g: (g['dimensao'], -g['grupos'], g['chave']))
+
+
+def test_snapshot_dos_agregados_igual_ao_das_linhas():
+    linhas = [
+        {'status': 'disponivel', 'vagas_total': 3, 'centro': 'CCH', 'tipo': 'Extensão'},
+        {'status': 'disponivel', 'vagas_total': None, 'centro': 'CCT', 'tipo': 'Extensão'},
+        {'status': 'preenchida', 'vagas_total': 2, 'centro': 'CCT', 'tipo': 'UA Superior'},
+        {'status': 'preenchida', 'vagas_total': 1, 'centro': 'CCT', 'tipo': 'UA Superior'},
+        {'status': 'disponivel', 'vagas_total': 1, 'centro': 'CCH', 'tipo': 'Extensão'},
+        {'status': 'preenchida', 'vagas_total': 1, 'centro': 'CCTA', 'tipo': 'UA Médio'},
+    ]  # Sem empates na contagem: a ordem entre empatados não é definida em nenhum dos caminhos
+    agora = datetime(2025, 3, 10, 12, 0, tzinfo=timezone.utc)
+    assert build_analytics_snapshot_from_aggregates(_agregar(linhas), now=agora) == build_analytics_snapshot(linhas, now=agora)
+
+
+class _Resposta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Supabase:
+    def __init__(self, agregados=None):
+        self.agregados = agregados
+        self.tabelas, self.rpcs, self.upserts = [], [], []
+
+    def table(self, nome):
+        self.tabelas.append(nome)
+        cliente = self
+
+        class _Consulta:
+            def upsert(self, linha, **kwargs):
+                cliente.upserts.append(linha)
+                return self
+
+            def execute(self):
+                return _Resposta([])
+        return _Consulta()
+
+    def rpc(self, nome, params):
+        self.rpcs.append(nome)
+        agregados = self.agregados
+
+        class _Execucao:
+            def execute(self):
+                if agregados is None:
+                    raise Exception("function bolsas_analytics_agregado does not exist")
+                return _Resposta(agregados)
+        return _Execucao()
+
+
+def _manager(monkeypatch, cliente):
+    database = pytest.importorskip("backend.database")
+    monkeypatch.setenv("SUPABASE_URL", "https://exemplo.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "chave")
+    monkeypatch.setattr(database, "create_client", lambda url, key: cliente)
+    return database.SupabaseManager()
+
+
+def test_save_snapshot_usa_a_rpc_e_nao_pagina_a_view(monkeypatch):
+    linhas = [{'status': 'disponivel', 'vagas_total': 2, 'centro': 'CCH', 'tipo': 'Extensão'}]
+    cliente = _Supabase(_agregar(linhas))
+    snapshot = _manager(monkeypatch, cliente).save_analytics_snapshot(data_epoch='2025-03-10T11:00:00+00:00')
+
+    assert cliente.rpcs == ['bolsas_analytics_agregado']
+    assert 'bolsas_view_agrupada' not in cliente.tabelas
+    assert snapshot['total_bolsas'] == 2 and snapshot['data_epoch'] == '2025-03-10T11:00:00+00:00'
+    (gravado,) = cliente.upserts
+    assert gravado['key'] == 'analytics_snapshot' and json.loads(gravado['value']) == snapshot
+
+
+def test_sem_rpc_nao_grava_snapshot(monkeypatch):
+    cliente = _Supabase()
+    assert _manager(monkeypatch, cliente).save_analytics_snapshot() is None
+    assert cliente.upserts == [] and 'bolsas_view_agrupada' not in cliente.tabelas
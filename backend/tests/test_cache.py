@@ -0,0 +1,143 @@
+import threading
+import time
+
+from backend.cache import LRUTTLCache, EpochCache, SingleFlight, cached_read, _MISS
+
+
+def _relogio(instante):
+    return lambda: instante[0]
+
+
+def test_lru_descarta_o_menos_usado_e_respeita_ttl():
+    instante = [0.0]
+    cache = LRUTTLCache(max_entries=2, ttl_seconds=10, clock=_relogio(instante))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1  # 'a' passa a ser o mais recente
+    cache.set('c', 3)
+    assert cache.get('b') is _MISS
+    assert cache.stats['evictions'] == 1
+
+    instante[0] = 11.0
+    assert cache.get('a') is _MISS
+    assert cache.stats['expired'] == 1
+
+
+def test_mudanca_de_epoca_invalida_sem_varrer_o_cache():
+    """A época só é relida após o intervalo; a partir daí as entradas antigas não valem."""
+    instante = [0.0]
+    epoca = ['2026-01-01']
+    cargas = []
+    cache = EpochCache(epoch_loader=lambda: epoca[0], epoch_check_seconds=30, clock=_relogio(instante))
+
+    def carregar():
+        cargas.append(1)
+        return {'versao': epoca[0]}
+
+    assert cache.get_or_load('k', carregar) == {'versao': '2026-01-01'}
+    epoca[0] = '2026-01-02'
+    assert cache.get_or_load('k', carregar) == {'versao': '2026-01-01'}
+    assert len(cargas) == 1
+
+    instante[0] = 31.0
+    assert cache.get_or_load('k', carregar) == {'versao': '2026-01-02'}
+    assert len(cargas) == 2
+    assert cache.stats['stale_epoch'] == 1
+
+
+def test_resultado_vazio_nao_e_guardado():
+    """Os métodos do banco devolvem [] ou None em caso de erro: isso não pode ficar em cache."""
+    cache = EpochCache()
+    respostas = [[], ['edital']]
+    assert cache.get_or_load('k', lambda: respostas.pop(0)) == []
+    assert cache.get_or_load('k', lambda: respostas.pop(0)) == ['edital']
+
+
+def test_decorador_usa_argumentos_na_chave():
+    class Banco:
+        def __init__(self):
+            self.cache = EpochCache()
+            self.consultas = 0
+
+        @cached_read
+        def get_editais(self, page=1, page_size=10):
+            self.consultas += 1
+            return [page, page_size]
+
+    banco = Banco()
+    assert banco.get_editais(page=1) == [1, 10]
+    assert banco.get_editais(page=1) == [1, 10]
+    assert banco.get_editais(page=2) == [2, 10]
+    assert banco.consultas == 2
+
+    banco.cache.invalidate()
+    banco.get_editais(page=1)
+    assert banco.consultas == 3
+
+
+def _chamar_em_paralelo(n, fn):
+    resultados, threads = [], []
+    for _ in range(n):
+        threads.append(threading.Thread(target=lambda: resultados.append(fn())))
+    for thread in threads:
+        thread.start()
+    return threads, resultados
+
+
+def test_single_flight_agrupa_chamadas_simultaneas():
+    voo = SingleFlight()
+    liberar = threading.Event()
+    consultas = []
+
+    def consulta():
+        consultas.append(1)
+        liberar.wait(5)
+        return ['bolsa']
+
+    threads, resultados = _chamar_em_paralelo(5, lambda: voo.do('pagina-1', consulta))
+    while voo.stats['calls'] < 5:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(consultas) == 1
+    assert resultados == [['bolsa']] * 5
+    assert voo.stats['collapsed'] == 4
+    assert voo.do('pagina-1', lambda: ['nova']) == ['nova']  # Terminada, a chave é liberada
+
+
+def test_single_flight_repassa_a_excecao_e_libera_a_chave():
+    voo = SingleFlight()
+
+    def falha():
+        raise RuntimeError("timeout")
+
+    try:
+        voo.do('k', falha)
+        assert False, "deveria propagar a exceção"
+    except RuntimeError:
+        pass
+    assert voo.do('k', lambda: 1) == 1
+
+
+def test_cache_faz_uma_consulta_para_leituras_simultaneas():
+    cache = EpochCache()
+    liberar = threading.Event()
+    consultas = []
+
+    def carregar():
+        consultas.append(1)
+        liberar.wait(5)
+        return ['edital']
+
+    threads, resultados = _chamar_em_paralelo(4, lambda: cache.get_or_load('editais', carregar))
+    while cache.flights.stats['calls'] < 4:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(consultas) == 1
+    assert resultados == [['edital']] * 4
+    assert cache.stats['collapsed'] == 3
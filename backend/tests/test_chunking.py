@@ -0,0 +1,38 @@
+from backend.chunking import chunk_pages, split_trailing_fragment
+
+
+def _pagina(num, texto, total=3):
+    return {'page_num': num, 'total': total, 'texto': texto}
+
+
+def test_paginas_pequenas_sao_agrupadas():
+    """Páginas que cabem no orçamento viram um único trecho."""
+    paginas = [_pagina(0, "a" * 400), _pagina(1, "b" * 400), _pagina(2, "c" * 400)]
+    trechos = chunk_pages(paginas, token_budget=1000)
+    assert len(trechos) == 1
+    assert trechos[0]['pages'] == [0, 1, 2]
+
+
+def test_orcamento_separa_trechos():
+    """Quando o orçamento estoura, começa um novo trecho; uma página nunca é cortada."""
+    paginas = [_pagina(0, "a" * 4000), _pagina(1, "b" * 4000), _pagina(2, "c" * 400)]
+    trechos = chunk_pages(paginas, token_budget=1200)
+    assert [t['pages'] for t in trechos] == [[0], [1, 2]]
+
+
+def test_orcamento_zero_mantem_uma_pagina_por_trecho():
+    paginas = [_pagina(0, "a 1"), _pagina(1, "b 1")]
+    assert [t['pages'] for t in chunk_pages(paginas, token_budget=0)] == [[0], [1]]
+
+
+def test_linha_quebrada_entre_paginas_fica_inteira():
+    """O começo de uma linha no fim da página vai para o trecho que contém o resto dela."""
+    pagina_0 = "Gerson Silva Entomologia Maria Luiza 1º Classificado 1 1\nFábio Olivares\nDesenvolvimento de"
+    pagina_1 = "biopesticida João Pedro 2º Classificado 2 1"
+    trechos = chunk_pages([_pagina(0, pagina_0), _pagina(1, pagina_1)], token_budget=0)
+    assert trechos[0]['texto'].endswith("1º Classificado 1 1")
+    assert trechos[1]['texto'] == "Fábio Olivares\nDesenvolvimento de\nbiopesticida João Pedro 2º Classificado 2 1"
+
+
+def test_sem_linha_de_tabela_nao_ha_fragmento():
+    assert split_trailing_fragment("Texto corrido sem tabela") == ("Texto corrido sem tabela", "")
@@ -0,0 +1,30 @@
+import gzip
+import importlib.util
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "compression", Path(__file__).resolve().parents[2] / "api" / "compression.py")
+compression = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(compression)
+
+
+def test_negociacao_respeita_q_e_tamanho_minimo():
+    assert compression.negotiate('gzip, deflate', size=5000, min_bytes=1024) == 'gzip'
+    assert compression.negotiate('gzip', size=100, min_bytes=1024) is None
+    assert compression.negotiate('gzip;q=0, deflate', size=5000, min_bytes=1024) is None
+    assert compression.negotiate('*', size=5000, min_bytes=1024) in ('br', 'gzip')
+    assert compression.negotiate('', size=5000, min_bytes=1024) is None
+    esperado = 'br' if compression.BROTLI_AVAILABLE else 'gzip'
+    assert compression.negotiate('gzip;q=0.5, br', size=5000, min_bytes=1024) == esperado
+
+
+def test_versao_comprimida_fica_na_entrada():
+    entry = {'body': b'{"bolsas": [' + b'{"resumo": "texto repetido"},' * 200 + b'{}]}', 'etag': '"abc-1"'}
+    primeira = compression.encoded_body(entry, 'gzip')
+    assert gzip.decompress(primeira) == entry['body']
+    assert len(primeira) < len(entry['body']) / 10
+    assert compression.encoded_body(entry, 'gzip') is primeira  # Não comprime de novo
+    assert compression.compress(entry['body'], 'gzip') == primeira  # Determinístico (ETag forte)
+    assert compression.variant_etag(entry['etag'], 'gzip') == '"abc-1-gzip"'
+    assert compression.variant_etag(entry['etag'], None) == '"abc-1"'
@@ -0,0 +1,45 @@
+import importlib.util
+import json
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "fast_json", Path(__file__).resolve().parents[2] / "api" / "fast_json.py")
+fast_json = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(fast_json)
+RowBytesCache = fast_json.RowBytesCache
+
+
+def _bolsa(i, views=0):
+    return {'id': f'b{i}', 'requisito': 'Cursar graduação em Ciências Sociais', 'view_count': views}
+
+
+def test_dumps_gera_utf8_sem_escapar_acentos():
+    corpo = fast_json.dumps({'centro': 'CCH', 'resumo': 'extensão'})
+    assert 'extensão'.encode('utf-8') in corpo
+    assert json.loads(corpo) == {'centro': 'CCH', 'resumo': 'extensão'}
+
+
+def test_pagina_montada_com_bytes_por_linha_equivale_ao_json():
+    cache = RowBytesCache(max_entries=100)
+    pagina = {'bolsas': [_bolsa(1), _bolsa(2)], 'total': 2, 'page': 1, 'total_vagas': None}
+    corpo = cache.encode(pagina, 'bolsas', rows_key='bolsas', epoch='e1')
+    assert json.loads(corpo) == pagina
+    assert json.loads(cache.encode({'bolsas': []}, 'bolsas', rows_key='bolsas', epoch='e1')) == {'bolsas': []}
+    assert json.loads(cache.encode([_bolsa(3)], 'ranking', epoch='e1')) == [_bolsa(3)]
+
+
+def test_linhas_reaproveitadas_ate_mudar_visualizacoes_ou_epoca():
+    cache = RowBytesCache(max_entries=100)
+    cache.encode([_bolsa(1), _bolsa(2)], 'bolsas', epoch='e1')
+    cache.encode([_bolsa(2), _bolsa(1)], 'bolsas', epoch='e1')
+    assert cache.stats == {'hits': 2, 'misses': 2}
+
+    corpo = cache.encode([_bolsa(1, views=5)], 'bolsas', epoch='e1')  # Visualizações mudaram
+    assert json.loads(corpo)[0]['view_count'] == 5
+    cache.encode([_bolsa(1)], 'ranking', epoch='e1')  # Outra consulta, mesmo id
+    assert cache.stats['misses'] == 4
+
+    cache.encode([_bolsa(1)], 'bolsas', epoch='e2')  # Época nova: tudo recodificado
+    assert cache.stats['misses'] == 5
+    assert cache.health()['entries'] == 1
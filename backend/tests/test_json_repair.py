@@ -0,0 +1,28 @@
+from backend.json_repair import repair_json
+
+
+def test_remove_markdown_e_virgula_sobrando():
+    texto = 'Aqui está:\n```json\n{"r": [["Gerson", "1"],]}\n```'
+    assert repair_json(texto) == ({"r": [["Gerson", "1"]]}, True)
+
+
+def test_resposta_cortada_aproveita_linhas_completas():
+    """A linha cortada no meio é descartada inteira; as anteriores são mantidas."""
+    dados, completo = repair_json('{"r": [["a", "1"], ["b", "2"], ["c", "Classif')
+    assert completo is False
+    assert dados == {"r": [["a", "1"], ["b", "2"]]}
+
+
+def test_resposta_cortada_de_bolsas_mantem_chaves_do_topo():
+    dados, completo = repair_json('{"p": "Projeto", "o": "Orientador", "b": [["UA", 1, 1, "req", 700.0], ["", 2')
+    assert completo is False
+    assert dados == {"p": "Projeto", "o": "Orientador", "b": [["UA", 1, 1, "req", 700.0]]}
+
+
+def test_chaves_dentro_de_strings_sao_ignoradas():
+    assert repair_json('{"nome": "a}], b"} texto extra') == ({"nome": "a}], b"}, True)
+
+
+def test_nada_aproveitavel():
+    assert repair_json('{"r": [["a') == (None, False)
+    assert repair_json("Não encontrei tabela.") == (None, False)
@@ -0,0 +1,36 @@
+import json
+
+from backend.llm_accounting import OUTCOME_ERROR, LLMAccounting, percentile
+
+
+def test_retentativas_e_hedges_sao_contados_por_prompt():
+    """Mesmo prompt repetido conta como retentativa; a duplicata de hedge não."""
+    contas = LLMAccounting()
+    contas.edital = "Edital 01/2026"
+    contas.record("bolsas", "flash", 0, "fp1", 2.0, outcome=OUTCOME_ERROR)
+    contas.record("bolsas", "flash", 0, "fp1", 1.0, input_tokens=100, output_tokens=20)
+    contas.record("bolsas", "flash", 1, "fp1", 0.5, input_tokens=100, output_tokens=20, hedge=True)
+    contas.record("resultado", "flash", 0, "fp2", 4.0, input_tokens=300, output_tokens=90, cached=True)
+
+    resumo = contas.summary()
+    bolsas = resumo['by_call_site']['bolsas']
+    assert (bolsas['calls'], bolsas['retries'], bolsas['hedges'], bolsas['errors']) == (3, 1, 1, 1)
+    assert resumo['total']['input_tokens'] == 500
+    assert resumo['total']['cache_hits'] == 1
+    assert resumo['by_edital']['Edital 01/2026']['calls'] == 4
+
+
+def test_resumo_gravado_em_json_com_tabela(tmp_path):
+    contas = LLMAccounting()
+    contas.record("resultado", "flash", 0, "fp", 1.5)
+    with open(contas.write_summary(str(tmp_path)), encoding='utf-8') as f:
+        resumo = json.load(f)
+    assert resumo['total']['latency_p99'] == 1.5
+    assert resumo['table'].splitlines()[-1].startswith("TOTAL")
+
+
+def test_percentil_por_posicao_mais_proxima():
+    valores = list(range(1, 101))
+    assert percentile(valores, 0.5) == 50
+    assert percentile(valores, 0.99) == 99
+    assert percentile([], 0.9) is None
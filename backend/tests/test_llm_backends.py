@@ -0,0 +1,88 @@
+import json
+import threading
+
+import pytest
+
+from backend.llm_backends import (
+    FakeLLMBackend, LatencyProfile, QuotaExceededError, RecordingBackend, load_recordings, prompt_fingerprint
+)
+
+PROMPT_RESULTADO = """
+Extraia a tabela.
+---
+Maria Luiza da Silva 1º Classificado 2 1
+João Pedro Ribeiro 2º Classificado 1 1
+---
+"""
+
+
+def _backend(**kwargs):
+    kwargs.setdefault('latency', LatencyProfile(base_seconds=0, jitter_seconds=0, per_output_token_seconds=0))
+    return FakeLLMBackend(**kwargs)
+
+
+def test_fake_backend_sintetiza_json_de_resultado():
+    """Sem gravação, o backend falso gera linhas no schema headers/rows."""
+    response = _backend().generate(PROMPT_RESULTADO, api_key="k1", call_site="resultado")
+    dados = json.loads(response.text)
+    assert dados["headers"][2] == "NOME"
+    assert [row[2] for row in dados["rows"]] == ["Maria Luiza da Silva", "João Pedro Ribeiro"]
+
+
+def test_fake_backend_reproduz_gravacao():
+    """Respostas gravadas têm prioridade e são marcadas como cache."""
+    backend = _backend(recordings={prompt_fingerprint("oi"): '{"ok": true}'})
+    response = backend.generate("oi", api_key="k1", call_site="bolsas")
+    assert response.text == '{"ok": true}'
+    assert response.cached is True
+
+
+def test_fake_backend_latencia_deterministica():
+    """A mesma seed gera a mesma sequência de latências."""
+    latencias = []
+    for _ in range(2):
+        dormidas = []
+        backend = FakeLLMBackend(latency=LatencyProfile(base_seconds=1.0, jitter_seconds=0.5), seed=7, sleep=dormidas.append)
+        backend.generate(PROMPT_RESULTADO, api_key="k1", call_site="resultado")
+        backend.generate(PROMPT_RESULTADO, api_key="k1", call_site="resultado")
+        latencias.append(dormidas)
+    assert latencias[0] == latencias[1]
+    assert all(0.5 <= l for l in latencias[0])
+
+
+def test_fake_backend_cota_diaria_por_chave():
+    """Após o limite diário, a chave recebe 429 diário; outra chave continua funcionando."""
+    backend = _backend(daily_request_limit=1)
+    backend.generate("a", api_key="k1", call_site="bolsas")
+    with pytest.raises(QuotaExceededError) as excinfo:
+        backend.generate("b", api_key="k1", call_site="bolsas")
+    assert excinfo.value.daily is True
+    backend.generate("b", api_key="k2", call_site="bolsas")
+
+
+def test_gravacao_acrescenta_uma_linha_por_chamada(tmp_path):
+    caminho = tmp_path / "gravacoes" / "respostas.jsonl"
+    gravador = RecordingBackend(_backend(), str(caminho))
+    prompts = [f"PROMPT {i}" for i in range(40)]
+    threads = [threading.Thread(target=gravador.generate, args=(p,), kwargs={'call_site': 'bolsas'}) for p in prompts]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    linhas = caminho.read_text(encoding='utf-8').splitlines()
+    assert len(linhas) == 40  # Nenhuma linha intercalada ou perdida
+    assert {json.loads(l)['fingerprint'] for l in linhas} == {prompt_fingerprint(p) for p in prompts}
+
+    reproducao = _backend(recordings_path=str(caminho))
+    assert reproducao.generate("PROMPT 7", call_site="bolsas").cached is True
+
+
+def test_gravacoes_no_formato_antigo_continuam_carregando(tmp_path):
+    caminho = tmp_path / "antigo.json"
+    caminho.write_text(json.dumps({'version': 1, 'responses': {'abc': {'call_site': 'bolsas', 'text': '{}'}}}),
+                       encoding='utf-8')
+    RecordingBackend(_backend(), str(caminho)).generate("novo")
+    gravacoes = load_recordings(str(caminho))
+    assert gravacoes['abc'] == '{}' and prompt_fingerprint("novo") in gravacoes
+    assert load_recordings(str(tmp_path / "nao_existe.jsonl")) == {}
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from backend.llm_deadline import DeadlineExceeded, LatencyTracker, RunBudget, hedged_call
+
+
+def _lenta(segundos, valor):
+    def chamada():
+        time.sleep(segundos)
+        return valor
+    return chamada
+
+
+def test_hedge_responde_quando_a_primaria_demora():
+    """Passado o limiar, a duplicata é disparada e a primeira resposta vence."""
+    inicio = time.monotonic()
+    assert hedged_call(_lenta(2, "primaria"), _lenta(0.01, "hedge"), hedge_after=0.05, timeout=5) == "hedge"
+    assert time.monotonic() - inicio < 1
+
+
+def test_erro_da_primaria_antes_do_hedge_sobe_direto():
+    def falha():
+        raise ValueError("cota")
+    with pytest.raises(ValueError):
+        hedged_call(falha, _lenta(0.01, "hedge"), hedge_after=1, timeout=5)
+
+
+def test_sem_hedge_nem_prazo_roda_na_thread_atual():
+    assert hedged_call(threading.current_thread) is threading.current_thread()
+    assert hedged_call(threading.current_thread, hedge=lambda: None, hedge_after=None) is threading.current_thread()
+    with pytest.raises(ValueError):
+        hedged_call(lambda: int("x"))
+
+
+def test_chamada_que_nao_cabe_no_prazo_e_cancelada():
+    with pytest.raises(DeadlineExceeded):
+        hedged_call(_lenta(2, "primaria"), timeout=0.05)
+
+
+def test_orcamento_limita_o_timeout_das_chamadas():
+    agora = [0.0]
+    budget = RunBudget(total_seconds=100, reserve_seconds=10, clock=lambda: agora[0])
+    assert budget.call_timeout(600) == 90
+    agora[0] = 95
+    assert budget.call_timeout(600) == 0 and budget.expired()
+
+
+def test_limiar_so_existe_com_amostras_suficientes():
+    tracker = LatencyTracker(percentile=0.9, min_samples=3, min_seconds=0)
+    tracker.record("bolsas", 1.0)
+    assert tracker.threshold("bolsas") is None
+    for segundos in (2.0, 3.0, 10.0):
+        tracker.record("bolsas", segundos)
+    assert tracker.threshold("bolsas") == 10.0
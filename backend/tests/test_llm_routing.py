@@ -0,0 +1,51 @@
+import json
+
+from backend.llm_backends import FakeLLMBackend, LatencyProfile
+from backend.llm_routing import TIER_FAST, TIER_FULL, TIER_LOCAL, ModelRouter, analyze_input, rows_look_complete
+from backend.llm_schema import COMPACT_MARKER, decode_resultado
+
+TRECHO_SIMPLES = "COORDENADOR PROJETO NOME COLOCAÇÃO PERFIL\nMaria Luiza 1º Classificado 1 1\nJoão Pedro 2º Classificado 2 1"
+
+
+def _router():
+    return ModelRouter(fast_model="lite", full_model="full", fast_max_tokens=1500, fast_max_rows=15, fast_max_perfis=1)
+
+
+def test_escolha_do_nivel_por_complexidade():
+    router = _router()
+    sem_tabela = analyze_input("Texto sem tabela nenhuma, só avisos.", 'resultado')
+    assert router.choose(sem_tabela, 'resultado') == TIER_FAST  # Atalho local desligado por padrão
+    assert router.choose(analyze_input(TRECHO_SIMPLES, 'resultado'), 'resultado') == TIER_FAST
+    grande = "\n".join(f"Aluno {i} {i}º Classificado 1 1" for i in range(40))
+    assert router.choose(analyze_input(grande, 'resultado'), 'resultado') == TIER_FULL
+    assert router.choose(analyze_input("PERFIL 1: Biologia\nPERFIL 2: Química", 'bolsas'), 'bolsas') == TIER_FULL
+
+
+def test_modelo_rapido_reprovado_escala_para_o_completo():
+    """Com o modelo rápido sempre 'fraco' no backend falso, a resposta vem do modelo completo."""
+    backend = FakeLLMBackend(latency=LatencyProfile(0, 0, 0, 0), degraded_models={"lite": 1.0})
+    prompt = f"{COMPACT_MARKER}\n---\n{TRECHO_SIMPLES}\n---\n"
+
+    def call(model):
+        return decode_resultado(json.loads(backend.generate(prompt, api_key="k1", call_site="resultado", model=model).text))[1]
+
+    router = _router()
+    rows = router.run(TRECHO_SIMPLES, 'resultado', call=call, validate=lambda r, a: rows_look_complete(a, len(r)))
+    assert [row[2] for row in rows] == ["Maria Luiza", "João Pedro"]
+    assert [c['model'] for c in backend.calls] == ["lite", "full"]
+    assert router.stats['escalations'] == 1
+
+
+def test_roteamento_desligado_usa_sempre_o_modelo_completo():
+    router = ModelRouter(fast_model="lite", full_model="full", enabled=False)
+    modelos = []
+    router.run(TRECHO_SIMPLES, 'resultado', call=lambda m: modelos.append(m) or [], validate=lambda r, a: True)
+    assert modelos == ["full"]
+
+
+def test_atalho_local_so_quando_ligado():
+    sem_tabela = analyze_input("Texto sem tabela nenhuma, só avisos.", 'resultado')
+    router = ModelRouter(fast_model="lite", full_model="full", local_enabled=True)
+    assert router.choose(sem_tabela, 'resultado') == TIER_LOCAL
+    # Ordinais "1°" / "1ª" sem número no fim também contam como linha de tabela
+    assert analyze_input("Maria Luiza 1° lugar\nAna Souza 2ª colocada", 'resultado')['table_rows'] == 2
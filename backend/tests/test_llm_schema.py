@@ -0,0 +1,34 @@
+from backend.llm_schema import decode_bolsas, decode_resultado, output_token_cap
+
+
+def test_decode_resultado_compacto():
+    """Linhas posicionais viram headers/rows com os cabeçalhos normalizados."""
+    headers, rows = decode_resultado({"r": [["Gerson", "Entomologia", "Maria", "1º Classificado", "1"]]})
+    assert headers == ["COORDENADOR", "PROJETO", "NOME", "COLOCAÇÃO", "PERFIL"]
+    assert rows[0][headers.index("NOME")] == "Maria"
+
+
+def test_decode_resultado_aceita_schema_antigo():
+    headers, rows = decode_resultado({"headers": ["nome", "perfil"], "rows": [["Maria", "1"]]})
+    assert headers == ["NOME", "PERFIL"]
+    assert rows == [["Maria", "1"]]
+
+
+def test_decode_bolsas_repete_campos_vazios_do_perfil_anterior():
+    """`tipo_bolsa`/`requisitos` vazios herdam o valor do perfil anterior."""
+    dados = decode_bolsas({
+        "p": "Trilhas das Abelhas",
+        "o": "Maria Cristina",
+        "b": [["Bolsa UA Superior", 3, 1, "Cursar Biologia", 700.0], ["", 1, 2, "", 700.0]],
+    })
+    assert dados["nome_projeto"] == "Trilhas das Abelhas"
+    assert dados["detalhe_bolsas"][1] == {
+        "tipo_bolsa": "Bolsa UA Superior", "vagas": 1, "numero_perfil": 2,
+        "requisitos": "Cursar Biologia", "valor_bolsa": 700.0,
+    }
+
+
+def test_output_token_cap_sobrescrito_por_env(monkeypatch):
+    monkeypatch.setenv("LLM_MAX_OUTPUT_TOKENS_BOLSAS", "512")
+    assert output_token_cap("bolsas") == 512
+    assert output_token_cap("desconhecido") is None
@@ -0,0 +1,74 @@
+import re
+import time
+
+import pytest
+
+pytest.importorskip("fitz")
+
+from backend.llm_backends import FakeLLMBackend, LatencyProfile
+from backend.parser import UenfParser, _CHAVES_ESGOTADAS
+
+TOTAL = 8
+
+
+class _ForaDeOrdem(FakeLLMBackend):
+    """Backend falso em que os trechos do começo do documento terminam por último."""
+
+    def __init__(self, **kwargs):
+        super().__init__(latency=LatencyProfile(0, 0, 0, 0), **kwargs)
+        self.concluidos = []
+
+    def generate(self, prompt, **kwargs):
+        pagina = int(re.search(r'PAGINA (\d+)', prompt).group(1))
+        time.sleep(0.02 * (TOTAL - pagina))
+        resposta = super().generate(prompt, **kwargs)
+        with self._lock:
+            self.concluidos.append(pagina)
+        return resposta
+
+
+def _trechos(caminho):
+    pdf = int(caminho.rsplit('-', 1)[1])
+    return [{'page_num': p, 'total': TOTAL // 2, 'pages': [p], 'texto':
+             f"PAGINA {pdf * TOTAL // 2 + p}\nCOORDENADOR PROJETO NOME COLOCAÇÃO PERFIL\n"
+             f"Orientador {pdf}{p} Projeto {pdf}{p} Aluno {pdf}{p} 1º Classificado 1 1"}
+            for p in range(TOTAL // 2)]
+
+
+def _parser(monkeypatch, backend, concorrencia):
+    monkeypatch.setenv("PARSER_MAX_CONCURRENCY", str(concorrencia))
+    monkeypatch.setenv("LLM_HEDGE", "0")
+    parser = UenfParser(backend=backend)
+    monkeypatch.setattr(parser, '_extract_result_chunks', _trechos)
+    return parser
+
+
+def test_resultados_voltam_na_ordem_do_documento(monkeypatch):
+    pdfs = [{'path': 'resultado-0', 'centro': 'CCH'}, {'path': 'resultado-1', 'centro': 'CCT'}]
+    backend = _ForaDeOrdem()
+    parser = _parser(monkeypatch, backend, TOTAL)
+    try:
+        aprovados = parser._parse_resultados_concorrente(pdfs)
+    finally:
+        parser.close()
+
+    assert backend.concluidos != sorted(backend.concluidos)  # Terminaram fora de ordem
+    assert [re.search(r'Aluno \d+', a['candidato_aprovado']).group() for a in aprovados] == [f"Aluno {pdf}{p}" for pdf in range(2) for p in range(TOTAL // 2)]
+    assert parser._executor is None
+
+
+def test_tarefas_na_fila_nao_chamam_a_ia_depois_que_as_chaves_acabam(monkeypatch):
+    backend = FakeLLMBackend(latency=LatencyProfile(0, 0, 0, 0), num_keys=1, daily_request_limit=1)
+    parser = _parser(monkeypatch, backend, 2)
+    chamadas = []
+    original = parser._call_gemini_api_with_rotation
+    monkeypatch.setattr(parser, '_call_gemini_api_with_rotation',
+                        lambda *args, **kwargs: chamadas.append(1) or original(*args, **kwargs))
+    try:
+        aprovados = parser._parse_resultados_concorrente([{'path': 'resultado-0'}, {'path': 'resultado-1'}])
+    finally:
+        parser.close()
+
+    assert len(aprovados) == 1  # Só a chamada feita antes de a cota acabar
+    assert len(chamadas) <= 4  # As demais tarefas da fila saem sem chamar a IA
+    assert parser._parse_bloco_bolsa_com_ia(0, 1, "PERFIL 1") is _CHAVES_ESGOTADAS
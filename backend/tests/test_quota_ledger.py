@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+
+from backend.api_key_manager import QuotaLedger
+
+
+def _relogio(instante):
+    return lambda: instante[0]
+
+
+def test_livro_persiste_entre_instancias(tmp_path):
+    """O uso gravado por um processo é visto pelo próximo, sem guardar a chave em texto puro."""
+    path = tmp_path / "ledger.json"
+    ledger = QuotaLedger(path=str(path), daily_request_limit=10, save_interval_seconds=0)
+    ledger.record_request("chave-secreta")
+    ledger.record_tokens("chave-secreta", 120, 30)
+    ledger.mark_exhausted("outra-chave")
+
+    novo = QuotaLedger(path=str(path), daily_request_limit=10)
+    assert novo.remaining("chave-secreta") == 9
+    assert novo.is_exhausted("outra-chave")
+    assert "chave-secreta" not in path.read_text()
+
+
+def test_ordem_prioriza_cota_restante_e_ignora_esgotadas():
+    ledger = QuotaLedger(daily_request_limit=2)
+    for _ in range(2):
+        ledger.record_request("k1")
+    ledger.record_request("k2")
+    assert ledger.order_keys(["k1", "k2", "k3"]) == [2, 1]
+
+
+def test_novo_dia_de_cota_zera_o_uso():
+    """A cota reinicia à meia-noite do Pacífico (08:00 UTC no inverno)."""
+    instante = [datetime(2026, 1, 10, 7, 0, tzinfo=timezone.utc)]
+    ledger = QuotaLedger(daily_request_limit=5, now=_relogio(instante))
+    ledger.mark_exhausted("k1")
+    assert ledger.is_exhausted("k1")
+
+    instante[0] = datetime(2026, 1, 10, 9, 0, tzinfo=timezone.utc)
+    assert not ledger.is_exhausted("k1")
+    assert ledger.remaining("k1") == 5
+
+
+def test_uso_e_gravado_em_lote_e_esgotamento_na_hora(tmp_path):
+    path = tmp_path / "ledger.json"
+    instante = [0.0]
+    ledger = QuotaLedger(path=str(path), daily_request_limit=10, save_interval_seconds=30,
+                         clock=_relogio(instante))
+    for _ in range(3):
+        ledger.record_request("k1")
+    assert not path.exists()  # Só marcado como alterado
+
+    ledger.mark_exhausted("k2")
+    assert QuotaLedger(path=str(path)).is_exhausted("k2")
+
+    ledger.record_request("k1")
+    instante[0] = 31.0
+    ledger.record_tokens("k1", 10, 5)  # Intervalo vencido: grava
+    assert QuotaLedger(path=str(path), daily_request_limit=10).remaining("k1") == 6
+
+    ledger.record_request("k1")
+    ledger.flush()  # Fim da execução
+    assert QuotaLedger(path=str(path), daily_request_limit=10).remaining("k1") == 5
@@ -0,0 +1,66 @@
+import importlib.util
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "ranking", Path(__file__).resolve().parents[2] / "api" / "ranking.py")
+ranking = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(ranking)
+RankingTracker = ranking.RankingTracker
+
+
+def _relogio(instante):
+    return lambda: instante[0]
+
+
+def test_topo_segue_as_visualizacoes():
+    tracker = RankingTracker(capacity=10, half_life_seconds=3600, clock=lambda: 0.0)
+    tracker.seed({'a': 5, 'b': 3})
+    for _ in range(4):
+        tracker.record('b')
+    tracker.record('c')
+    assert tracker.top(2) == [('b', 7), ('a', 5)]
+
+
+def test_capacidade_limitada_mantem_as_bolsas_populares():
+    """Space-Saving: com poucas posições, as bolsas muito vistas não saem do topo."""
+    tracker = RankingTracker(capacity=3, half_life_seconds=3600, clock=lambda: 0.0)
+    for i in range(200):
+        tracker.record('popular')
+        tracker.record(f'rara-{i}')
+    assert len(tracker.counts) == 3
+    assert tracker.top(1)[0] == ('popular', 200)
+
+
+def test_pontuacao_em_alta_favorece_visualizacoes_recentes():
+    instante = [0.0]
+    tracker = RankingTracker(capacity=10, half_life_seconds=100, clock=_relogio(instante))
+    for _ in range(10):
+        tracker.record('antiga')
+    instante[0] = 300.0  # Três meias-vidas: 10 visualizações antigas valem 1,25
+    for _ in range(3):
+        tracker.record('recente')
+
+    assert tracker.top(1)[0][0] == 'antiga'
+    (primeira, pontos), (segunda, _) = tracker.top(2, trending=True)
+    assert primeira == 'recente'
+    assert abs(pontos - 3.0) < 1e-6
+
+
+def test_checkpoint_guarda_so_a_pontuacao_em_alta():
+    instante = [1000.0]
+    tracker = RankingTracker(capacity=10, half_life_seconds=100, clock=_relogio(instante))
+    for _ in range(4):
+        tracker.record('x')
+    tracker.record('y')
+    checkpoint = tracker.to_checkpoint()
+    assert 'counts' not in checkpoint
+
+    instante[0] = 1100.0
+    nova = RankingTracker(capacity=10, half_life_seconds=100, clock=_relogio(instante))
+    nova.seed({'x': 9})  # Contagens sempre do banco
+    nova.load_checkpoint(checkpoint)
+    assert nova.top(2) == [('x', 9)]
+    assert abs(nova.top(1, trending=True)[0][1] - 2.0) < 1e-6
+    assert 'y' not in nova.trending  # Fora das bolsas acompanhadas
+    assert nova.seeded_at == 1100.0
@@ -0,0 +1,196 @@
+import importlib.util
+import json
+import threading
+import time
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "response_cache", Path(__file__).resolve().parents[2] / "api" / "response_cache.py")
+response_cache = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(response_cache)
+ResponseCache = response_cache.ResponseCache
+make_key = response_cache.make_key
+is_not_modified = response_cache.is_not_modified
+http_date = response_cache.http_date
+
+
+def _contador(valores):
+    chamadas = []
+
+    def loader():
+        chamadas.append(1)
+        return valores[len(chamadas) - 1]
+    return loader, chamadas
+
+
+def test_chave_ignora_ordem_dos_parametros_e_barra_final():
+    assert make_key('/api/bolsas/', {'page': ['2'], 'centro': ['CCH']}) == \
+        make_key('/api/bolsas', {'centro': ['CCH'], 'page': ['2']})
+    assert make_key('/api/bolsas', {'page': ['2']}) != make_key('/api/bolsas', {'page': ['3']})
+
+
+def test_resposta_fresca_vem_da_memoria_ja_serializada():
+    instante = [0.0]
+    cache = ResponseCache(max_entries=10, enabled=True, clock=lambda: instante[0])
+    loader, chamadas = _contador([{'bolsas': ['ação']}])
+
+    primeiro = cache.get_or_load('/api/bolsas', {}, loader)
+    instante[0] = 10.0
+    assert cache.get_or_load('/api/bolsas', {}, loader) is primeiro
+    assert json.loads(primeiro['body']) == {'bolsas': ['ação']}
+    assert len(chamadas) == 1
+    assert cache.health()['hits'] == 1
+
+
+def test_resposta_vencida_e_servida_enquanto_atualiza_uma_vez():
+    instante = [0.0]
+    cache = ResponseCache(ttls={'/api/ranking': 30}, max_entries=10, stale_factor=5,
+                          enabled=True, clock=lambda: instante[0])
+    liberar = threading.Event()
+    chamadas = []
+
+    def loader():
+        chamadas.append(1)
+        if len(chamadas) > 1:
+            liberar.wait(5)
+        return [len(chamadas)]
+
+    assert json.loads(cache.get_or_load('/api/ranking', {}, loader)['body']) == [1]
+    instante[0] = 40.0  # Vencida, mas dentro da janela de 5 x TTL
+    assert json.loads(cache.get_or_load('/api/ranking', {}, loader)['body']) == [1]
+    assert json.loads(cache.get_or_load('/api/ranking', {}, loader)['body']) == [1]
+    liberar.set()
+    for _ in range(500):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+
+    assert len(chamadas) == 2  # Uma única atualização em segundo plano
+    assert json.loads(cache.get_or_load('/api/ranking', {}, loader)['body']) == [2]
+
+    instante[0] = 1000.0  # Velha demais: carrega na hora
+    assert json.loads(cache.get_or_load('/api/ranking', {}, loader)['body']) == [3]
+
+
+def test_atualizacoes_em_segundo_plano_contam_sob_o_lock():
+    instante = [0.0]
+    cache = ResponseCache(ttls={'/api/ranking': 30}, max_entries=100, stale_factor=5,
+                          enabled=True, clock=lambda: instante[0])
+    chaves = [{'page': [str(i)]} for i in range(40)]
+    for params in chaves:
+        cache.get_or_load('/api/ranking', params, lambda: [0])
+    instante[0] = 40.0
+
+    def loader_de(i):
+        def loader():
+            if i % 2:
+                raise RuntimeError("banco fora do ar")
+            return [i]
+        return loader
+
+    for i, params in enumerate(chaves):
+        cache.get_or_load('/api/ranking', params, loader_de(i))
+    for _ in range(500):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+
+    saude = cache.health()
+    assert (saude['refreshes'], saude['refresh_failures'], saude['stale_hits']) == (20, 20, 40)
+    assert saude['collapsed'] == cache.flights.health()['collapsed'] == 0
+    assert cache.flights.health()['executions'] == 80  # 40 cargas + 40 atualizações
+
+
+def test_lru_descarta_a_menos_usada_e_nao_guarda_falhas():
+    cache = ResponseCache(max_entries=2, enabled=True, clock=lambda: 0.0)
+    cache.get_or_load('/api/bolsas', {'page': ['1']}, lambda: {'p': 1})
+    cache.get_or_load('/api/bolsas', {'page': ['2']}, lambda: {'p': 2})
+    cache.get_or_load('/api/bolsas', {'page': ['1']}, lambda: {'p': 'nova'})  # Uso recente
+    cache.get_or_load('/api/bolsas', {'page': ['3']}, lambda: {'p': 3})
+
+    assert cache.health()['evictions'] == 1
+    assert json.loads(cache.get_or_load('/api/bolsas', {'page': ['1']}, lambda: {'p': 'x'})['body']) == {'p': 1}
+    assert json.loads(cache.get_or_load('/api/bolsas', {'page': ['2']}, lambda: {'p': 'x'})['body']) == {'p': 'x'}
+
+    assert cache.get_or_load('/api/editais', {}, lambda: None) is None
+    assert json.loads(cache.get_or_load('/api/editais', {}, lambda: [1])['body']) == [1]
+
+
+def test_requisicoes_simultaneas_fazem_uma_consulta():
+    cache = ResponseCache(max_entries=10, enabled=True, clock=lambda: 0.0)
+    liberar = threading.Event()
+    consultas = []
+
+    def loader():
+        consultas.append(1)
+        liberar.wait(5)
+        return {'bolsas': []}
+
+    resultados = []
+    threads = [threading.Thread(target=lambda: resultados.append(
+        cache.get_or_load('/api/bolsas', {'page': ['1']}, loader))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while cache.flights.stats['calls'] < 4:
+        time.sleep(0.001)
+    liberar.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert len(consultas) == 1
+    assert all(r is resultados[0] for r in resultados)
+    assert cache.health()['collapsed'] == 3
+
+
+def test_etag_segue_a_epoca_e_a_chave():
+    instante, epoca = [0.0], ['2025-01-01T12:00:00+00:00']
+    cache = ResponseCache(ttls={'/api/editais': 10}, max_entries=10, enabled=True,
+                          epoch_loader=lambda: epoca[0], epoch_check_seconds=0,
+                          clock=lambda: instante[0])
+
+    primeira = cache.get_or_load('/api/editais', {}, lambda: ['edital'])
+    instante[0] = 100.0  # Vencida: recarrega; mesma época e chave, mesmo ETag
+    assert cache.get_or_load('/api/editais', {}, lambda: ['edital', 'novo'])['etag'] == primeira['etag']
+    assert cache.get_or_load('/api/editais', {'page': ['2']}, lambda: ['edital'])['etag'] != primeira['etag']
+    assert http_date(primeira['last_modified']) == 'Wed, 01 Jan 2025 12:00:00 GMT'  # Instante da época
+
+    epoca[0] = '2025-02-01T12:00:00+00:00'  # Época nova: a entrada anterior não é servida nem como vencida
+    depois = cache.get_or_load('/api/editais', {}, lambda: ['da nova época'])
+    assert json.loads(depois['body']) == ['da nova época']
+    assert depois['etag'] != primeira['etag']
+    assert cache.health()['stale_epoch'] == 1
+
+
+def test_etag_igual_em_instancias_diferentes():
+    """Requisições da mesma URL caem em instâncias diferentes (e cold starts) na Vercel."""
+    def instancia():
+        return ResponseCache(max_entries=10, enabled=True, epoch_loader=lambda: '2025-03-10T11:00:00+00:00',
+                             epoch_check_seconds=0, clock=lambda: 0.0)
+
+    a = instancia().get_or_load('/api/bolsas', {'page': ['1'], 'centro': ['CCH']}, lambda: {'bolsas': [1]})
+    b = instancia().get_or_load('/api/bolsas/', {'centro': ['CCH'], 'page': ['1']}, lambda: {'bolsas': [1]})
+    assert a['etag'] == b['etag']
+    assert a['last_modified'] == b['last_modified']
+
+    # Sem época conhecida: hash curto do corpo, ainda determinístico
+    sem_epoca = [ResponseCache(max_entries=10, enabled=True, clock=lambda: 0.0).get_or_load(
+        '/api/editais', {}, lambda: ['x']) for _ in range(2)]
+    assert sem_epoca[0]['etag'] == sem_epoca[1]['etag']
+    assert sem_epoca[0]['last_modified'] is None
+    assert not is_not_modified(sem_epoca[0], if_modified_since=http_date(1_800_000_000))
+
+
+def test_requisicao_condicional():
+    entry = {'etag': '"abc-1"', 'last_modified': 1_700_000_000.5}
+    assert is_not_modified(entry, if_none_match='"xyz", "abc-1"')
+    assert is_not_modified(entry, if_none_match='W/"abc-1"')
+    assert is_not_modified(entry, if_none_match='*')
+    assert not is_not_modified(entry, if_none_match='"abc-2"')
+    # If-None-Match tem precedência sobre If-Modified-Since
+    assert not is_not_modified(entry, if_none_match='"abc-2"', if_modified_since=http_date(1_800_000_000))
+
+    assert is_not_modified(entry, if_modified_since=http_date(1_700_000_000))
+    assert not is_not_modified(entry, if_modified_since=http_date(1_699_999_999))
+    assert not is_not_modified(entry, if_modified_since='data inválida')
+    assert not is_not_modified(entry)
@@ -0,0 +1,33 @@
+from backend.rollups import acumular, como_lista, deltas_de_oferta, dia_da_oferta
+
+
+def _payload(data_publicacao, modalidade, projetos):
+    return {'link': 'https://uenf.br/edital', 'data_publicacao': data_publicacao,
+            'modalidade': modalidade, 'projetos': projetos}
+
+
+def test_deltas_de_oferta_agrupam_por_dia_centro_e_modalidade():
+    payloads = [
+        _payload('2025-03-10', 'extensao', [
+            {'centro': 'CCH', 'detalhe_bolsas': [{'vagas': 2}, {'vagas': None}]},
+            {'centro': 'CCT', 'detalhe_bolsas': [{'vagas': '3'}]},
+        ]),
+        _payload('2025-03-10T08:00:00', None, [
+            {'centro': 'CCH', 'detalhe_bolsas': [{'vagas': 1}]},
+        ]),
+    ]
+    deltas = {(d['dia'], d['centro'], d['modalidade']): d for d in deltas_de_oferta(payloads)}
+
+    assert deltas[('2025-03-10', 'CCH', 'extensao')]['bolsas'] == 3  # Modalidade ausente = extensao
+    assert deltas[('2025-03-10', 'CCH', 'extensao')]['vagas'] == 4  # Vagas ausentes contam 1
+    assert deltas[('2025-03-10', 'CCT', 'extensao')]['vagas'] == 3
+    assert all(d['preenchidas'] == 0 for d in deltas.values())
+
+
+def test_preenchimentos_somam_na_celula_da_oferta():
+    deltas = {}
+    acumular(deltas, dia_da_oferta(None, '2025-01-05T10:00:00+00:00'), None, 'apoio_academico', preenchidas=1)
+    acumular(deltas, '2025-01-05', 'Não informado', 'apoio_academico', preenchidas=1)
+    assert como_lista(deltas) == [{'dia': '2025-01-05', 'centro': 'Não informado', 'modalidade': 'apoio_academico',
+                                   'bolsas': 0, 'vagas': 0, 'preenchidas': 2}]
+    assert len(dia_da_oferta()) == 10  # Sem datas: hoje
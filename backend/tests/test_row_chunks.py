@@ -0,0 +1,125 @@
+import re
+
+import pytest
+
+pytest.importorskip("supabase")
+
+from backend import database
+
+# Filtro de desempate montado por iter_row_chunks: key.gt."v",and(key.eq."v",id.gt.<id>)
+_DESEMPATE = re.compile(r'^(\w+)\.gt\."([^"]*)",and\(\1\.eq\."([^"]*)",id\.gt\.([^)]+)\)$')
+
+
+class _Resposta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Consulta:
+    """Query falsa sobre linhas fixas: aplica gt/or_/eq/order/limit como o PostgREST faria."""
+
+    def __init__(self, tabela):
+        self.tabela = tabela
+        self.chamadas = []
+
+    def select(self, colunas):
+        self.chamadas.append(('select', colunas))
+        return self
+
+    def eq(self, coluna, valor):
+        self.chamadas.append(('eq', coluna, valor))
+        return self
+
+    def gt(self, coluna, valor):
+        self.chamadas.append(('gt', coluna, valor))
+        return self
+
+    def or_(self, filtro):
+        self.chamadas.append(('or_', filtro))
+        return self
+
+    def order(self, coluna):
+        self.chamadas.append(('order', coluna))
+        return self
+
+    def limit(self, n):
+        self.chamadas.append(('limit', n))
+        return self
+
+    def execute(self):
+        linhas = list(self.tabela.linhas)
+        ordem = []
+        for chamada in self.chamadas:
+            if chamada[0] == 'eq':
+                linhas = [l for l in linhas if l[chamada[1]] == chamada[2]]
+            elif chamada[0] == 'gt':
+                linhas = [l for l in linhas if l[chamada[1]] > chamada[2]]
+            elif chamada[0] == 'or_':
+                coluna, maior, igual, ultimo_id = _DESEMPATE.match(chamada[1]).groups()
+                assert maior == igual
+                linhas = [l for l in linhas if l[coluna] > maior or (l[coluna] == maior and l['id'] > ultimo_id)]
+            elif chamada[0] == 'order':
+                ordem.append(chamada[1])
+            elif chamada[0] == 'limit':
+                limite = chamada[1]
+        linhas.sort(key=lambda l: tuple(l[c] for c in ordem))
+        self.tabela.consultas.append(self.chamadas)
+        return _Resposta(linhas[:limite])
+
+
+class _Tabela:
+    def __init__(self, linhas):
+        self.linhas = linhas
+        self.consultas = []
+
+
+class _Supabase:
+    def __init__(self, linhas):
+        self.tabela = _Tabela(linhas)
+
+    def table(self, nome):
+        return _Consulta(self.tabela)
+
+
+def _manager(monkeypatch, cliente):
+    monkeypatch.setenv("SUPABASE_URL", "https://exemplo.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "chave")
+    monkeypatch.setattr(database, "create_client", lambda url, key: cliente)
+    return database.SupabaseManager()
+
+
+def test_pagina_por_created_at_com_empates_sem_lacunas_nem_repeticoes(monkeypatch):
+    # Vários empates em created_at atravessando o limite dos blocos
+    linhas = [{'id': f'id-{i:02d}', 'created_at': f'2025-03-10T11:00:0{i // 3}+00:00', 'status': 'disponivel'}
+              for i in range(7)]
+    cliente = _Supabase(list(reversed(linhas)))
+    manager = _manager(monkeypatch, cliente)
+
+    blocos = list(manager.iter_row_chunks('bolsas', 'status', key='created_at', chunk_size=2))
+    assert [l['id'] for bloco in blocos for l in bloco] == [l['id'] for l in linhas]
+    assert [len(bloco) for bloco in blocos] == [2, 2, 2, 1]
+
+    primeira, segunda = cliente.tabela.consultas[:2]
+    assert ('select', 'status, created_at, id') in primeira
+    assert [c for c in primeira if c[0] == 'order'] == [('order', 'created_at'), ('order', 'id')]
+    assert ('limit', 2) in primeira
+    assert not any(c[0] == 'or_' for c in primeira)
+    # Timestamp entre aspas (tem ':' e '+'), id do último da página anterior como desempate
+    assert ('or_', 'created_at.gt."2025-03-10T11:00:00+00:00",'
+                   'and(created_at.eq."2025-03-10T11:00:00+00:00",id.gt.id-01)') in segunda
+
+
+def test_tamanho_multiplo_do_bloco_termina_sem_bloco_vazio(monkeypatch):
+    linhas = [{'id': f'id-{i:02d}', 'orientador': f'Orientador {i}'} for i in range(6)]
+    cliente = _Supabase(linhas)
+    manager = _manager(monkeypatch, cliente)
+
+    blocos = list(manager.iter_row_chunks('projetos', 'orientador', chunk_size=3,
+                                          filters=[('eq', 'orientador', 'Orientador 4')]))
+    assert [[l['id'] for l in b] for b in blocos] == [['id-04']]
+
+    blocos = list(manager.iter_row_chunks('projetos', 'orientador', chunk_size=3))
+    assert [len(b) for b in blocos] == [3, 3]  # Nenhum bloco vazio no fim
+    consultas = cliente.tabela.consultas[-3:]  # 2 blocos cheios + 1 consulta que volta vazia
+    assert [[c for c in q if c[0] == 'gt'] for q in consultas] == [[], [('gt', 'id', 'id-02')], [('gt', 'id', 'id-05')]]
+    assert list(manager.iter_rows('projetos', 'orientador', chunk_size=4))[-1]['id'] == 'id-05'
@@ -0,0 +1,119 @@
+import importlib.util
+import threading
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "supabase_client", Path(__file__).resolve().parents[2] / "api" / "supabase_client.py")
+supabase_client = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(supabase_client)
+SupabaseClientPool = supabase_client.SupabaseClientPool
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class _Cliente:
+    """Cliente falso: conta as verificações de saúde e pode falhar ou travar nelas."""
+
+    def __init__(self, nome, falha=False, trava=None):
+        self.nome, self.falha, self.trava = nome, falha, trava
+        self.verificacoes = 0
+        self.verificando = threading.Event()
+
+    def table(self, nome):
+        return self
+
+    def select(self, colunas):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execute(self):
+        self.verificacoes += 1
+        self.verificando.set()
+        if self.trava is not None:
+            self.trava.wait(2)
+        if self.falha:
+            raise ConnectionError("conexão derrubada")
+
+
+class _Fabrica:
+    def __init__(self, *clientes):
+        self.clientes = list(clientes)
+        self.criados = []
+
+    def __call__(self):
+        cliente = self.clientes.pop(0)
+        self.criados.append(cliente)
+        return cliente
+
+
+def test_cria_no_primeiro_uso_e_reutiliza():
+    fabrica = _Fabrica(_Cliente('a'))
+    pool = SupabaseClientPool(idle_probe_seconds=60, clock=_Relogio(), client_factory=fabrica)
+    assert fabrica.criados == []  # Preguiçoso: nada criado antes do primeiro get
+
+    clientes = [pool.get() for _ in range(4)]
+    assert {c.nome for c in clientes} == {'a'} and len(fabrica.criados) == 1
+    assert clientes[0].verificacoes == 0  # Em uso contínuo não há verificação
+    saude = pool.health()
+    assert (saude['created'], saude['reused'], saude['probes']) == (1, 3, 0)
+    assert saude['warm_reuse_ratio'] == 0.75 and saude['connected']
+
+
+def test_verifica_depois_de_parado_e_reutiliza_se_responder():
+    relogio = _Relogio()
+    fabrica = _Fabrica(_Cliente('a'))
+    pool = SupabaseClientPool(idle_probe_seconds=60, clock=relogio, client_factory=fabrica)
+    cliente = pool.get()
+
+    relogio.agora = 30
+    assert pool.get() is cliente and cliente.verificacoes == 0
+    relogio.agora = 91  # 61s parado desde o último uso
+    assert pool.get() is cliente and cliente.verificacoes == 1
+    assert pool.health()['probes'] == 1 and pool.health()['reconnects'] == 0
+
+
+def test_recria_depois_de_erro_reportado_se_a_verificacao_falhar():
+    fabrica = _Fabrica(_Cliente('a', falha=True), _Cliente('b'))
+    pool = SupabaseClientPool(idle_probe_seconds=60, clock=_Relogio(), client_factory=fabrica)
+    assert pool.get().nome == 'a'
+
+    pool.report_error(ConnectionError("timeout"))
+    assert pool.get().nome == 'b'
+    assert pool.get().verificacoes == 0  # Suspeita limpa: o novo cliente não é verificado de novo
+    saude = pool.health()
+    assert (saude['created'], saude['reconnects'], saude['probe_failures'], saude['errors_reported']) == (2, 1, 1, 1)
+    assert saude['last_error'] == "conexão derrubada"
+
+
+def test_verificacao_nao_segura_o_lock():
+    trava = threading.Event()
+    relogio = _Relogio()
+    cliente = _Cliente('a', trava=trava)
+    pool = SupabaseClientPool(idle_probe_seconds=60, clock=relogio, client_factory=_Fabrica(cliente))
+    pool.get()
+    relogio.agora = 120
+
+    verificando = threading.Thread(target=pool.get)
+    verificando.start()
+    assert cliente.verificando.wait(2)
+    # Enquanto a verificação está pendurada na rede, outras requisições usam o mesmo cliente
+    assert pool.get() is cliente
+    assert pool.health()['probes'] == 1
+    trava.set()
+    verificando.join(2)
+    assert cliente.verificacoes == 1 and pool.health()['reused'] == 2
+
+
+def test_sem_configuracao_devolve_none():
+    pool = SupabaseClientPool(client_factory=lambda: None)
+    assert pool.get() is None
+    assert pool.health()['connected'] is False and pool.health()['warm_reuse_ratio'] is None
@@ -0,0 +1,233 @@
+import importlib
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("supabase")
+
+from backend import database
+
+# Operações que não filtram linhas (a listagem pagina e ordena; os totais não)
+_SEM_FILTRO = {'select', 'order', 'range', 'limit'}
+
+LINHAS = [
+    {'vagas_total': 3, 'status': 'preenchida'},
+    {'vagas_total': None, 'status': 'disponivel'},  # Nulo conta 1, como na RPC
+    {'vagas_total': 2, 'status': 'disponivel'},
+    {'vagas_total': 0, 'status': 'preenchida'},
+]
+
+
+def _api_index():
+    """api/ é o deploy da Vercel (imports relativos, sem __init__): carrega como pacote pelo caminho."""
+    if 'vercel_api' not in sys.modules:
+        pacote = types.ModuleType('vercel_api')
+        pacote.__path__ = [str(Path(__file__).resolve().parents[2] / 'api')]
+        sys.modules['vercel_api'] = pacote
+    return importlib.import_module('vercel_api.index')
+
+
+class _Resposta:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class _Params:
+    def __init__(self, consulta):
+        self.consulta = consulta
+
+    def set(self, chave, valor):
+        self.consulta.ops.append(('params.set', (chave, valor)))
+        return self
+
+
+class _Consulta:
+    def __init__(self, cliente, tabela):
+        self.cliente, self.tabela, self.ops = cliente, tabela, []
+        self.params = _Params(self)
+
+    def __getattr__(self, nome):
+        def op(*args, **kwargs):
+            self.ops.append((nome, args))
+            return self
+        return op
+
+    def filtros(self):
+        return [op for op in self.ops if op[0] not in _SEM_FILTRO]
+
+    def execute(self):
+        self.cliente.consultas.append(self)
+        return _Resposta(list(self.cliente.linhas), count=len(self.cliente.linhas))
+
+
+class _Supabase:
+    def __init__(self, linhas, sem_rpc=False):
+        self.linhas = linhas
+        self.sem_rpc = sem_rpc
+        self.consultas = []
+        self.rpcs = []
+
+    def table(self, nome):
+        return _Consulta(self, nome)
+
+    def rpc(self, nome, params):
+        self.rpcs.append((nome, params))
+        cliente = self
+
+        class _Execucao:
+            def execute(self):
+                if cliente.sem_rpc:
+                    raise Exception("function bolsas_totais_agrupadas does not exist")
+                return _Resposta([{'total_vagas': 40, 'vagas_preenchidas': 12, 'total_grupos': 9}])
+        return _Execucao()
+
+    def listagem(self):
+        return next(c for c in self.consultas if ('select', ('*',)) in c.ops)
+
+    def soma_python(self):
+        return next(c for c in self.consultas if ('select', ('vagas_total,status',)) in c.ops)
+
+
+def _manager(monkeypatch, cliente):
+    monkeypatch.setenv("SUPABASE_URL", "https://exemplo.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "chave")
+    monkeypatch.setenv("DB_CACHE", "0")
+    monkeypatch.setattr(database, "create_client", lambda url, key: cliente)
+    return database.SupabaseManager()
+
+
+def test_backend_rpc_recebe_os_filtros_da_listagem(monkeypatch):
+    cliente = _Supabase(LINHAS)
+    manager = _manager(monkeypatch, cliente)
+    resultado = manager.get_bolsas_agrupadas_paginated(status='disponivel', centro='CCH', tipo='extensao', q='Biologia Marinha')
+
+    ((nome, params),) = cliente.rpcs
+    assert nome == 'bolsas_totais_agrupadas'
+    filtros = dict(cliente.listagem().filtros())
+    assert params['p_status'] == 'disponivel' and params['p_centro'] == 'CCH' and params['p_tipo'] == 'extensao'
+    assert params['p_fts'] == filtros['filter'][2]  # Mesma tsquery da listagem
+    assert params['p_busca'] is None
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (40, 12)
+
+
+@pytest.mark.parametrize('tipo', ['extensao', 'UA Superior', 'UA Médio', 'UA Fundamental'])
+def test_backend_sem_rpc_soma_em_python_com_os_mesmos_filtros(monkeypatch, tipo):
+    cliente = _Supabase(LINHAS, sem_rpc=True)
+    manager = _manager(monkeypatch, cliente)
+    resultado = manager.get_bolsas_agrupadas_paginated(status='all', centro='CCT', tipo=tipo, q='biologia')
+
+    assert cliente.soma_python().filtros() == cliente.listagem().filtros()
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (6, 3)
+
+
+def test_api_rpc_recebe_os_filtros_da_listagem(monkeypatch):
+    index = _api_index()
+    cliente = _Supabase(LINHAS)
+    monkeypatch.setattr(index, 'get_supabase_client', lambda: cliente)
+    resultado = index.get_bolsas_from_supabase({'status': ['preenchida'], 'centro': ['CCH'], 'tipo': ['UA Superior'],
+                                                'q': ['maria']})
+
+    ((_, params),) = cliente.rpcs
+    assert params == {'p_status': 'preenchida', 'p_centro': 'CCH', 'p_tipo': 'UA Superior', 'p_fts': None, 'p_busca': 'maria'}
+    assert ('or_', ('nome_projeto.ilike.%maria%,orientador.ilike.%maria%',)) in cliente.listagem().filtros()
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (40, 12)
+
+
+@pytest.mark.parametrize('tipo', ['extensao', 'UA Superior', 'UA Fundamental'])
+def test_api_sem_rpc_soma_em_python_com_os_mesmos_filtros(monkeypatch, tipo):
+    index = _api_index()
+    cliente = _Supabase(LINHAS, sem_rpc=True)
+    monkeypatch.setattr(index, 'get_supabase_client', lambda: cliente)
+    resultado = index.get_bolsas_from_supabase({'status': ['disponivel'], 'tipo': [tipo], 'q': ['ana']})
+
+    assert cliente.soma_python().filtros() == cliente.listagem().filtros()
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (6, 3)
+
+
+CHAVES_RESPOSTA = {'bolsas', 'total', 'page', 'page_size', 'total_pages', 'agrupadas', 'total_vagas', 'vagas_preenchidas'}
+
+
+class _Lento(_Supabase):
+    """Página e RPC de totais só terminam se a outra já tiver começado (esperam até 2s)."""
+
+    def __init__(self, linhas, totais_falham=False):
+        super().__init__(linhas)
+        self.totais_falham = totais_falham
+        self.pagina_comecou = threading.Event()
+        self.totais_comecou = threading.Event()
+        self.sobrepostas = []
+
+    def table(self, nome):
+        consulta = super().table(nome)
+        execute = consulta.execute
+
+        def execute_lento():
+            self.pagina_comecou.set()
+            self.sobrepostas.append(('pagina', self.totais_comecou.wait(2)))
+            return execute()
+        consulta.__dict__['execute'] = execute_lento
+        return consulta
+
+    def rpc(self, nome, params):
+        execucao = super().rpc(nome, params)
+        cliente = self
+
+        class _ExecucaoLenta:
+            def execute(self):
+                cliente.totais_comecou.set()
+                cliente.sobrepostas.append(('totais', cliente.pagina_comecou.wait(2)))
+                return execucao.execute()
+        return _ExecucaoLenta()
+
+
+def test_backend_pagina_e_totais_rodam_em_paralelo(monkeypatch):
+    cliente = _Lento(LINHAS)
+    manager = _manager(monkeypatch, cliente)
+    resultado = manager.get_bolsas_agrupadas_paginated(page=2, page_size=3, status='all')
+
+    assert sorted(cliente.sobrepostas) == [('pagina', True), ('totais', True)]
+    assert set(resultado) == CHAVES_RESPOSTA
+    assert (resultado['total'], resultado['page'], resultado['total_pages']) == (4, 2, 2)
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (40, 12)
+
+
+def test_api_pagina_e_totais_rodam_em_paralelo(monkeypatch):
+    index = _api_index()
+    cliente = _Lento(LINHAS)
+    monkeypatch.setattr(index, 'get_supabase_client', lambda: cliente)
+    resultado = index.get_bolsas_from_supabase({'page': ['1'], 'page_size': ['10']})
+
+    assert sorted(cliente.sobrepostas) == [('pagina', True), ('totais', True)]
+    assert set(resultado) == CHAVES_RESPOSTA
+    assert resultado['agrupadas'] is True and resultado['bolsas'] == LINHAS
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (40, 12)
+
+
+def _totais_quebrados(*args, **kwargs):
+    raise RuntimeError("totais indisponíveis")
+
+
+def test_backend_erro_nos_totais_nao_derruba_a_pagina(monkeypatch):
+    cliente = _Supabase(LINHAS)
+    manager = _manager(monkeypatch, cliente)
+    monkeypatch.setattr(manager, '_get_totais_bolsas_agrupadas', _totais_quebrados)
+    resultado = manager.get_bolsas_agrupadas_paginated()
+
+    assert set(resultado) == CHAVES_RESPOSTA and resultado['agrupadas'] is True
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (6, 3)  # Soma da própria página
+
+
+def test_api_erro_nos_totais_nao_derruba_a_pagina(monkeypatch):
+    index = _api_index()
+    cliente = _Supabase(LINHAS)
+    monkeypatch.setattr(index, 'get_supabase_client', lambda: cliente)
+    monkeypatch.setattr(index, 'get_bolsas_totais_agrupadas', _totais_quebrados)
+    resultado = index.get_bolsas_from_supabase({})
+
+    assert set(resultado) == CHAVES_RESPOSTA
+    assert resultado['bolsas'] == LINHAS
+    assert (resultado['total_vagas'], resultado['vagas_preenchidas']) == (6, 3)
@@ -0,0 +1,84 @@
+import importlib.util
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "unique_views", Path(__file__).resolve().parents[2] / "api" / "unique_views.py")
+unique_views = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(unique_views)
+HyperLogLog = unique_views.HyperLogLog
+RotatingBloomFilter = unique_views.RotatingBloomFilter
+UniqueViewTracker = unique_views.UniqueViewTracker
+
+
+def test_hyperloglog_estima_com_erro_pequeno():
+    hll = HyperLogLog(precision=10)
+    for i in range(20000):
+        hll.add(f"sessao-{i}")
+    assert abs(hll.count() - 20000) / 20000 < 0.06
+
+    pequeno = HyperLogLog(precision=10)
+    for i in range(30):
+        pequeno.add(f"sessao-{i}")
+        pequeno.add(f"sessao-{i}")  # Repetir a sessão não muda a contagem
+    assert abs(pequeno.count() - 30) <= 2
+
+
+def test_mesclar_esbocos_nao_conta_a_mesma_sessao_duas_vezes():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(1000):
+        a.add(f"s{i}")
+    for i in range(500, 1500):
+        b.add(f"s{i}")
+    a.merge(HyperLogLog.from_base64(b.to_base64()))
+    assert abs(a.count() - 1500) / 1500 < 0.06
+    assert len(a.to_base64()) < 1400
+
+
+def test_filtro_com_rotacao_esquece_depois_de_duas_janelas():
+    instante = [0.0]
+    filtro = RotatingBloomFilter(capacity=1000, rotate_seconds=100, clock=lambda: instante[0])
+    assert filtro.check_and_add("bolsa:sessao") is False
+    assert filtro.check_and_add("bolsa:sessao") is True
+
+    instante[0] = 150.0  # Uma rotação: ainda lembra (geração anterior)
+    assert filtro.check_and_add("bolsa:sessao") is True
+    instante[0] = 260.0  # Duas rotações: esqueceu
+    assert filtro.check_and_add("bolsa:sessao") is False
+
+
+class _Supabase:
+    def __init__(self, falhar=False):
+        self.falhar = falhar
+        self.enviados = []
+
+    def rpc(self, nome, params):
+        cliente = self
+
+        class _Execucao:
+            def execute(self):
+                if cliente.falhar:
+                    raise Exception("timeout")
+                cliente.enviados.append(params['sketches'])
+
+                class _Resposta:
+                    data = [{'bolsa_id': s['bolsa_id'], 'unique_viewers': 7} for s in params['sketches']]
+                return _Resposta()
+        return _Execucao()
+
+
+def test_rastreador_conta_sessao_uma_vez_e_grava_esbocos():
+    rastreador = UniqueViewTracker(dedup_window_seconds=3600, dedup_capacity=1000)
+    assert rastreador.observe("b1", "sessao-1") is True
+    assert rastreador.observe("b1", "sessao-1") is False
+    assert rastreador.observe("b1", "sessao-2") is True
+    assert rastreador.dirty_count() == 1
+
+    rastreador.persist(_Supabase(falhar=True))
+    assert rastreador.dirty_count() == 1  # Falhou: o esboço continua pendente
+
+    supabase = _Supabase()
+    rastreador.persist(supabase)
+    assert rastreador.dirty_count() == 0
+    assert [s['bolsa_id'] for s in supabase.enviados[0]] == ["b1"]
+    assert rastreador.unique_counts == {"b1": 7}
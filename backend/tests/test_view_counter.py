@@ -0,0 +1,92 @@
+import importlib.util
+from pathlib import Path
+
+# api/ é o deploy da Vercel (não é pacote instalável): carrega o módulo pelo caminho
+_spec = importlib.util.spec_from_file_location(
+    "view_counter", Path(__file__).resolve().parents[2] / "api" / "view_counter.py")
+view_counter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(view_counter)
+ViewCounter, normalize_bolsa_id = view_counter.ViewCounter, view_counter.normalize_bolsa_id
+
+BOLSA_A = "3f2c1a7e-0000-4000-8000-000000000001"
+BOLSA_B = "3f2c1a7e-0000-4000-8000-000000000002"
+
+
+class _Resposta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Supabase:
+    """Cliente falso: guarda as chamadas de RPC e pode falhar a RPC em lote."""
+
+    def __init__(self, sem_rpc_lote=False):
+        self.sem_rpc_lote = sem_rpc_lote
+        self.chamadas = []
+
+    def rpc(self, nome, params):
+        self.chamadas.append((nome, params))
+        cliente = self
+
+        class _Execucao:
+            def execute(self):
+                if nome == 'increment_view_counts':
+                    if cliente.sem_rpc_lote:
+                        raise Exception("function increment_view_counts does not exist")
+                    return _Resposta([{'bolsa_id': d['bolsa_id'], 'view_count': 100 + d['delta']} for d in params['deltas']])
+                return _Resposta(None)
+        return _Execucao()
+
+
+def test_visualizacoes_sao_agregadas_numa_unica_chamada():
+    supabase = _Supabase()
+    contador = ViewCounter(lambda: supabase, flush_threshold=5, flush_interval_seconds=60, clock=lambda: 0.0)
+    assert contador.record(BOLSA_A) == 1
+    assert contador.record(BOLSA_A) == 2
+    contador.record(BOLSA_B)
+    assert supabase.chamadas == []
+
+    assert contador.flush() == {BOLSA_A: 102, BOLSA_B: 101}
+    assert supabase.chamadas == [('increment_view_counts', {'deltas': [
+        {'bolsa_id': BOLSA_A, 'delta': 2}, {'bolsa_id': BOLSA_B, 'delta': 1}]})]
+    assert contador.pending() == 0
+
+
+def test_grava_ao_atingir_limite_ou_intervalo():
+    instante = [0.0]
+    supabase = _Supabase()
+    contador = ViewCounter(lambda: supabase, flush_threshold=3, flush_interval_seconds=10, clock=lambda: instante[0])
+    for _ in range(3):
+        contador.record(BOLSA_A)
+    assert len(supabase.chamadas) == 1
+
+    contador.record(BOLSA_B)
+    assert not contador.flush_if_due()
+    instante[0] = 11.0
+    assert contador.flush_if_due()
+    assert len(supabase.chamadas) == 2
+
+
+def test_falha_na_gravacao_devolve_incrementos_para_a_fila():
+    contador = ViewCounter(lambda: None, flush_threshold=100, clock=lambda: 0.0)
+    contador.record(BOLSA_A)
+    contador.record(BOLSA_A)
+    assert contador.flush() == {}
+    assert contador.pending(BOLSA_A) == 2
+    assert contador.stats['flush_failures'] == 1
+
+
+def test_sem_rpc_em_lote_usa_incremento_atomico_unitario():
+    supabase = _Supabase(sem_rpc_lote=True)
+    contador = ViewCounter(lambda: supabase, flush_threshold=100, clock=lambda: 0.0)
+    contador.record(BOLSA_A, count=2)
+    contador.flush()
+    unitarias = [c for c in supabase.chamadas if c[0] == 'increment_view_count']
+    assert unitarias == [('increment_view_count', {'bolsa_id_param': BOLSA_A})] * 2
+    assert contador.pending() == 0
+
+
+def test_normaliza_id_da_bolsa():
+    assert normalize_bolsa_id(BOLSA_A.upper()) == BOLSA_A
+    assert normalize_bolsa_id("1; drop table bolsas") is None
+    assert normalize_bolsa_id(None) is None
@@ -0,0 +1,60 @@
+import importlib
+import io
+import json
+import sys
+import types
+import uuid
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("supabase")
+
+
+def _api_index():
+    """api/ é o deploy da Vercel (imports relativos, sem __init__): carrega como pacote pelo caminho."""
+    if 'vercel_api' not in sys.modules:
+        pacote = types.ModuleType('vercel_api')
+        pacote.__path__ = [str(Path(__file__).resolve().parents[2] / 'api')]
+        sys.modules['vercel_api'] = pacote
+    return importlib.import_module('vercel_api.index')
+
+
+def _post(index, monkeypatch, path, corpo):
+    """Executa do_POST do handler sem servidor HTTP, devolvendo (status, resposta)."""
+    monkeypatch.setattr(index, 'apply_rate_limit', lambda headers, path: None)
+    monkeypatch.setattr(index.view_counter, 'flush_if_due', lambda: None)
+    bruto = json.dumps(corpo).encode('utf-8')
+    requisicao = index.handler.__new__(index.handler)
+    requisicao.path = path
+    requisicao.headers = {'Content-Length': str(len(bruto))}
+    requisicao.rfile = io.BytesIO(bruto)
+    respostas = []
+    requisicao.send_json_response = lambda data, status_code=200, cache_seconds=3600: respostas.append((status_code, data))
+    requisicao.do_POST()
+    return respostas[0]
+
+
+@pytest.mark.parametrize('session_id', [None, '', 12345, ['a'], {'id': 'a'}, 'x' * 129])
+@pytest.mark.parametrize('path', ['/api/bolsas/123/increment-view', '/api/views/batch'])
+def test_session_id_invalido_responde_400(monkeypatch, path, session_id):
+    index = _api_index()
+    registradas = []
+    monkeypatch.setattr(index, 'registrar_visualizacao', lambda bolsa_id: registradas.append(bolsa_id) or 1)
+    status, resposta = _post(index, monkeypatch, path, {'session_id': session_id, 'bolsa_ids': ['123']})
+
+    assert status == 400 and resposta['status'] == 'error'
+    assert 'session_id' in resposta['message']
+    assert registradas == []
+
+
+def test_session_id_valido_registra_a_visualizacao(monkeypatch):
+    index = _api_index()
+    bolsa_id = str(uuid.uuid4())
+    registradas = []
+    monkeypatch.setattr(index, 'registrar_visualizacao', lambda bolsa_id: registradas.append(bolsa_id) or 1)
+    status, resposta = _post(index, monkeypatch, '/api/views/batch',
+                             {'session_id': 'x' * index.MAX_SESSION_ID_LENGTH, 'bolsa_ids': [bolsa_id]})
+
+    assert status == 200 and resposta['status'] == 'success'
+    assert registradas == [bolsa_id]
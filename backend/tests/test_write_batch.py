@@ -0,0 +1,142 @@
+import pytest
+
+pytest.importorskip("supabase")
+
+from backend import database
+
+
+class _Resposta:
+    def __init__(self, data):
+        self.data = data
+
+
+class _Consulta:
+    """Query falsa: guarda os métodos encadeados e responde no execute()."""
+
+    def __init__(self, cliente, tabela):
+        self.cliente, self.tabela, self.ops = cliente, tabela, []
+
+    def __getattr__(self, nome):
+        def op(*args, **kwargs):
+            self.ops.append((nome, args))
+            return self
+        return op
+
+    def execute(self):
+        self.cliente.consultas.append((self.tabela, self.ops))
+        return _Resposta(self.cliente.responder(self.tabela, self.ops))
+
+
+class _Supabase:
+    """Cliente falso: editais já existentes, usuários ativos e a RPC em lote (que pode falhar)."""
+
+    def __init__(self, existentes=None, sem_rpc_lote=False):
+        self.existentes = existentes or {}
+        self.sem_rpc_lote = sem_rpc_lote
+        self.consultas = []
+        self.rpcs = []
+
+    def table(self, nome):
+        return _Consulta(self, nome)
+
+    def rpc(self, nome, params):
+        self.rpcs.append((nome, params))
+        cliente = self
+
+        class _Execucao:
+            def execute(self):
+                if nome == 'handle_editais_upsert_batch':
+                    if cliente.sem_rpc_lote:
+                        raise Exception("function handle_editais_upsert_batch does not exist")
+                    return _Resposta([{'link': p['link'], 'id': f"id-{p['link']}"} for p in params['edital_payloads']])
+                if nome == 'handle_edital_upsert':
+                    return _Resposta(f"id-{params['edital_payload']['link']}")
+                return _Resposta(None)
+        return _Execucao()
+
+    def responder(self, tabela, ops):
+        nomes = [nome for nome, _ in ops]
+        if tabela == 'editais' and 'in_' in nomes:
+            links = dict(ops)['in_'][1]
+            return [{'id': self.existentes[l], 'link': l} for l in links if l in self.existentes]
+        if tabela == 'editais':
+            return [{'data_publicacao': '2025-03-10'}]
+        if tabela == 'telegram_alerts':
+            return [{'telegram_id': 1, 'preferencias': None}]
+        return []
+
+    def contar(self, tabela, operacao):
+        return sum(1 for t, ops in self.consultas if t == tabela and operacao in dict(ops))
+
+    def argumentos(self, tabela, operacao):
+        return [dict(ops)[operacao] for t, ops in self.consultas if t == tabela and operacao in dict(ops)]
+
+    def contar_rpc(self, nome):
+        return sum(1 for n, _ in self.rpcs if n == nome)
+
+
+def _manager(monkeypatch, cliente):
+    monkeypatch.setenv("SUPABASE_URL", "https://exemplo.supabase.co")
+    monkeypatch.setenv("SUPABASE_KEY", "chave")
+    monkeypatch.setattr(database, "create_client", lambda url, key: cliente)
+    return database.SupabaseManager()
+
+
+def _edital(i, etapa='inscricao'):
+    return ({'titulo': f'Edital {i}', 'etapa': etapa, 'modalidade': 'extensao', 'data_publicacao': '2025-03-10',
+             'projetos': [{'nome_projeto': f'Projeto {i}', 'orientador': 'Maria', 'centro': 'CCH',
+                           'detalhe_bolsas': [{'tipo_bolsa': 'Extensão', 'vagas': 1, 'numero_perfil': '1'}]}]},
+            f'https://uenf.br/edital-{i}')
+
+
+def test_execucao_com_n_editais_grava_tudo_de_uma_vez(monkeypatch):
+    cliente = _Supabase(existentes={'https://uenf.br/edital-0': 'id-antigo'})
+    manager = _manager(monkeypatch, cliente)
+    manager.begin_write_batch(flush_threshold=25)
+
+    for i in range(6):
+        assert manager.upsert_edital(*_edital(i)) is None  # Só entra no buffer
+    assert cliente.rpcs == [] and cliente.consultas == []
+
+    ids = manager.flush_writes()
+    assert len(ids) == 6
+    assert cliente.contar_rpc('handle_editais_upsert_batch') == 1
+    assert cliente.contar_rpc('handle_edital_upsert') == 0
+    assert cliente.contar('bolsas', 'delete') == 1  # Limpeza uma vez por lote
+    assert cliente.contar('telegram_alerts', 'select') == 1
+    assert cliente.contar('notificacoes_enviadas', 'insert') == 1
+    (notificacoes,), = cliente.argumentos('notificacoes_enviadas', 'insert')
+    assert len(notificacoes) == 5  # O edital que já existia não notifica
+    assert cliente.contar_rpc('apply_bolsas_rollup_deltas') == 1
+    assert manager.flush_writes() == {}  # Buffer vazio: nada a fazer
+
+
+def test_buffer_grava_ao_atingir_o_limite(monkeypatch):
+    cliente = _Supabase()
+    manager = _manager(monkeypatch, cliente)
+    manager.begin_write_batch(flush_threshold=2)
+
+    for i in range(5):
+        manager.upsert_edital(*_edital(i))
+    assert cliente.contar_rpc('handle_editais_upsert_batch') == 2  # Ao 2º e ao 4º edital
+
+    manager.flush_writes()  # O que sobrou (1 edital) vai pela RPC individual
+    assert cliente.contar_rpc('handle_editais_upsert_batch') == 2
+    assert cliente.contar_rpc('handle_edital_upsert') == 1
+    assert cliente.contar('notificacoes_enviadas', 'insert') == 3  # Um insert por lote gravado
+
+
+def test_sem_rpc_em_lote_grava_edital_a_edital(monkeypatch):
+    cliente = _Supabase(existentes={'https://uenf.br/edital-1': 'id-antigo'}, sem_rpc_lote=True)
+    manager = _manager(monkeypatch, cliente)
+    manager.begin_write_batch(flush_threshold=25)
+    for i in range(4):
+        manager.upsert_edital(*_edital(i, etapa='resultado' if i == 3 else 'inscricao'))
+
+    assert len(manager.flush_writes()) == 4
+    assert cliente.contar_rpc('handle_editais_upsert_batch') == 1
+    assert cliente.contar_rpc('handle_edital_upsert') == 4
+    assert cliente.contar('bolsas', 'delete') == 1
+    assert cliente.contar('notificacoes_enviadas', 'insert') == 1
+    rollups = [params for nome, params in cliente.rpcs if nome == 'apply_bolsas_rollup_deltas']
+    assert sum(d['bolsas'] for d in rollups[0]['deltas']) == 3  # O edital que já existia não conta de novo